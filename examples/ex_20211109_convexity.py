@@ -12,7 +12,7 @@ yield in an easier to interpret fashion than convexity. (Easier for me, anyway.)
 try:
     from simplepricers.utils import create_grid
     import simplepricers.yieldcalculations as yc
-    import simplepricers.bonds_curves as bonds
+    from simplepricers.surfaces import CalcPriceSurfaces
 except ImportError:
     print('If these imports fail, put the base directory above onto the PYTHONPATH')
     raise
@@ -25,10 +25,11 @@ from plot_for_examples import Quick2DPlot
 starting_yield = .03
 
 maturities = [1,2,3,4,5,6,7,8,9,10,15,20,25,30,40,50]
-durations = []
-for i in maturities:
-    cpn = bonds.CouponBond(mat=i, coupon=starting_yield, coupon_freq=1)
-    durations.append(cpn.CalcDuration(starting_yield))
+# Durations for every maturity at the starting yield and +/- 100 basis points, in one call.
+# The surface is indexed [maturity][yield].
+surface = CalcPriceSurfaces(maturities, starting_yield,
+                            [starting_yield - .01, starting_yield, starting_yield + .01], coupon_freq=1)
+durations = [row[1] for row in surface.Duration]
 
 obj = Quick2DPlot(maturities, durations,  'Duration/Maturity For 3% Par Coupon', run_now=False,
                   filename='c20211109_convexity_1.png')
@@ -38,13 +39,8 @@ obj.OutputDirectory = 'figures'
 obj.DPI = 90
 obj.DoPlot()
 
-duration_up = []
-duration_down = []
-for i in range(0,len(maturities)):
-    m = maturities[i]
-    cpn = bonds.CouponBond(mat=m, coupon=starting_yield, coupon_freq=1)
-    duration_up.append(cpn.CalcDuration(starting_yield+.01)-durations[i])
-    duration_down.append(cpn.CalcDuration(starting_yield-.01)-durations[i])
+duration_up = [row[2] - row[1] for row in surface.Duration]
+duration_down = [row[0] - row[1] for row in surface.Duration]
 
 obj = Quick2DPlot([maturities, maturities], [duration_up, duration_down],
                   'Duration/Maturity After Shocks', run_now=False,
@@ -8,9 +8,9 @@ article on my website, and in my upcoming book on recessions.
 
 import random
 from statistics import mean
-import math
 
 from examples.plot_for_examples import Quick2DPlot
+from simplepricers.regime_simulation import RegimeSwitchingGrowth, RecessionStatistics
 
 N = 240
 t = list(range(0,N))
@@ -96,5 +96,12 @@ p.DoPlot()
 for x,y,z in zip(t_float, state, cheating_MA(growth)):
     print(x, y, z)
 
-
-
+# Recession statistics across many paths of the same model (generated and summarised one block
+# at a time). See simplepricers/regime_simulation.py; the library uses its own random streams, so
+# the plotted path above is not one of these paths.
+model = RegimeSwitchingGrowth()
+stats = RecessionStatistics()
+stats.Run(model, 10000, N, seed=seed)
+print('Fraction of months in recession:', stats.GetFractionInRecession())
+print('Recessions per year:', stats.GetRecessionsPerYear())
+print('Mean recession length (months):', stats.GetMeanDuration())
@@ -5,9 +5,9 @@ This file was lifted from the sfc_models repository. Since I am the copyright ho
 projects are under the Apache 2.0 license, I assume that this is not an issue.
 
 Plotting class to generate 2-D charts for examples. This file is the only one (other than another example)
-that depends upon matplotlib. If matplotlib is not imported (that is, not installed), does
-a fall back operation (dump to console, and eventually, a csv). The user can either find a plotting
-function that works, or import the csv data.
+that depends upon matplotlib, which is only imported when a chart is drawn. If matplotlib is not imported
+(that is, not installed), does a fall back operation (write the data as csv). The user can either find a
+plotting function that works, or import the csv data.
 
 I have isolated this so that it is possible to run examples with no external dependencies.
 
@@ -19,6 +19,13 @@ This nodule is largely uncovered by unit tests, as it is interactive. It should
 putting it within sfc_models makes installation instructions simpler. (Users will still need to install matlibplot,
 which can be a tricky install.)
 
+For servers, RenderBatch() renders a list of plots to files with the Agg backend, across a process
+pool. It never calls plt.show(), so it does not block.
+
+Series longer than MaxPoints (default 5000, can be set in the parameter file) are downsampled before
+plotting (min/max per bucket by default, or largest-triangle-three-buckets), since matplotlib is very slow
+with millions of points.
+
 Copyright 2018 Brian Romanchuk
 
 Licensed under the Apache License, Version 2.0 (the "License");
@@ -36,13 +43,42 @@ limitations under the License.
 """
 
 from pprint import pprint
+import csv
 import os
+import sys
+
+from simplepricers.utils import minmax_decimate, lttb
+
+# Cached parameters; see GetParams()
+_Params = None
+# matplotlib.pyplot is only imported when first needed (it is slow to import); see GetPyplot().
+_plt = None
+_plt_loaded = False
+
+
+def GetPyplot():
+    """
+    Returns the matplotlib.pyplot module, importing it on first use. Returns None if matplotlib
+    is not installed.
+    :return: module
+    """
+    global _plt, _plt_loaded
+    if not _plt_loaded:
+        _plt_loaded = True
+        try:
+            import matplotlib.pyplot as plt
+            _plt = plt
+        except ImportError:  # pragma: no cover
+            pprint("Unable to load matplotlib; no graphing output is possible!")
+            _plt = None
+    return _plt
+
 
-try:
-    import matplotlib.pyplot as plt
-except ImportError:  # pragma: no cover
-    pprint("Unable to load matplotlib; no graphing output is possible!")
-    plt = None
+def __getattr__(name):
+    # Keep the old module-level "plt" attribute working, without importing matplotlib at import time.
+    if name == 'plt':
+        return GetPyplot()
+    raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
 
 
 class Quick2DPlotParams(object):
@@ -53,6 +89,10 @@ class Quick2DPlotParams(object):
     FontSize = 11
     Width = 4.5
     Height = 3
+    # Series longer than this are downsampled before plotting. None = never downsample.
+    MaxPoints = 5000
+    # 'minmax' or 'lttb'
+    Downsample = 'minmax'
 
     def ReadFile(self):  # pragma: no cover
         # If we have already read the file, do not do it again.
@@ -80,6 +120,10 @@ class Quick2DPlotParams(object):
                 self.Height = float(val)
             if param == 'fontsize':
                 self.FontSize = float(val)
+            if param == 'max_points':
+                self.MaxPoints = int(val)
+            if param == 'downsample':
+                self.Downsample = val.lower()
 
 
 class Quick2DPlot(object):
@@ -105,60 +149,214 @@ class Quick2DPlot(object):
         self.XTicks = None
         self.OutputDirectory = output_directory
         self.Marker = marker
+        # If None, use the Quick2DPlotParams settings.
+        self.MaxPoints = None
+        self.Downsample = None
         if run_now:
             self.DoPlot()
 
     def DoPlot(self):  # pragma: no cover
+        plt = GetPyplot()
         if plt is None:
-            pprint('Attempted to plot the following data; cannot to do because cannot import matplotlib')
-            if type(self.X[0]) == list:
-                pprint('Series 1')
-                pprint('%s %20s' % ('X', 'Y'))
-                for i in range(0, len(self.X[0])):
-                    pprint('%f %20f' % (self.X[0][i], self.Y[0][i]))
-                pprint('Series 2')
-                pprint('%s %20s' % ('X', 'Y'))
-                for i in range(0, len(self.X[1])):
-                    pprint('%f %20f' % (self.X[1][i], self.Y[1][i]))
-            else:
-                pprint('%s %20s' % ('X', 'Y'))
-                for i in range(0, len(self.X)):
-                    pprint('%f %20f' % (self.X[i], self.Y[i]))
+            pprint('Attempted to plot the data; cannot to do because cannot import matplotlib')
+            if GetParams().OutputDirectory is not None:
+                self.OutputDirectory = GetParams().OutputDirectory
+            self.WriteCSV()
             return
+        params = GetParams()
+        plt.rcParams.update({'font.size': params.FontSize})
+        fig, ax = plt.subplots()
+        self.DrawFigure(fig, ax, params)
+        if params.OutputDirectory is not None:
+            self.OutputDirectory = params.OutputDirectory
+        if (self.OutputDirectory is not None) and (self.FileName is not None):
+            fullname = os.path.join(self.OutputDirectory, self.FileName)
+            pprint('Saving File: {0} dpi={1}'.format(fullname, params.dpi))
+            fig.savefig(fullname, dpi=params.dpi)
+        plt.show()
+
+    def DrawFigure(self, fig, ax, params):
+        """
+        Draw the chart onto an explicit Figure/Axes pair. Does not touch the global pyplot state,
+        so it can be used by both the interactive DoPlot() and the headless RenderBatch().
+        :param fig: matplotlib.figure.Figure
+        :param ax: matplotlib.axes.Axes
+        :param params: Quick2DPlotParams
+        :return: None
+        """
+        X, Y = self.GetPlotData(params)
         if type(self.X[0]) == list:
-            fig, ax = plt.subplots()
-            ax.plot(self.X[0], self.Y[0], marker='o', markersize=4)
-            ax.plot(self.X[1], self.Y[1], marker='^', markersize=4.5)
-            # plt.plot(self.X[0], self.Y[0], self.X[1], self.Y[1], marker='o')
+            ax.plot(X[0], Y[0], marker='o', markersize=4)
+            ax.plot(X[1], Y[1], marker='^', markersize=4.5)
         else:
             if self.Marker is None:
-                plt.plot(self.X, self.Y)
+                ax.plot(X, Y)
             else:
-                plt.plot(self.X, self.Y, marker=self.Marker)
-
+                ax.plot(X, Y, marker=self.Marker)
         if self.XTicks is not None:
-            plt.xticks(self.XTicks[0], self.XTicks[1])
-        params = Quick2DPlotParams()
-        params.ReadFile()
-        plt.rcParams.update({'font.size': params.FontSize})
-        figure = plt.gcf()
-        figure.set_size_inches(4.5, 3)
+            ax.set_xticks(self.XTicks[0])
+            ax.set_xticklabels(self.XTicks[1])
+        fig.set_size_inches(params.Width, params.Height)
         if len(self.Title) > 0:
-            plt.title(self.Title)
-        plt.grid()
+            ax.set_title(self.Title)
+        ax.grid()
         if self.XLabel is not None:
-            plt.xlabel(self.XLabel)
+            ax.set_xlabel(self.XLabel)
         if self.YLabel is not None:
-            plt.ylabel(self.YLabel)
+            ax.set_ylabel(self.YLabel)
         if self.Legend is not None:
-            plt.legend(self.Legend, loc=self.LegendPos)
+            ax.legend(self.Legend, loc=self.LegendPos)
 
+    def GetPlotData(self, params):
+        """
+        Returns the (X, Y) data to plot, downsampled if a series has more than MaxPoints points.
+        :param params: Quick2DPlotParams
+        :return: tuple
+        """
+        max_points = self.MaxPoints
+        if max_points is None:
+            max_points = params.MaxPoints
+        method = self.Downsample
+        if method is None:
+            method = params.Downsample
+        if method == 'minmax':
+            func = minmax_decimate
+        elif method == 'lttb':
+            func = lttb
+        else:
+            raise ValueError('Unknown downsample method: {0}'.format(method))
+        if type(self.X[0]) == list:
+            series = list(zip(self.X, self.Y))
+        else:
+            series = [(self.X, self.Y), ]
+        out_x = []
+        out_y = []
+        for x, y in series:
+            if (max_points is not None) and (len(x) > max_points):
+                x, y = func(x, y, max_points)
+            out_x.append(x)
+            out_y.append(y)
+        if type(self.X[0]) == list:
+            return out_x, out_y
+        return out_x[0], out_y[0]
 
+    def WriteCSV(self, stream=None):
+        """
+        Fallback when matplotlib is not available: write the (full) data as csv.
+
+        If stream is None, writes to a .csv file next to where the chart would have been saved,
+        or to stdout if there is no output file.
+        :param stream: file
+        :return: None
+        """
+        if type(self.X[0]) == list:
+            series = list(zip(self.X, self.Y))
+        else:
+            series = [(self.X, self.Y), ]
+        if stream is None and (self.OutputDirectory is not None) and (self.FileName is not None):
+            fullname = os.path.join(self.OutputDirectory, os.path.splitext(self.FileName)[0] + '.csv')
+            pprint('Saving File: {0}'.format(fullname))
+            with open(fullname, 'w', newline='') as f:
+                self.WriteCSV(f)
+            return
+        if stream is None:
+            stream = sys.stdout
+        writer = csv.writer(stream)
+        header = []
+        for i in range(0, len(series)):
+            header += ['X{0}'.format(i + 1), 'Y{0}'.format(i + 1)]
+        writer.writerow(header)
+        if len(series) == 1:
+            writer.writerows(zip(series[0][0], series[0][1]))
+            return
+        # Series may have different lengths; pad with empty fields.
+        length = max([len(x) for x, y in series])
+        for row in range(0, length):
+            out = []
+            for x, y in series:
+                if row < len(x):
+                    out += [x[row], y[row]]
+                else:
+                    out += ['', '']
+            writer.writerow(out)
 
+    def GetFullFileName(self, params):
+        """
+        Returns the output file name, following the same rules as DoPlot(): the parameter file
+        output directory overrides the object setting.
+        :param params: Quick2DPlotParams
+        :return: str
+        """
+        directory = self.OutputDirectory
         if params.OutputDirectory is not None:
-            self.OutputDirectory = params.OutputDirectory
-        if (self.OutputDirectory is not None) and (self.FileName is not None):
-            fullname = os.path.join(self.OutputDirectory, self.FileName)
-            pprint('Saving File: {0} dpi={1}'.format(fullname, params.dpi))
-            plt.savefig(fullname, dpi=params.dpi)
-        plt.show()
+            directory = params.OutputDirectory
+        if (directory is None) or (self.FileName is None):
+            raise ValueError('Batch rendering requires an output directory and a file name')
+        return os.path.join(directory, self.FileName)
+
+
+def GetParams():
+    """
+    Returns the Quick2DPlotParams, reading the parameter file only on the first call.
+    :return: Quick2DPlotParams
+    """
+    global _Params
+    if _Params is None:
+        _Params = Quick2DPlotParams()
+        _Params.ReadFile()
+    return _Params
+
+
+def RenderToFile(plot, params=None):
+    """
+    Render a single Quick2DPlot object to its file, using the Agg backend and an explicit
+    Figure. Never calls plt.show(), so it does not block.
+    :param plot: Quick2DPlot
+    :param params: Quick2DPlotParams
+    :return: str
+    """
+    # Import here; the Figure class does not need pyplot (or a GUI backend).
+    import matplotlib
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    if params is None:
+        params = GetParams()
+    fullname = plot.GetFullFileName(params)
+    with matplotlib.rc_context({'font.size': params.FontSize}):
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(1, 1, 1)
+        plot.DrawFigure(fig, ax, params)
+        fig.savefig(fullname, dpi=params.dpi)
+    return fullname
+
+
+def _RenderWorker(args):
+    plot, params = args
+    return RenderToFile(plot, params)
+
+
+def RenderBatch(plots, processes=None, params=None):
+    """
+    Headless batch mode: render a list of Quick2DPlot objects (created with run_now=False) to
+    files, in parallel across a process pool.
+
+    The parameter file is parsed once, in the calling process, and passed to the workers.
+
+    If processes == 1, renders in the current process (no pool).
+
+    :param plots: list
+    :param processes: int
+    :param params: Quick2DPlotParams
+    :return: list
+    """
+    if params is None:
+        params = GetParams()
+    # Validate before spinning up the pool, so that errors are reported from this process.
+    for plot in plots:
+        plot.GetFullFileName(params)
+    if processes == 1 or len(plots) < 2:
+        return [RenderToFile(p, params) for p in plots]
+    import multiprocessing
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(_RenderWorker, [(p, params) for p in plots])
@@ -0,0 +1,105 @@
+"""
+simplepricers
+
+Simple fixed income pricing tools.
+
+The main pricing API is available directly from the package (for example, simplepricers.CouponBond),
+but submodules are only imported on first access (PEP 562 module __getattr__). This keeps
+"import simplepricers" cheap for short-lived jobs; in particular, matplotlib is never imported unless a
+chart is drawn.
+
+Each submodule is also available as an attribute (simplepricers.dual, ...). Lower-level helpers (such
+as the dual_*() functions, or monte_carlo.PriceBond()) are not in the package namespace; import them
+from their submodules.
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import importlib
+
+# Submodules, loaded on first access.
+_submodules = ('bonds_curves', 'simple_calendar', 'utils', 'yieldcalculations', 'Quick2DPlot',
+               'approximation', 'backtest', 'curve_fitting', 'dual', 'horizon', 'interpolation',
+               'monte_carlo', 'portfolio', 'pricing_service', 'regime_simulation', 'repricing', 'risk',
+               'spreads', 'surfaces')
+
+# Public name -> submodule that defines it.
+_lazy_attributes = {
+    'Bond': 'bonds_curves',
+    'Consol': 'bonds_curves',
+    'CouponBond': 'bonds_curves',
+    'InflationLinkedBond': 'bonds_curves',
+    'ZeroCurve': 'bonds_curves',
+    'SimpleCalendar360': 'simple_calendar',
+    'Indexation': 'simple_calendar',
+    'Date360': 'simple_calendar',
+    'create_grid': 'utils',
+    'DF': 'yieldcalculations',
+    'DF_exponential': 'yieldcalculations',
+    'ConvertRate': 'yieldcalculations',
+    'ZRfromDF': 'yieldcalculations',
+    'PriceYieldApproximation': 'approximation',
+    'GetPriceYieldApproximation': 'approximation',
+    'Backtest': 'backtest',
+    'ReadCurveHistory': 'backtest',
+    'NelsonSiegelSvenssonCurve': 'curve_fitting',
+    'CurveFitter': 'curve_fitting',
+    'Dual': 'dual',
+    'MakeVariable': 'dual',
+    'PriceBondsAD': 'dual',
+    'PriceBondsFromZeroCurveAD': 'dual',
+    'HorizonAnalysis': 'horizon',
+    'CalcHorizonReturns': 'horizon',
+    'CalcPortfolioHorizonReturns': 'horizon',
+    'LinearInterpolator': 'interpolation',
+    'NaturalCubicInterpolator': 'interpolation',
+    'MonotoneHermiteInterpolator': 'interpolation',
+    'HaltonSequence': 'monte_carlo',
+    'SobolSequence': 'monte_carlo',
+    'RegimeSwitchingRate': 'monte_carlo',
+    'VasicekModel': 'monte_carlo',
+    'DateLattice': 'portfolio',
+    'Portfolio': 'portfolio',
+    'PriceInflationLinkedBonds': 'portfolio',
+    'PricingService': 'pricing_service',
+    'PricingClient': 'pricing_service',
+    'RegimeSwitchingGrowth': 'regime_simulation',
+    'RecessionStatistics': 'regime_simulation',
+    'RepricingGraph': 'repricing',
+    'ScenarioRisk': 'risk',
+    'TailStatistics': 'risk',
+    'SolveZSpreads': 'spreads',
+    'SolveYields': 'spreads',
+    'SolveYieldSpreads': 'spreads',
+    'CalcPriceSurfaces': 'surfaces',
+}
+
+__all__ = sorted(_lazy_attributes.keys())
+
+
+def __getattr__(name):
+    if name in _lazy_attributes:
+        module = importlib.import_module('.' + _lazy_attributes[name], __name__)
+        value = getattr(module, name)
+        # Cache, so that __getattr__ is not called again for this name.
+        globals()[name] = value
+        return value
+    if name in _submodules:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_lazy_attributes.keys()) + list(_submodules))
@@ -0,0 +1,339 @@
+"""
+approximation.py
+
+Chebyshev approximations of the price-yield function of a CouponBond (and its inverse).
+
+For a bond that has its yield inverted many times (for the same value of now), the price is
+fitted once as a Chebyshev series in the yield over a range of yields, and the yield is fitted
+as a series in the price. Evaluating either is a fixed amount of work (Clenshaw's recurrence
+on the coefficients), rather than a root search over the cash flows. Outside the fitted range,
+the exact CouponBond methods are used.
+
+The degree is doubled until the fit is within the requested tolerance. For the price, the error
+is bounded analytically: the price is a sum of cash flows times (1 + y/s)^(-e), which is analytic
+in the yield away from y = -s. If a function is analytic inside the Bernstein ellipse E_rho (the
+ellipse with foci at the ends of the range, and semi-axes summing to rho times the half-width),
+and its modulus there is at most M, the Chebyshev interpolant of degree n is within
+4 M rho^(-n) / (rho - 1) everywhere on the range [Trefethen 2013, Theorem 8.2]. M is bounded
+by summing the largest modulus of each discounted cash flow on the ellipse, which is found at one
+of its ends on the real axis. A (generous) allowance for rounding in evaluating the series is
+added.
+
+The fitted inverse (the yield as a function of the price) only has an estimated error, but each
+yield it returns is checked: if the price fit at that yield is within r of the target price,
+the yield is within (r + price bound) / (minimum |dP/dy| over the range) of the exact answer. If
+that is not within the yield tolerance, the exact solver is used instead.
+
+[Trefethen 2013] L. N. Trefethen, "Approximation Theory and Approximation Practice", SIAM, 2013.
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import math
+import sys
+
+from simplepricers.simple_calendar import ToSerialDay, ToYearFraction
+from simplepricers.utils import illinois_root
+
+
+class ChebyshevFit(object):
+    """
+    Chebyshev series fitted to a function f on [Low, High] (interpolation at the Chebyshev nodes).
+
+    >>> obj = ChebyshevFit(math.exp, 0., 1., 12)
+    >>> abs(obj.GetValue(.3) - math.exp(.3)) < 1e-12
+    True
+    >>> abs(obj.GetSlope(.3) - math.exp(.3)) < 1e-10
+    True
+    """
+    def __init__(self, f, low, high, degree):
+        """
+        :param f: function
+        :param low: float
+        :param high: float
+        :param degree: int
+        """
+        if not high > low:
+            raise ValueError('Range must be increasing')
+        self.Low = float(low)
+        self.High = float(high)
+        self.Degree = int(degree)
+        N = self.Degree + 1
+        nodes = [self.FromUnit(math.cos(math.pi * (k + .5) / N)) for k in range(0, N)]
+        values = [f(x) for x in nodes]
+        self.Coefficients = []
+        for j in range(0, N):
+            total = 0.
+            for k in range(0, N):
+                total += values[k] * math.cos(math.pi * j * (k + .5) / N)
+            self.Coefficients.append(2. * total / N)
+        self.Coefficients[0] /= 2.
+        # Coefficients of the derivative (with respect to the unit variable).
+        deriv = [0., ] * (N + 1)
+        for j in range(N - 1, 0, -1):
+            deriv[j - 1] = deriv[j + 1] + 2. * j * self.Coefficients[j]
+        deriv[0] /= 2.
+        scale = 2. / (self.High - self.Low)
+        self.SlopeCoefficients = [scale * c for c in deriv[0:max(N - 1, 1)]]
+
+    def ToUnit(self, x):
+        return (2. * x - self.Low - self.High) / (self.High - self.Low)
+
+    def FromUnit(self, t):
+        return .5 * (self.Low + self.High) + .5 * (self.High - self.Low) * t
+
+    def Contains(self, x):
+        return self.Low <= x <= self.High
+
+    @staticmethod
+    def Clenshaw(coefficients, t):
+        b1 = 0.
+        b2 = 0.
+        for c in reversed(coefficients[1:]):
+            b1, b2 = 2. * t * b1 - b2 + c, b1
+        return t * b1 - b2 + coefficients[0]
+
+    def GetValue(self, x):
+        """
+        :param x: float
+        :return: float
+        """
+        return self.Clenshaw(self.Coefficients, self.ToUnit(x))
+
+    def GetSlope(self, x):
+        """
+        First derivative.
+        :param x: float
+        :return: float
+        """
+        return self.Clenshaw(self.SlopeCoefficients, self.ToUnit(x))
+
+    def GetAnalyticBound(self, rho, modulus):
+        """
+        Bound on the interpolation error, if the function is analytic inside the Bernstein ellipse
+        E_rho of the range, with modulus at most modulus there. Includes an allowance for rounding.
+        :param rho: float
+        :param modulus: float
+        :return: float
+        """
+        N = len(self.Coefficients)
+        truncation = 4. * modulus * math.exp(-self.Degree * math.log(rho)) / (rho - 1.)
+        rounding = N * N * sys.float_info.epsilon * sum(abs(c) for c in self.Coefficients)
+        return truncation + rounding
+
+    def GetTailEstimate(self):
+        """
+        Sum of the absolute values of the upper quarter of the coefficients (an estimate of the
+        truncation error).
+        :return: float
+        """
+        tail = self.Coefficients[len(self.Coefficients) - max(len(self.Coefficients) // 4, 1):]
+        return sum(abs(c) for c in tail)
+
+
+def FitChebyshev(f, low, high, toler, min_degree=8, max_degree=256, bound=None):
+    """
+    Fit f on [low, high], doubling the degree until the error is below toler. Returns (fit, error).
+    Raises ValueError if max_degree is not enough.
+
+    If bound is given, it is called with each fit, and returns a bound on its error. Otherwise, the
+    error is an estimate: the larger of the maximum error found on a check grid (midway between the
+    fitting nodes, and the ends) and GetTailEstimate().
+
+    >>> fit, error = FitChebyshev(math.sin, 0., 3., 1e-10)
+    >>> error < 1e-10
+    True
+
+    :param f: function
+    :param low: float
+    :param high: float
+    :param toler: float
+    :param min_degree: int
+    :param max_degree: int
+    :param bound: function
+    :return: tuple
+    """
+    degree = min_degree
+    while degree <= max_degree:
+        fit = ChebyshevFit(f, low, high, degree)
+        if bound is not None:
+            error = bound(fit)
+        else:
+            # Check between the fitting nodes, and at the ends.
+            N = degree + 1
+            check = [fit.FromUnit(math.cos(math.pi * k / N)) for k in range(0, N + 1)]
+            error = max(abs(fit.GetValue(x) - f(x)) for x in check)
+            error = max(error, fit.GetTailEstimate())
+        if error < toler:
+            return fit, error
+        degree *= 2
+    raise ValueError('Could not fit to tolerance {0} with degree {1}'.format(toler, max_degree))
+
+
+class PriceYieldApproximation(object):
+    """
+    Chebyshev approximation of CouponBond.GetPrice() (dirty, bond convention) and its inverse,
+    for one bond at one value of now. Yields outside YieldRange (and the corresponding prices)
+    fall back to the exact calculation.
+
+    PriceErrorBound bounds the error of GetPrice() (per 100 face), and GetYield() is within
+    YieldToler of the exact yield (see the module docstring). The price is fitted to within toler,
+    or tighter if needed so that fitted yields can be checked to YieldToler. YieldErrorEstimate is
+    the estimated error of the yield fit, before the Newton step used in GetYield().
+
+    >>> from simplepricers.bonds_curves import CouponBond
+    >>> bond = CouponBond(10., .05, coupon_freq=2)
+    >>> approx = PriceYieldApproximation(bond, 0.)
+    >>> round(approx.GetPrice(.05), 8)
+    100.0
+    >>> round(approx.GetYield(100.), 10)
+    0.05
+    """
+    def __init__(self, bond, now=0., yield_range=(-.01, .2), toler=1e-8, yield_toler=1e-10):
+        """
+        :param bond: CouponBond
+        :param now: float
+        :param yield_range: tuple
+        :param toler: float
+        :param yield_toler: float
+        """
+        self.Bond = bond
+        self.Now = ToYearFraction(now)
+        self.YieldRange = (float(yield_range[0]), float(yield_range[1]))
+        self.YieldToler = yield_toler
+        # The price is a sum of cash flows times (1 + y/Scale)^(-exponent); see GetPrice().
+        self.Scale = 2. if bond.CouponFrequency == 2 else 1.
+        if not self.YieldRange[0] > -self.Scale:
+            raise ValueError('Yield range must be above {0}'.format(-self.Scale))
+        bond.GenerateCashFlows(self.Now)
+        self.CashFlows = list(zip(bond.CashFlows, [self.Scale * t for t in bond.CashFlowDates]))
+        self.MinSlope = self.GetMinSlope()
+        price_toler = toler
+        if self.MinSlope > 0.:
+            price_toler = min(toler, .5 * yield_toler * self.MinSlope)
+        self.Price, self.PriceErrorBound = FitChebyshev(self.GetExactPrice, self.YieldRange[0],
+                                                        self.YieldRange[1], price_toler,
+                                                        bound=self.GetPriceFitBound)
+        # Price is decreasing in the yield.
+        self.PriceRange = (self.Price.GetValue(self.YieldRange[1]), self.Price.GetValue(self.YieldRange[0]))
+
+        def invert(price):
+            # Invert the price fit (not the bond), so the fit itself stays cheap to build. The ends
+            # are handled directly, as rounding can put a node just outside the range.
+            if price <= self.PriceRange[0]:
+                return self.YieldRange[1]
+            if price >= self.PriceRange[1]:
+                return self.YieldRange[0]
+            y, n = illinois_root(self.Price.GetValue, price, self.YieldRange[0], self.YieldRange[1], 1e-14)
+            return y
+
+        self.Yield, self.YieldErrorEstimate = FitChebyshev(invert, self.PriceRange[0], self.PriceRange[1],
+                                                        yield_toler)
+
+    def GetExactPrice(self, yld):
+        return self.Bond.GetPrice(yld, self.Now, price_type='dirty')
+
+    def GetMinSlope(self):
+        """
+        Lower bound for -dP/dy over YieldRange (zero if the price might not be decreasing).
+        Each term of the derivative is monotone in the yield, so is bounded by its value at one
+        of the ends of the range.
+        :return: float
+        """
+        growth = [1. + y / self.Scale for y in self.YieldRange]
+        total = 0.
+        for cf, e in self.CashFlows:
+            ends = [cf * e / self.Scale * pow(g, -e - 1.) for g in growth]
+            total += min(ends) if e > 0. else max(ends)
+        return max(total, 0.)
+
+    def GetPriceFitBound(self, fit):
+        """
+        Bound on the error of a Chebyshev fit to the price over YieldRange (see the module
+        docstring). Tries Bernstein ellipses out to most of the distance to the singularity at
+        y = -Scale, and returns the smallest bound.
+        :param fit: ChebyshevFit
+        :return: float
+        """
+        mid = .5 * (fit.Low + fit.High)
+        half = .5 * (fit.High - fit.Low)
+        # Semi-major axis (in units of half) of the ellipse that touches the singularity.
+        a_max = (mid + self.Scale) / half
+        rho_max = a_max + math.sqrt(a_max * a_max - 1.)
+        best = None
+        for k in range(1, 20):
+            rho = 1. + (rho_max - 1.) * k / 20.
+            a = .5 * (rho + 1. / rho)
+            # |1 + z/Scale| on the ellipse is smallest at its left end, largest at its right end.
+            g_min = (mid - half * a + self.Scale) / self.Scale
+            g_max = (mid + half * a + self.Scale) / self.Scale
+            modulus = sum(abs(cf) * max(pow(g_min, -e), pow(g_max, -e)) for cf, e in self.CashFlows)
+            bound = fit.GetAnalyticBound(rho, modulus)
+            if best is None or bound < best:
+                best = bound
+        return best
+
+    def GetPrice(self, yld):
+        """
+        Dirty price at a bond-convention yield.
+        :param yld: float
+        :return: float
+        """
+        if self.Price.Contains(yld):
+            return self.Price.GetValue(yld)
+        return self.GetExactPrice(yld)
+
+    def GetYield(self, price):
+        """
+        Bond-convention yield for a dirty price. The fitted inverse is polished with one Newton
+        step on the price fit; if the result cannot be shown to be within YieldToler, the exact
+        solver is used.
+        :param price: float
+        :return: float
+        """
+        if self.Yield.Contains(price) and self.MinSlope > 0.:
+            yld = self.Yield.GetValue(price)
+            if self.Price.Contains(yld):
+                yld -= (self.Price.GetValue(yld) - price) / self.Price.GetSlope(yld)
+                if self.Price.Contains(yld):
+                    residual = abs(self.Price.GetValue(yld) - price)
+                    if (residual + self.PriceErrorBound) / self.MinSlope <= self.YieldToler:
+                        return yld
+        return self.Bond.GetYield(self.Now, price, price_type='dirty', guess=(-.5, 1.),
+                                  toler=self.YieldToler)
+
+
+def GetPriceYieldApproximation(bond, now=0., yield_range=(-.01, .2), toler=1e-8):
+    """
+    Returns a PriceYieldApproximation for (bond, now), building it on first use. The approximations
+    are cached on the bond (in its PriceYieldApproximations attribute), keyed on its terms as well
+    as now (its serial day, if it is on the 360-day calendar), so changing the coupon or maturity
+    does not use a stale fit.
+    :param bond: CouponBond
+    :param now: float
+    :param yield_range: tuple
+    :param toler: float
+    :return: PriceYieldApproximation
+    """
+    if bond.PriceYieldApproximations is None:
+        bond.PriceYieldApproximations = {}
+    cache = bond.PriceYieldApproximations
+    now_key = ToSerialDay(now)
+    if now_key is None:
+        now_key = ToYearFraction(now)
+    key = (now_key, bond.Maturity, bond.Coupon, bond.CouponFrequency, tuple(yield_range), toler)
+    if key not in cache:
+        cache[key] = PriceYieldApproximation(bond, now, yield_range, toler)
+    return cache[key]
@@ -0,0 +1,237 @@
+"""
+backtest.py
+
+Historical backtests: revalue a book of bonds over a history of zero curves.
+
+Curve histories are read from CSV files in chunks of dates (ReadCurveHistory()), so the history
+is never all in memory. The file has a header row of curve maturities (tenors, in years), and
+one row per date:
+    date,0.25,1,2,5,10
+    0.,.01,.012,.015,.02,.025
+    ...
+Dates are year fractions. The zero rates on each row are for tenors measured from that date, so
+a cash flow on date d is discounted with ZC.GetDF(d - now). (GetPriceFromZeroCurve() uses
+GetDF(d), so the two agree on the first date if it is 0.)
+
+Each bond's schedule is generated once, at the start date. As now advances, a pointer into the
+schedule skips the payments that have been made, rather than regenerating the cash flows each day.
+Each chunk is priced as a dates x bonds matrix, looking up each distinct cash flow date once per
+curve. Chunks can be priced in an executor (such as a process pool), with a bounded number in
+flight; the P&L is then accumulated in date order and results are yielded chunk by chunk.
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import bisect
+import collections
+import csv
+
+from simplepricers.bonds_curves import ZeroCurve
+from simplepricers.simple_calendar import ToYearFraction
+
+
+def ReadCurveHistory(source, chunk_size=250):
+    """
+    Generator of chunks of a curve history CSV file: each chunk is a list of up to chunk_size
+    (date, maturities, zero rates) tuples, in file order.
+
+    >>> import io
+    >>> text = 'date,1,10\\n0,.02,.03\\n.1,.021,.031\\n.2,.022,.032\\n'
+    >>> [len(c) for c in ReadCurveHistory(io.StringIO(text), chunk_size=2)]
+    [2, 1]
+
+    :param source: str or file
+    :param chunk_size: int
+    :return: generator
+    """
+    if isinstance(source, str):
+        with open(source, 'r', newline='') as f:
+            for chunk in ReadCurveHistory(f, chunk_size):
+                yield chunk
+        return
+    reader = csv.reader(source)
+    header = next(reader)
+    mats = [float(x) for x in header[1:]]
+    chunk = []
+    last_date = None
+    for row in reader:
+        if len(row) == 0:
+            continue
+        date = float(row[0])
+        if last_date is not None and not date > last_date:
+            raise ValueError('Dates must be increasing: {0}'.format(date))
+        last_date = date
+        chunk.append((date, mats, [float(x) for x in row[1:]]))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+
+def PriceCurveChunk(schedules, notionals, chunk, previous_date, interpolation='linear'):
+    """
+    Value each bond on each date of a chunk. Returns (prices, cash): prices is a dates x bonds
+    list of dirty prices, and cash[i] is the cash received (notional * cash flow / 100) after the
+    previous date, up to and including chunk date i.
+
+    A module-level function, so it can be sent to a process pool.
+    :param schedules: list
+    :param notionals: list
+    :param chunk: list
+    :param previous_date: float
+    :param interpolation: str
+    :return: tuple
+    """
+    # Start of the remaining schedule for each bond (first payment after previous_date).
+    pointers = []
+    for dates, flows in schedules:
+        pointers.append(0 if previous_date is None else bisect.bisect_right(dates, previous_date))
+    prices = []
+    cash = []
+    for now, mats, rates in chunk:
+        ZC = ZeroCurve(mats, rates, interpolation=interpolation)
+        received = 0.
+        needed = set()
+        for b, (dates, flows) in enumerate(schedules):
+            p = pointers[b]
+            # Roll the schedule forward: payments on or before now have been made.
+            while p < len(dates) and dates[p] <= now:
+                received += notionals[b] * flows[p] / 100.
+                p += 1
+            pointers[b] = p
+            needed.update(dates[p:])
+        needed = sorted(needed)
+        DFs = dict(zip(needed, ZC.GetDFs([d - now for d in needed])))
+        row = []
+        for b, (dates, flows) in enumerate(schedules):
+            value = 0.
+            for i in range(pointers[b], len(dates)):
+                value += flows[i] * DFs[dates[i]]
+            row.append(value)
+        prices.append(row)
+        cash.append(received)
+    return prices, cash
+
+
+class BacktestChunk(object):
+    """
+    Results for one chunk of dates.
+
+    Prices: dates x bonds dirty prices.
+    Values: book value (sum of notional * price / 100) on each date.
+    Cash: cash received since the previous date.
+    PnL: Value - previous Value + Cash (None on the first date of the backtest).
+    """
+    def __init__(self, dates, prices, values, cash, pnl):
+        self.Dates = dates
+        self.Prices = prices
+        self.Values = values
+        self.Cash = cash
+        self.PnL = pnl
+
+
+class Backtest(object):
+    """
+    Backtest a book of CouponBond objects (with notionals) over a curve history.
+
+    >>> from simplepricers.bonds_curves import CouponBond
+    >>> book = Backtest([CouponBond(2., .05, 1)])
+    >>> chunk = [(0., [0., 5.], [.05, .05]), (1., [0., 5.], [.05, .05])]
+    >>> out = list(book.Run([chunk]))[0]
+    >>> out.Cash
+    [0.0, 0.05]
+    """
+    def __init__(self, bonds, notionals=None, interpolation='linear'):
+        """
+        :param bonds: list
+        :param notionals: list
+        :param interpolation: str
+        """
+        if notionals is None:
+            notionals = [1., ] * len(bonds)
+        if not len(notionals) == len(bonds):
+            raise ValueError('bonds and notionals must be the same length')
+        self.Bonds = list(bonds)
+        self.Notionals = list(notionals)
+        self.Interpolation = interpolation
+        self.Schedules = None
+        self.LastValue = None
+        self.LastDate = None
+
+    def BuildSchedules(self, start):
+        """
+        Generate each bond's schedule once, as of start.
+        :param start: float
+        :return: None
+        """
+        self.Schedules = []
+        for bond in self.Bonds:
+            bond.GenerateCashFlows(start)
+            self.Schedules.append((list(bond.CashFlowDates), list(bond.CashFlows)))
+
+    def Run(self, chunks, executor=None, max_pending=4):
+        """
+        Generator of BacktestChunk results, one per chunk of curves (see ReadCurveHistory()).
+
+        If executor is given, up to max_pending chunks are priced at once in it; otherwise chunks
+        are priced in this process.
+
+        Each run starts afresh: the schedules are rebuilt from the first date, and the first PnL
+        is None (LastValue and LastDate are reset when the generator starts).
+        :param chunks: iterable
+        :param executor: concurrent.futures.Executor
+        :param max_pending: int
+        :return: generator
+        """
+        self.Schedules = None
+        self.LastValue = None
+        self.LastDate = None
+        pending = collections.deque()
+        previous_date = None
+        for chunk in chunks:
+            if len(chunk) == 0:
+                continue
+            if self.Schedules is None:
+                self.BuildSchedules(ToYearFraction(chunk[0][0]))
+            args = (self.Schedules, self.Notionals, chunk, previous_date, self.Interpolation)
+            previous_date = chunk[-1][0]
+            if executor is None:
+                yield self.Accumulate(chunk, PriceCurveChunk(*args))
+                continue
+            pending.append((chunk, executor.submit(PriceCurveChunk, *args)))
+            if len(pending) >= max_pending:
+                chunk, future = pending.popleft()
+                yield self.Accumulate(chunk, future.result())
+        while len(pending) > 0:
+            chunk, future = pending.popleft()
+            yield self.Accumulate(chunk, future.result())
+
+    def Accumulate(self, chunk, priced):
+        prices, cash = priced
+        values = []
+        pnl = []
+        for row, received in zip(prices, cash):
+            value = 0.
+            for n, p in zip(self.Notionals, row):
+                value += n * p / 100.
+            if self.LastValue is None:
+                pnl.append(None)
+            else:
+                pnl.append(value - self.LastValue + received)
+            self.LastValue = value
+            values.append(value)
+        self.LastDate = chunk[-1][0]
+        return BacktestChunk([c[0] for c in chunk], prices, values, cash, pnl)
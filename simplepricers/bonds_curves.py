@@ -24,12 +24,17 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import bisect
 import math
 
-from simplepricers.utils import create_grid
+from simplepricers.utils import _TrackedList, coupon_period_count, warm_solve
+from simplepricers.dual import Dual, dual_exp, dual_log1p
 import simplepricers.yieldcalculations as yc
 from simplepricers.yieldcalculations import DF
-from simplepricers.simple_calendar import Indexation
+from simplepricers.simple_calendar import Indexation, ToSerialDay, ToYearFraction
+from simplepricers.horizon import CalcHorizonReturns
+from simplepricers.interpolation import (LinearInterpolator, NaturalCubicInterpolator,
+                                         MonotoneHermiteInterpolator)
 
 
 class Bond(object):
@@ -39,7 +44,7 @@ class Bond(object):
 
     def __init__(self, mat=None, coupon=None, coupon_freq=None, now=0.):
         """
-        Set parameters for the bond.
+        Set parameters for the bond. Dates may be year fractions or Date360 objects.
 
         Coupon convention: .04 = 4% coupon.
         (Which is a lousy match against the $100 price convention.)
@@ -52,13 +57,22 @@ class Bond(object):
         :param coupon_freq: int
         :param now: float
         """
-        self.Maturity = mat
+        self.Maturity = ToYearFraction(mat)
         self.Coupon = coupon
         self.CouponFrequency = coupon_freq
-        self.Now = now
+        self.Now = ToYearFraction(now)
         self.PriceBase = 100.
         self.CashFlows = None
         self.CashFlowDates = None
+        # Serial days of the cash flows, if the schedule is on the day grid (else None).
+        self.CashFlowDays = None
+        # (now, terms) that CashFlows were generated for; see CouponBond.GenerateCashFlows().
+        self.CashFlowKey = None
+        # Last yield found (used as a seed if warm_start=True), and the work done to find it.
+        self.LastYield = None
+        self.SolverEvaluations = None
+        # Cache used by approximation.GetPriceYieldApproximation().
+        self.PriceYieldApproximations = None
 
     def GetPrice(self, yld, now=None, price_type='dirty', yield_convention='bond'):  # pragma: no cover
         """
@@ -108,7 +122,7 @@ class Consol(Bond):
     """
 
     def __init__(self, coupon, now=0.):
-        self.CheckCouponDate(now)
+        self.CheckCouponDate(ToYearFraction(now))
         Bond.__init__(self, mat='InfinityAndBeyond!', coupon=coupon, coupon_freq=1, now=now)
 
     @staticmethod
@@ -141,6 +155,7 @@ class Consol(Bond):
         """
         if now is None:
             now = self.Now
+        now = ToYearFraction(now)
         self.CheckCouponDate(now)
         if yield_convention != 'bond':
             raise NotImplementedError('Unsupported yield convention!')
@@ -150,35 +165,59 @@ class Consol(Bond):
 
 
 class CouponBond(Bond):
+    # Half-width of the starting bracket around the last solution, for warm starts.
+    WarmStartWidth = .0005
+
     def GenerateCashFlows(self, now=None):
         """
         Generate the cash flow vector.
-        TODO: Optimise this so that recalculation only occurs if 'now' changes.
+
+        The schedule is only rebuilt if now or the bond terms (maturity, coupon, frequency,
+        PriceBase) have changed since the last call, so calling this repeatedly with the same now
+        is cheap.
+
+        If now and the maturity are on a day of the 360-day calendar (see ToSerialDay()), and the
+        coupon period is a whole number of days, the schedule is built in integer serial days
+        (CashFlowDays), and CashFlowDates are converted from them. The cached schedule is then
+        keyed on the serial days, and the same payment day always gives the same date, whichever
+        bond (or representation of now) it came from. Otherwise, the schedule uses year fractions.
 
         :param now: float
         :return: None
         """
         if now is None:
             now = self.Now
-        # TODO: Do an optimisation to skip recalculation.
-        self.Now = now
+        now_day = ToSerialDay(now)
+        self.Now = ToYearFraction(now)
         if self.Now is None:
             raise ValueError('Must set ''now'' to calculate cash flows.')
+        mat_day = ToSerialDay(self.Maturity)
+        period_days = None
+        if now_day is not None and mat_day is not None and 360 % self.CouponFrequency == 0:
+            period_days = 360 // self.CouponFrequency
+            key = (now_day, mat_day, self.Coupon, self.CouponFrequency, self.PriceBase)
+        else:
+            key = (self.Now, self.Maturity, self.Coupon, self.CouponFrequency, self.PriceBase)
+        if self.CashFlows is not None and key == self.CashFlowKey:
+            return
+        self.CashFlowKey = key
+        self.CashFlowDays = None
         # deal with corner case of being beyond maturity date.
         if self.Now >= self.Maturity:
             self.CashFlows = []
             self.CashFlowDates = []
             return
-        # Generate the time axis with create_grid. The trick is that create_grid aligns the
-        # grid to the start date. We need to align the grid to maturity. We accomplish this by
-        # multiplying by -1.  (Try doing that with calendar dates!)
-        minus_t = create_grid(-self.Maturity, -self.Now, self.CouponFrequency)
-        # Go back to positive time...
-        self.CashFlowDates = [-x for x in minus_t]
-        self.CashFlowDates.reverse()
-        # if on top of a payment, pop it out.
-        if self.Now == self.CashFlowDates[0]:
-            self.CashFlowDates.pop(0)
+        if period_days is not None:
+            # Payments strictly after now, in whole coupon periods back from maturity.
+            num_payments = (mat_day - now_day - 1) // period_days + 1
+            self.CashFlowDays = [mat_day - k * period_days for k in range(num_payments - 1, -1, -1)]
+            self.CashFlowDates = [d / 360. for d in self.CashFlowDays]
+        else:
+            # Count the remaining coupon periods with integer arithmetic; payments are aligned to
+            # maturity.
+            num_payments = coupon_period_count(self.Maturity, self.Now, self.CouponFrequency)
+            freq = float(self.CouponFrequency)
+            self.CashFlowDates = [self.Maturity - float(k) / freq for k in range(num_payments - 1, -1, -1)]
         coupon_payment = self.PriceBase * self.Coupon / self.CouponFrequency
         # This creates an empty list if we only have a single payment
         self.CashFlows = [coupon_payment] * (len(self.CashFlowDates) - 1)
@@ -218,6 +257,67 @@ class CouponBond(Bond):
             raise NotImplementedError('Unsupported price_type convention')
         if self.CouponFrequency == 2:
             yld = yc.ConvertRate(yld, '2', '1')
+        return self.GetFlatYieldNPV(yld, now)
+
+    def HasRegularSchedule(self):
+        """
+        Are the cash flows the standard bullet schedule (equal coupons at 1/CouponFrequency
+        intervals back from maturity, plus principal)? Subclasses that change GenerateCashFlows()
+        are treated as irregular.
+        :return: bool
+        """
+        return type(self).GenerateCashFlows is CouponBond.GenerateCashFlows
+
+    def GetFlatYieldNPV(self, yld, now=None):
+        """
+        NPV of the cash flows discounted at a flat annual-compounding yield.
+
+        For a regular schedule, this is a geometric series, and is calculated in closed form
+        without discounting each cash flow: with n payments remaining, the first on date t1,
+        v = (1+y)^(-1/f) and coupon payment C,
+            NPV = C * (1+y)^(-t1) * (1 - v^n)/(1 - v) + 100 * (1+y)^(-maturity).
+        (As in the loop, cash flows are discounted by their date.) This also handles a broken
+        first period (now between coupon dates). Otherwise, loops over the cash flows; Dual yields
+        (see dual.py) also use the loop, which has no special case at a zero yield.
+
+        The payment count and first payment date come from the schedule, so the price is O(1) in
+        the number of payments. GenerateCashFlows() only rebuilds the schedule when now or the
+        terms change, so repeated prices for the same now (as in GetYield()) do not touch it.
+
+        >>> obj = CouponBond(50., .04, coupon_freq=12)
+        >>> round(obj.GetFlatYieldNPV(.04, now=.3), 6) == round(obj.GetFlatYieldNPVLoop(.04, now=.3), 6)
+        True
+
+        :param yld: float
+        :param now: float
+        :return: float
+        """
+        if (not self.HasRegularSchedule()) or yld <= -1. or isinstance(yld, Dual):
+            return self.GetFlatYieldNPVLoop(yld, now)
+        self.GenerateCashFlows(now)
+        num_payments = len(self.CashFlowDates)
+        if num_payments == 0:
+            return 0.
+        freq = float(self.CouponFrequency)
+        t_first = self.CashFlowDates[0]
+        t_last = self.CashFlowDates[-1]
+        log_growth = math.log1p(yld)
+        if log_growth == 0.:
+            annuity = float(num_payments)
+        else:
+            # (1 - v^n)/(1 - v), using expm1() to stay accurate for yields near zero
+            annuity = math.expm1(-num_payments * log_growth / freq) / math.expm1(-log_growth / freq)
+        coupon_payment = self.PriceBase * self.Coupon / self.CouponFrequency
+        return (coupon_payment * math.exp(-t_first * log_growth) * annuity +
+                self.PriceBase * math.exp(-t_last * log_growth))
+
+    def GetFlatYieldNPVLoop(self, yld, now=None):
+        """
+        NPV of the cash flows at a flat annual-compounding yield, discounting each cash flow.
+        :param yld: float
+        :param now: float
+        :return: float
+        """
         self.GenerateCashFlows(now)
         NPV = 0.
         df = yc.DF(self.CashFlowDates, [yld, ] * len(self.CashFlowDates))
@@ -225,14 +325,20 @@ class CouponBond(Bond):
             NPV += df[i] * self.CashFlows[i]
         return NPV
 
-    def GetYield(self, now, price, price_type='clean', yield_convention='bond', guess=(0., .25), toler=1e-6):
+    def GetYield(self, now, price, price_type='clean', yield_convention='bond', guess=(0., .25), toler=1e-6,
+                 warm_start=False):
         """
         Ugly yield calculation...
+
+        If warm_start is True and there is a previous answer for this bond, the solve starts from a
+        tight bracket around it (widened if needed), rather than from guess. Since yields barely move
+        between ticks, this takes a handful of price evaluations instead of ~20.
         :param now: float
         :param price: float
         :param price_type: str
         :param yield_convention: str
         :param guess: tuple
+        :param warm_start: bool
         :return: float
         """
         if yield_convention != 'bond':
@@ -243,27 +349,35 @@ class CouponBond(Bond):
         self.GenerateCashFlows(now)
 
         def get_price(y):
-            NPV = 0.
-            df = yc.DF(self.CashFlowDates, [y, ] * len(self.CashFlowDates))
-            for i in range(0, len(self.CashFlows)):
-                NPV += df[i] * self.CashFlows[i]
-            return NPV
-
-        low, high = guess[0:2]
-        price_lo = get_price(low)
-        price_hi = get_price(high)
-        # Yield downn, price up!
-        if not (price < price_lo) and (price > price_hi):
-            raise ValueError('Answer not bracketed by guess!')
-        yld = (low + high) / 2.
-        while (high-low) > toler:
+            return self.GetFlatYieldNPV(y, now)
+
+        yld = None
+        if warm_start and self.LastYield is not None:
+            try:
+                yld, self.SolverEvaluations = warm_solve(get_price, price, self.LastYield,
+                                                         self.WarmStartWidth, toler, lower=-.99)
+            except ValueError:
+                yld = None
+        if yld is None:
+            low, high = guess[0:2]
+            price_lo = get_price(low)
+            price_hi = get_price(high)
+            # Yield downn, price up!
+            if not (price < price_lo) and (price > price_hi):
+                raise ValueError('Answer not bracketed by guess!')
             yld = (low + high) / 2.
-            estimate = get_price(yld)
-            if price > estimate:
-                # Estimated price is too low -> yield too high
-                high = yld
-            else:
-                low = yld
+            evaluations = 2
+            while (high-low) > toler:
+                yld = (low + high) / 2.
+                estimate = get_price(yld)
+                evaluations += 1
+                if price > estimate:
+                    # Estimated price is too low -> yield too high
+                    high = yld
+                else:
+                    low = yld
+            self.SolverEvaluations = evaluations
+        self.LastYield = yld
         if self.CouponFrequency == 2:
             yld = yc.ConvertRate(yld, '1', '2')
         return yld
@@ -289,14 +403,43 @@ class CouponBond(Bond):
             NPV += df[i] * self.CashFlows[i]
         return NPV
 
+    def GetHorizonReturns(self, now, ZC, horizons):
+        """
+        Carry, roll-down and total return over a list of horizons, off a ZeroCurve with maturities
+        measured from now. See horizon.py.
+        :param now: float
+        :param ZC: ZeroCurve
+        :param horizons: list
+        :return: HorizonAnalysis
+        """
+        return CalcHorizonReturns(self, now, ZC, horizons)
+
 
 class InflationLinkedBond(CouponBond):
     def __init__(self, mat=None, coupon=None, coupon_freq=1, now=0., issue_date=0.):
         super().__init__(mat, coupon, coupon_freq, now)
         self.InflationCurve = Indexation()
         self.InflationCurve.SetIndexValues([issue_date], [1.])
+        self.LastBreakeven = None
+
+    def CalcEconomicBreakeven(self, now, price, ZC, price_type='clean', toler=.00001, guess=(-.05,.1),
+                              warm_start=False):
+        """
+        The inflation rate (InflationCurve extrapolation rate) at which the indexed cash flows,
+        discounted off the nominal curve, are worth price. Leaves InflationCurve.ExtrapolationRate
+        at the answer.
 
-    def CalcEconomicBreakeven(self, now, price, ZC, price_type='clean', toler=.00001, guess=(-.05,.1)):
+        If warm_start is True, start from a tight bracket around the previous answer (see
+        CouponBond.GetYield()).
+        :param now: float
+        :param price: float
+        :param ZC: ZeroCurve
+        :param price_type: str
+        :param toler: float
+        :param guess: tuple
+        :param warm_start: bool
+        :return: float
+        """
         if not price_type=='dirty':
             raise NotImplementedError('Only dirty price supported')
         lo, hi = guess[0:2]
@@ -311,17 +454,30 @@ class InflationLinkedBond(CouponBond):
                 NPV += d_df * cf * self.InflationCurve.GetValue(d)
             return NPV
 
+        if warm_start and self.LastBreakeven is not None:
+            try:
+                mid, self.SolverEvaluations = warm_solve(get_NPV, price, self.LastBreakeven,
+                                                         self.WarmStartWidth, toler, lower=-.99)
+                self.InflationCurve.ExtrapolationRate = mid
+                self.LastBreakeven = mid
+                return mid
+            except ValueError:
+                pass
         mid = (hi + lo)/2.
         if lo >= hi:
             raise ValueError('Invalid initial guess!')
+        evaluations = 0
         while (hi-lo) > toler:
             mid = (hi + lo) / 2.
             NPV = get_NPV(mid)
+            evaluations += 1
             if NPV > price:
                 # NPV too high -> guess too high -> hi=mid
                 hi = mid
             else:
                 lo = mid
+        self.SolverEvaluations = evaluations
+        self.LastBreakeven = mid
         return mid
 
 
@@ -332,17 +488,116 @@ class ZeroCurve(object):
     ZeroCurve object - handles basic nominal discounting
 
     Uses the simple interest rate convention.
+
+    Interpolation schemes (the interpolation argument):
+    'linear': linear on zero rates (the default).
+    'loglinear': linear on the log of discount factors (piecewise flat forwards).
+    'cubic': natural cubic spline on zero rates.
+    'hermite': monotone cubic Hermite on zero rates (no overshoot between nodes).
+
+    Interpolation coefficients are solved when the curve is created, and are rebuilt if the nodes
+    (ZC or Maturities) are changed. Changes are tracked by NodeVersion, which is incremented by any
+    assignment to (or in-place modification of) ZC or Maturities; cached calculations compare
+    versions, rather than the node lists.
+
+    >>> obj = ZeroCurve([0., 1., 2.], [.04, .04, .05], interpolation='loglinear')
+    >>> round(obj.GetDF(1.5), 6) == round(math.sqrt(obj.GetDF(1.) * obj.GetDF(2.)), 6)
+    True
     """
-    def __init__(self, mats=(), ZC=()):
+    InterpolationSchemes = ('linear', 'loglinear', 'cubic', 'hermite')
+    # Half-width of the starting bracket around the last solution, for warm starts.
+    WarmStartWidth = .0005
+
+    def __init__(self, mats=(), ZC=(), interpolation='linear'):
         """
         Initialise the ZeroCurve
         :param ZC: list
         :param mats: list
+        :param interpolation: str
         """
         if not len(ZC) == len(mats):
             raise ValueError('Zero curve and maturities must be equal length')
-        self.ZC = list(ZC)
-        self.Maturities = list(mats)
+        if interpolation not in self.InterpolationSchemes:
+            raise ValueError('Unknown interpolation scheme: {0}'.format(interpolation))
+        self.NodeVersion = 0
+        self.ZC = ZC
+        self.Maturities = mats
+        self.Interpolation = interpolation
+        # Forward curves already calculated, for the NodeVersion in ForwardCacheKey
+        self.ForwardCache = {}
+        self.ForwardCacheKey = None
+        # The interpolator, and the NodeVersion it was built from.
+        self.Interpolator = None
+        self.InterpolatorVersion = None
+        # Last par coupon found for each (maturity, coupon frequency); seeds for warm starts.
+        self.ParCouponCache = {}
+        self.SolverEvaluations = None
+        if len(self.ZC) > 0:
+            self.GetInterpolator()
+
+    @property
+    def ZC(self):
+        """
+        Zero rates at the nodes.
+        :return: list
+        """
+        return self._ZC
+
+    @ZC.setter
+    def ZC(self, values):
+        self._ZC = _TrackedList(values, self._NodesChanged)
+        self._NodesChanged()
+
+    @property
+    def Maturities(self):
+        """
+        Node maturities (sorted).
+        :return: list
+        """
+        return self._Maturities
+
+    @Maturities.setter
+    def Maturities(self, values):
+        self._Maturities = _TrackedList(values, self._NodesChanged)
+        self._NodesChanged()
+
+    def _NodesChanged(self):
+        self.NodeVersion += 1
+
+    def GetInterpolator(self):
+        """
+        Returns the interpolation object, (re)building it if the nodes have changed.
+
+        For 'loglinear', interpolates log(DF); otherwise, interpolates the zero rate.
+        Returns None if there is only one node (the curve is flat).
+        :return: PiecewiseCubic
+        """
+        if self.InterpolatorVersion == self.NodeVersion:
+            return self.Interpolator
+        self.InterpolatorVersion = self.NodeVersion
+        if len(self.Maturities) < 2:
+            self.Interpolator = None
+        elif self.Interpolation == 'linear':
+            self.Interpolator = LinearInterpolator(self.Maturities, self.ZC)
+        elif self.Interpolation == 'loglinear':
+            log_df = [-t * dual_log1p(z) for t, z in zip(self.Maturities, self.ZC)]
+            self.Interpolator = LinearInterpolator(self.Maturities, log_df)
+        elif self.Interpolation == 'cubic':
+            self.Interpolator = NaturalCubicInterpolator(self.Maturities, self.ZC)
+        else:
+            self.Interpolator = MonotoneHermiteInterpolator(self.Maturities, self.ZC)
+        return self.Interpolator
+
+    def CheckMaturity(self, mat):
+        """
+        Raises a ValueError if the maturity is outside of the curve.
+        :param mat: float
+        :return: None
+        """
+        if mat < 0:
+            raise ValueError('Negative maturity - fail')
+        if mat > self.Maturities[-1]:
+            raise ValueError('Maturity longer than longest zero maturity')
 
     def GetZeroRate(self, mat):
         """
@@ -353,23 +608,84 @@ class ZeroCurve(object):
         :param mat: float
         :return: float
         """
-        if mat < 0:
-            raise ValueError('Negative maturity - fail')
-        if mat > self.Maturities[-1]:
-            raise ValueError('Maturity longer than longest zero maturity')
+        self.CheckMaturity(mat)
+        interp = self.GetInterpolator()
         if mat <= self.Maturities[0]:
-            return self.Maturities[0]
-        prev_mat = self.Maturities[0]
-        prev_zero = self.ZC[0]
-        # We already tested for the shortest maturity
-        for pos in range(1, len(self.Maturities)):
-            if self.Maturities[pos] == mat:
-                return self.ZC[pos]
-            if self.Maturities[pos] > mat:
-                fac = (mat - prev_mat)/(self.Maturities[pos] - prev_mat)
-                return ((1-fac)*prev_zero) + (fac*self.ZC[pos])
-            prev_mat = self.Maturities[pos]
-            prev_zero = self.ZC[pos]
+            return self.ZC[0]
+        if self.Interpolation == 'loglinear':
+            return dual_exp(-interp.GetValue(mat) / mat) - 1.
+        return interp.GetValue(mat)
+
+    def GetZeroRates(self, mats):
+        """
+        Zero rates for a list of maturities.
+        :param mats: list
+        :return: list
+        """
+        return [self.GetZeroRate(m) for m in mats]
+
+    def GetNodeDependencies(self, mat):
+        """
+        Positions of the nodes whose zero rate affects the interpolated zero rate at mat.
+
+        For 'linear' and 'loglinear', the nodes at the ends of the segment; for 'hermite', the node
+        slopes also depend on the neighbouring nodes; a natural cubic spline depends on every node.
+        :param mat: float
+        :return: list
+        """
+        self.CheckMaturity(mat)
+        n = len(self.Maturities)
+        if mat <= self.Maturities[0] or n == 1:
+            return [0, ]
+        pos = bisect.bisect_right(self.Maturities, mat) - 1
+        if self.Maturities[pos] == mat:
+            # All schemes pass through the nodes, so only that node matters.
+            return [pos, ]
+        if self.Interpolation in ('linear', 'loglinear'):
+            return [pos, pos + 1]
+        if self.Interpolation == 'hermite':
+            return list(range(max(pos - 1, 0), min(pos + 3, n)))
+        return list(range(0, n))
+
+    def GetDFNodeSensitivities(self, mat):
+        """
+        The discount factor at mat, with its derivatives with respect to the node zero rates that
+        it depends on. Returns (DF, positions, derivatives).
+
+        Only 'linear' and 'loglinear' are supported; the DF then depends on at most two nodes, with
+        interpolation weights w (which sum to 1):
+            'linear': z = sum(w[j] * z[j]), so dDF/dz[j] = -mat * DF * w[j] / (1 + z);
+            'loglinear': log(DF) = sum(w[j] * -t[j] * log(1 + z[j])),
+                so dDF/dz[j] = -DF * w[j] * t[j] / (1 + z[j]).
+
+        >>> obj = ZeroCurve([0., 1., 2.], [.04, .04, .05])
+        >>> df, pos, deriv = obj.GetDFNodeSensitivities(1.5)
+        >>> pos, [round(x, 6) for x in deriv]
+        ([1, 2], [-0.671847, -0.671847])
+
+        :param mat: float
+        :return: tuple
+        """
+        if self.Interpolation not in ('linear', 'loglinear'):
+            raise NotImplementedError('Node sensitivities only supported for linear and loglinear '
+                                      'interpolation')
+        positions = self.GetNodeDependencies(mat)
+        if len(positions) == 1:
+            weights = [1., ]
+        else:
+            pos = positions[0]
+            t0 = self.Maturities[pos]
+            t1 = self.Maturities[pos + 1]
+            w1 = (mat - t0) / (t1 - t0)
+            weights = [1. - w1, w1]
+        z = self.GetZeroRate(mat)
+        df = DF(mat, z)
+        if self.Interpolation == 'linear' or mat <= self.Maturities[0]:
+            # Flat extrapolation before the first node acts like 'linear'.
+            scale = -mat * df / (1. + z)
+            return df, positions, [scale * w for w in weights]
+        derivs = [-df * w * self.Maturities[p] / (1. + self.ZC[p]) for p, w in zip(positions, weights)]
+        return df, positions, derivs
 
     def GetDF(self, mat):
         """
@@ -381,7 +697,132 @@ class ZeroCurve(object):
         r = self.GetZeroRate(mat)
         return DF(mat, r)
 
-    def CalcParCoupon(self, mat, coupon_freq=1, toler=.000001, guess=(None,None)):
+    def GetDFs(self, mats):
+        """
+        Discount factors for a list of maturities. Each distinct maturity is only calculated once.
+        :param mats: list
+        :return: list
+        """
+        cache = {}
+        out = []
+        for m in mats:
+            df = cache.get(m)
+            if df is None:
+                df = self.GetDF(m)
+                cache[m] = df
+            out.append(df)
+        return out
+
+    def GetZeroRateSlope(self, mat):
+        """
+        Derivative of the interpolated zero rate with respect to maturity. Uses the segment to the
+        right of a node, except at the last node. Zero in the flat region before the first node.
+        :param mat: float
+        :return: float
+        """
+        self.CheckMaturity(mat)
+        interp = self.GetInterpolator()
+        if mat < self.Maturities[0] or interp is None:
+            return 0.
+        if self.Interpolation == 'loglinear':
+            if mat == 0.:
+                return 0.
+            log_df = interp.GetValue(mat)
+            return dual_exp(-log_df / mat) * (log_df / (mat * mat) - interp.GetSlope(mat) / mat)
+        return interp.GetSlope(mat)
+
+    def GetForwardCache(self):
+        """
+        Returns the forward curve cache, clearing it if the curve has changed since it was filled.
+        :return: dict
+        """
+        if self.NodeVersion != self.ForwardCacheKey:
+            self.ForwardCache = {}
+            self.ForwardCacheKey = self.NodeVersion
+        return self.ForwardCache
+
+    def GetForwardRates(self, grid, tenor=None):
+        """
+        Period forward rates (annual compounding convention).
+
+        If tenor is None, returns the forwards between successive grid points (one less than the
+        number of grid points). Otherwise, returns the forward from each grid point t to t + tenor.
+
+        The discount factors for all the dates are calculated once, and then ratioed. Results are
+        cached until the curve changes.
+
+        >>> obj = ZeroCurve([0., 1., 2.], [.04, .04, .05])
+        >>> [round(x, 4) for x in obj.GetForwardRates([0., 1., 2.])]
+        [0.04, 0.0601]
+        >>> [round(x, 4) for x in obj.GetForwardRates([0., 1.], tenor=1.)]
+        [0.04, 0.0601]
+
+        :param grid: list
+        :param tenor: float
+        :return: list
+        """
+        cache = self.GetForwardCache()
+        key = ('period', tuple(grid), tenor)
+        if key in cache:
+            return list(cache[key])
+        if tenor is None:
+            starts = list(grid[0:-1])
+            ends = list(grid[1:])
+        else:
+            starts = list(grid)
+            ends = [t + tenor for t in grid]
+        DFs = self.GetDFs(starts + ends)
+        n = len(starts)
+        out = []
+        for i in range(0, n):
+            t1 = starts[i]
+            t2 = ends[i]
+            if not t2 > t1:
+                raise ValueError('Forward period end must be after start')
+            out.append(pow(DFs[i] / DFs[n + i], 1. / (t2 - t1)) - 1.)
+        cache[key] = tuple(out)
+        return out
+
+    def GetInstantaneousForwardRates(self, grid):
+        """
+        Instantaneous forward rates (annual compounding convention): exp(-d log(DF)/dt) - 1.
+
+        Since log(DF(t)) = -t log(1 + z(t)), the derivative is calculated from the zero rate and its
+        slope. Results are cached until the curve changes.
+
+        >>> obj = ZeroCurve([0., 1., 2.], [.04, .04, .05])
+        >>> [round(x, 4) for x in obj.GetInstantaneousForwardRates([.5, 1.5])]
+        [0.04, 0.0601]
+
+        :param grid: list
+        :return: list
+        """
+        cache = self.GetForwardCache()
+        key = ('instantaneous', tuple(grid))
+        if key in cache:
+            return list(cache[key])
+        out = []
+        for t in grid:
+            z = self.GetZeroRate(t)
+            slope = self.GetZeroRateSlope(t)
+            d_log_df = -math.log1p(z) - t * slope / (1. + z)
+            out.append(math.exp(-d_log_df) - 1.)
+        cache[key] = tuple(out)
+        return out
+
+    def CalcParCoupon(self, mat, coupon_freq=1, toler=.000001, guess=(None,None), warm_start=False):
+        """
+        The coupon of a bond (maturity mat) that prices at par off the curve.
+
+        If warm_start is True and this maturity has been solved before on this curve, start from
+        a tight bracket around that answer (see CouponBond.GetYield()).
+        :param mat: float
+        :param coupon_freq: int
+        :param toler: float
+        :param guess: tuple
+        :param warm_start: bool
+        :return: float
+        """
         if not(mat==round(mat)):
             raise NotImplementedError('Non-integer maturities not supported yet')
         # Set bounds; hopefully conservative enough
@@ -397,11 +838,25 @@ class ZeroCurve(object):
         mid = (lo + hi)/2.
         price = 0.
         bond = CouponBond(mat, coupon=mid, coupon_freq=coupon_freq)
+        key = (mat, coupon_freq)
+        if warm_start and key in self.ParCouponCache:
+            def get_price(c):
+                bond.Coupon = c
+                return bond.GetPriceFromZeroCurve(0, self, price_type='dirty')
+            try:
+                mid, self.SolverEvaluations = warm_solve(get_price, 100., self.ParCouponCache[key],
+                                                         self.WarmStartWidth, toler)
+                self.ParCouponCache[key] = mid
+                return mid
+            except ValueError:
+                pass
+        evaluations = 0
         while (hi-lo)>toler:
             mid = (lo+hi)/2.
             bond.Coupon = mid
             # Since we only have dirty prices, that is why we assume an integer number of years
             price = bond.GetPriceFromZeroCurve(0, self, price_type='dirty')
+            evaluations += 1
             if price > 100.:
                 # coupon is too high, so mid becomes upper bound
                 hi = mid
@@ -409,4 +864,6 @@ class ZeroCurve(object):
                 lo = mid
         if abs(price-100.) > .001:
             raise ValueError('Initial guess range does not cover actual value')
+        self.SolverEvaluations = evaluations
+        self.ParCouponCache[key] = mid
         return mid
\ No newline at end of file
@@ -0,0 +1,364 @@
+"""
+curve_fitting.py
+
+Fit Nelson-Siegel-Svensson (NSS) zero curves to bond prices.
+
+The NSS zero rate (continuously compounded) at maturity t is
+    z(t) = b0 + b1 * f1(t/tau1) + b2 * f2(t/tau1) + b3 * f2(t/tau2)
+with f1(x) = (1 - exp(-x))/x and f2(x) = f1(x) - exp(-x). The Nelson-Siegel curve is the special
+case b3 = 0 (and tau2 is not used).
+
+CurveFitter builds the cash flow matrix for the bonds once (a CashFlowMatrix on a DateLattice; see
+portfolio.py), so a candidate curve prices every bond with one discount factor per distinct cash
+flow date and one sparse matrix-vector product. The fit is Levenberg-Marquardt, with the
+Jacobian of the prices with respect to the parameters calculated analytically (including the tau
+parameters). The same fitter can be reused for each new set of prices.
+
+The fitted NelsonSiegelSvenssonCurve has the discounting methods of ZeroCurve (GetZeroRate(),
+GetDF(), GetDFs(), ...), so it can be passed to the bond pricing functions that take a ZeroCurve,
+and can be converted to a ZeroCurve with ToZeroCurve(). As with ZeroCurve, GetZeroRate() uses the
+simple (annual compounding) convention.
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import math
+
+from simplepricers.bonds_curves import ZeroCurve
+from simplepricers.portfolio import Portfolio
+from simplepricers.simple_calendar import ToYearFraction
+import simplepricers.yieldcalculations as yc
+
+
+def _loadings(x):
+    """
+    (f1(x), f2(x), f1'(x), f2'(x)), using series expansions near zero.
+    """
+    if x < 1e-4:
+        f1 = 1. - x / 2. + x * x / 6.
+        d1 = -.5 + x / 3. - x * x / 8.
+        e = 1. - x + x * x / 2.
+    else:
+        e = math.exp(-x)
+        f1 = -math.expm1(-x) / x
+        d1 = (e - f1) / x
+    return f1, f1 - e, d1, d1 + e
+
+
+def solve_linear(A, b):
+    """
+    Solve A x = b (Gaussian elimination with partial pivoting). A is a list of rows.
+
+    >>> solve_linear([[2., 1.], [1., 3.]], [3., 5.])
+    [0.8, 1.4]
+
+    :param A: list
+    :param b: list
+    :return: list
+    """
+    n = len(b)
+    M = [list(A[i]) + [b[i]] for i in range(0, n)]
+    for col in range(0, n):
+        pivot = max(range(col, n), key=lambda r: abs(M[r][col]))
+        if M[pivot][col] == 0.:
+            raise ValueError('Singular matrix')
+        M[col], M[pivot] = M[pivot], M[col]
+        for r in range(col + 1, n):
+            w = M[r][col] / M[col][col]
+            if w != 0.:
+                for c in range(col, n + 1):
+                    M[r][c] -= w * M[col][c]
+    x = [0., ] * n
+    for r in range(n - 1, -1, -1):
+        total = M[r][n]
+        for c in range(r + 1, n):
+            total -= M[r][c] * x[c]
+        x[r] = total / M[r][r]
+    return x
+
+
+class NelsonSiegelSvenssonCurve(object):
+    """
+    NSS zero curve. Parameters are (b0, b1, b2, b3, tau1, tau2).
+
+    >>> obj = NelsonSiegelSvenssonCurve([.04, 0., 0., 0., 1., 5.])
+    >>> round(obj.GetZeroRate(10.), 6) == round(math.exp(.04) - 1., 6)
+    True
+    """
+    ParameterNames = ('b0', 'b1', 'b2', 'b3', 'tau1', 'tau2')
+
+    def __init__(self, params):
+        """
+        :param params: list
+        """
+        if not len(params) == 6:
+            raise ValueError('NSS curve has 6 parameters')
+        if params[4] <= 0. or params[5] <= 0.:
+            raise ValueError('tau parameters must be positive')
+        self.Params = [float(p) for p in params]
+
+    def GetContinuousRate(self, mat):
+        """
+        Continuously compounded zero rate.
+        :param mat: float
+        :return: float
+        """
+        b0, b1, b2, b3, tau1, tau2 = self.Params
+        f1, f2, d1, d2 = _loadings(mat / tau1)
+        g1, g2, e1, e2 = _loadings(mat / tau2)
+        return b0 + b1 * f1 + b2 * f2 + b3 * g2
+
+    def CheckMaturity(self, mat):
+        if mat < 0:
+            raise ValueError('Negative maturity - fail')
+
+    def GetZeroRate(self, mat):
+        """
+        Zero rate (annual compounding, as in ZeroCurve).
+        :param mat: float
+        :return: float
+        """
+        self.CheckMaturity(mat)
+        return math.expm1(self.GetContinuousRate(mat))
+
+    def GetZeroRates(self, mats):
+        return [self.GetZeroRate(m) for m in mats]
+
+    def GetDF(self, mat):
+        """
+        :param mat: float
+        :return: float
+        """
+        self.CheckMaturity(mat)
+        return math.exp(-mat * self.GetContinuousRate(mat))
+
+    def GetDFs(self, mats):
+        return [self.GetDF(m) for m in mats]
+
+    def GetDFGradient(self, mat):
+        """
+        (DF, list of derivatives of the DF with respect to each parameter).
+        :param mat: float
+        :return: tuple
+        """
+        b0, b1, b2, b3, tau1, tau2 = self.Params
+        x1 = mat / tau1
+        x2 = mat / tau2
+        f1, f2, d1, d2 = _loadings(x1)
+        g1, g2, e1, e2 = _loadings(x2)
+        z = b0 + b1 * f1 + b2 * f2 + b3 * g2
+        df = math.exp(-mat * z)
+        # dz/dtau = dz/dx * dx/dtau, with dx/dtau = -x/tau
+        dz = [1., f1, f2, g2, -(b1 * d1 + b2 * d2) * x1 / tau1, -b3 * e2 * x2 / tau2]
+        return df, [-mat * df * g for g in dz]
+
+    def ToZeroCurve(self, mats, interpolation='linear'):
+        """
+        A ZeroCurve with nodes at mats.
+        :param mats: list
+        :param interpolation: str
+        :return: ZeroCurve
+        """
+        return ZeroCurve(list(mats), self.GetZeroRates(mats), interpolation=interpolation)
+
+
+class CurveFitter(object):
+    """
+    Fits an NSS (or Nelson-Siegel) curve to the dirty prices of a list of CouponBond objects, as of
+    now. Curve maturities are measured from now.
+
+    >>> from simplepricers.bonds_curves import CouponBond
+    >>> true_curve = NelsonSiegelSvenssonCurve([.04, -.02, .01, .005, 1.5, 8.])
+    >>> bonds = [CouponBond(float(m), .04, 2) for m in (1, 2, 3, 5, 7, 10, 15, 20, 30)]
+    >>> fitter = CurveFitter(bonds)
+    >>> curve = fitter.Fit(fitter.GetPrices(true_curve))
+    >>> fitter.Converged, fitter.RMSE < 1e-6
+    (True, True)
+    """
+    def __init__(self, bonds, now=0., model='nss'):
+        """
+        :param bonds: list
+        :param now: float
+        :param model: str
+        """
+        if model not in ('nss', 'ns'):
+            raise ValueError('model must be nss or ns')
+        self.Bonds = list(bonds)
+        self.Now = ToYearFraction(now)
+        self.Model = model
+        # Parameters that are fitted (Nelson-Siegel fixes b3 = 0).
+        self.Active = [0, 1, 2, 3, 4, 5] if model == 'nss' else [0, 1, 2, 4]
+        self.Portfolio = Portfolio(self.Bonds)
+        self.Matrix = self.Portfolio.BuildCashFlowMatrix(self.Now)
+        lattice = self.Portfolio.Lattice
+        self.Columns = self.Matrix.GetUsedColumns()
+        self.Tenors = [lattice.GetDate(lattice.Ticks[c]) - self.Now for c in self.Columns]
+        self.Iterations = None
+        self.Converged = None
+        # True if the fit stopped because no downhill step could be found away from a minimum.
+        self.Stalled = None
+        self.RMSE = None
+
+    def GetPrices(self, curve):
+        """
+        Dirty prices of the bonds off curve.
+        :param curve: NelsonSiegelSvenssonCurve
+        :return: list
+        """
+        DFs = [None, ] * self.Matrix.GetNumColumns()
+        for c, t in zip(self.Columns, self.Tenors):
+            DFs[c] = curve.GetDF(t)
+        return self.Matrix.Dot(DFs)
+
+    def GetPricesAndJacobian(self, curve):
+        """
+        Prices, and the Jacobian (one row per bond) with respect to the active parameters.
+        :param curve: NelsonSiegelSvenssonCurve
+        :return: tuple
+        """
+        DFs = [None, ] * self.Matrix.GetNumColumns()
+        grads = [None, ] * self.Matrix.GetNumColumns()
+        for c, t in zip(self.Columns, self.Tenors):
+            df, grad = curve.GetDFGradient(t)
+            DFs[c] = df
+            grads[c] = [grad[k] for k in self.Active]
+        prices = []
+        jacobian = []
+        n = len(self.Active)
+        for cols, amounts in zip(self.Matrix.RowColumns, self.Matrix.RowAmounts):
+            price = 0.
+            row = [0., ] * n
+            for c, a in zip(cols, amounts):
+                price += a * DFs[c]
+                g = grads[c]
+                for k in range(0, n):
+                    row[k] += a * g[k]
+            prices.append(price)
+            jacobian.append(row)
+        return prices, jacobian
+
+    def GetInitialGuess(self, prices):
+        """
+        Starting parameters: flat at the yield of the longest bond, with the slope set by the
+        shortest. The yields are bond convention, so semiannual yields are converted to annual
+        compounding (as the curve zero rates) before taking continuously compounded rates.
+        :param prices: list
+        :return: list
+        """
+        order = sorted(range(0, len(self.Bonds)), key=lambda i: self.Bonds[i].Maturity)
+        short = order[0]
+        long = order[-1]
+        y_short = self.GetAnnualYield(short, prices[short])
+        y_long = self.GetAnnualYield(long, prices[long])
+        b0 = math.log1p(y_long)
+        return [b0, math.log1p(y_short) - b0, 0., 0., 1.5, 8.]
+
+    def GetAnnualYield(self, i, price):
+        """
+        Yield of bond i at a dirty price, with annual compounding.
+        :param i: int
+        :param price: float
+        :return: float
+        """
+        bond = self.Bonds[i]
+        yld = bond.GetYield(self.Now, price, price_type='dirty', guess=(-.5, 1.))
+        if bond.CouponFrequency == 2:
+            yld = yc.ConvertRate(yld, '2', '1')
+        return yld
+
+    def Fit(self, prices, initial=None, weights=None, max_iter=100, toler=1e-12):
+        """
+        Fit to dirty prices (one per bond); minimises the sum of squared (weighted) price errors.
+        Sets Iterations, Converged, Stalled and RMSE (root mean squared price error).
+
+        Converged is set if the decrease in the sum of squared errors falls below toler (relative),
+        or if no downhill step can be found and the gradient is negligible: each column of the
+        (weighted) Jacobian, scaled to unit length, has a dot product with the residuals of at most
+        sqrt(toler) * (1 + sqrt(SSE)). If no downhill step is found and the gradient test fails,
+        Stalled is set instead.
+        :param prices: list
+        :param initial: list
+        :param weights: list
+        :param max_iter: int
+        :param toler: float
+        :return: NelsonSiegelSvenssonCurve
+        """
+        if not len(prices) == len(self.Bonds):
+            raise ValueError('Need one price per bond')
+        if len(self.Bonds) < len(self.Active):
+            raise ValueError('Need at least as many bonds as parameters')
+        if weights is None:
+            weights = [1., ] * len(prices)
+        params = list(self.GetInitialGuess(prices) if initial is None else initial)
+        if self.Model == 'ns':
+            params[3] = 0.
+
+        def evaluate(p):
+            curve = NelsonSiegelSvenssonCurve(p)
+            model, J = self.GetPricesAndJacobian(curve)
+            resid = [w * (m - q) for w, m, q in zip(weights, model, prices)]
+            J = [[w * x for x in row] for w, row in zip(weights, J)]
+            return curve, resid, J, math.fsum(r * r for r in resid)
+
+        curve, resid, J, sse = evaluate(params)
+        lam = 1e-3
+        n = len(self.Active)
+        self.Converged = False
+        self.Stalled = False
+        iteration = 0
+        for iteration in range(1, max_iter + 1):
+            JTJ = [[math.fsum(row[a] * row[b] for row in J) for b in range(0, n)] for a in range(0, n)]
+            JTr = [math.fsum(row[a] * r for row, r in zip(J, resid)) for a in range(0, n)]
+            # Marquardt scaling, with a floor so that a parameter with no effect (such as tau2
+            # when b3 = 0) does not make the system singular.
+            floor = 1e-8 * max(JTJ[a][a] for a in range(0, n))
+            scale = [max(JTJ[a][a], floor) for a in range(0, n)]
+            improved = False
+            while lam < 1e12:
+                A = [[JTJ[a][b] + (lam * scale[a] if a == b else 0.) for b in range(0, n)]
+                     for a in range(0, n)]
+                try:
+                    step = solve_linear(A, [-x for x in JTr])
+                except ValueError:
+                    lam *= 10.
+                    continue
+                trial = list(params)
+                for k, s in zip(self.Active, step):
+                    trial[k] += s
+                if trial[4] <= 0. or trial[5] <= 0.:
+                    lam *= 10.
+                    continue
+                trial_curve, trial_resid, trial_J, trial_sse = evaluate(trial)
+                if trial_sse < sse:
+                    improved = True
+                    break
+                lam *= 10.
+            if not improved:
+                # No downhill step: either at a minimum (to numerical precision), or stuck.
+                grad_size = max(abs(JTr[a]) / math.sqrt(scale[a]) for a in range(0, n))
+                if grad_size <= math.sqrt(toler) * (1. + math.sqrt(sse)):
+                    self.Converged = True
+                else:
+                    self.Stalled = True
+                break
+            decrease = sse - trial_sse
+            params, curve, resid, J, sse = trial, trial_curve, trial_resid, trial_J, trial_sse
+            lam = max(lam / 10., 1e-12)
+            if decrease <= toler * (1. + sse):
+                self.Converged = True
+                break
+        self.Iterations = iteration
+        self.RMSE = math.sqrt(sse / len(prices))
+        return curve
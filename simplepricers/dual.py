@@ -0,0 +1,369 @@
+"""
+dual.py
+
+Forward-mode automatic differentiation, to second order.
+
+A Dual holds a value, with its first and second derivatives with respect to any number of named
+input variables (a truncated second order Taylor expansion; a "hyper-dual" number generalised to
+many variables). Arithmetic on Dual objects applies the chain rule, so running a pricing function
+on Dual inputs returns the price with its gradient and Hessian, in one evaluation.
+
+>>> y = MakeVariable(.05, 'y')
+>>> p = 100. * (1. + y) ** -10
+>>> round(p.Value, 4), round(p.GetDerivative('y'), 4), round(p.GetHessian('y', 'y'), 2)
+(61.3913, -584.6793, 6125.21)
+
+The Python math functions do not accept Dual objects, so the kernels that need to support them
+use dual_pow(), dual_exp(), dual_log() and dual_log1p(), which use the math module for floats.
+The built-in pow() and ** operator work with Dual objects directly.
+
+Comparisons (<, <=, >, >=) use the value only, so branches in the pricing code behave as they do
+for floats. Equality compares the value and the derivatives.
+
+The following flow through with Dual inputs:
+    yieldcalculations.DF() and ConvertRate() (rates);
+    ZeroCurve.GetDF() and GetZeroRate() (node zero rates, 'linear' and 'loglinear' interpolation);
+    Indexation.GetValue() (ExtrapolationRate);
+    CouponBond.GetPrice() and GetPriceFromZeroCurve() (yield, Coupon and curve nodes).
+Dates, maturities and index history values must be floats.
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import math
+
+
+def _pair(a, b):
+    # Hessian entries are symmetric: keyed by the unordered pair of variable names.
+    return frozenset((a, b))
+
+
+class Dual(object):
+    """
+    A value, with first derivatives (Grad: name -> derivative) and second derivatives
+    (Hess: frozenset of the two names -> derivative; a single name for the diagonal).
+    """
+    def __init__(self, value, grad=None, hess=None):
+        """
+        :param value: float
+        :param grad: dict
+        :param hess: dict
+        """
+        self.Value = value
+        self.Grad = {} if grad is None else grad
+        self.Hess = {} if hess is None else hess
+
+    def GetDerivative(self, name):
+        """
+        First derivative with respect to a variable.
+        :param name: str
+        :return: float
+        """
+        return self.Grad.get(name, 0.)
+
+    def GetHessian(self, name1, name2):
+        """
+        Second derivative with respect to two variables (the same name twice for the diagonal).
+        :param name1: str
+        :param name2: str
+        :return: float
+        """
+        return self.Hess.get(_pair(name1, name2), 0.)
+
+    def Chain(self, f0, f1, f2):
+        """
+        Apply a function of one variable, given its value f0 and first and second derivatives
+        (f1, f2) at self.Value.
+        :param f0: float
+        :param f1: float
+        :param f2: float
+        :return: Dual
+        """
+        grad = dict((k, f1 * g) for k, g in self.Grad.items())
+        hess = dict((k, f1 * h) for k, h in self.Hess.items())
+        if not f2 == 0.:
+            names = list(self.Grad)
+            for i, a in enumerate(names):
+                g_a = f2 * self.Grad[a]
+                for b in names[i:]:
+                    key = _pair(a, b)
+                    hess[key] = hess.get(key, 0.) + g_a * self.Grad[b]
+        return Dual(f0, grad, hess)
+
+    def __add__(self, other):
+        if not isinstance(other, Dual):
+            return Dual(self.Value + other, self.Grad, self.Hess)
+        grad = dict(self.Grad)
+        for k, g in other.Grad.items():
+            grad[k] = grad.get(k, 0.) + g
+        hess = dict(self.Hess)
+        for k, h in other.Hess.items():
+            hess[k] = hess.get(k, 0.) + h
+        return Dual(self.Value + other.Value, grad, hess)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Dual(-self.Value, dict((k, -g) for k, g in self.Grad.items()),
+                    dict((k, -h) for k, h in self.Hess.items()))
+
+    def __pos__(self):
+        return self
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        if not isinstance(other, Dual):
+            return Dual(self.Value * other, dict((k, other * g) for k, g in self.Grad.items()),
+                        dict((k, other * h) for k, h in self.Hess.items()))
+        x = self.Value
+        y = other.Value
+        grad = dict((k, y * g) for k, g in self.Grad.items())
+        for k, g in other.Grad.items():
+            grad[k] = grad.get(k, 0.) + x * g
+        hess = dict((k, y * h) for k, h in self.Hess.items())
+        for k, h in other.Hess.items():
+            hess[k] = hess.get(k, 0.) + x * h
+        # Cross terms: d2(xy)/da db includes x_a y_b + x_b y_a (2 x_a y_a on the diagonal).
+        for a, g_a in self.Grad.items():
+            for b, g_b in other.Grad.items():
+                key = _pair(a, b)
+                term = g_a * g_b
+                hess[key] = hess.get(key, 0.) + (2. * term if a == b else term)
+        return Dual(x * y, grad, hess)
+
+    __rmul__ = __mul__
+
+    def Reciprocal(self):
+        x = self.Value
+        inv = 1. / x
+        return self.Chain(inv, -inv * inv, 2. * inv * inv * inv)
+
+    def __truediv__(self, other):
+        if not isinstance(other, Dual):
+            return self * (1. / other)
+        return self * other.Reciprocal()
+
+    def __rtruediv__(self, other):
+        return self.Reciprocal() * other
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    def __pow__(self, power):
+        if isinstance(power, Dual):
+            return dual_exp(power * dual_log(self))
+        x = self.Value
+        if power == 0:
+            return Dual(1.)
+        f0 = math.pow(x, power)
+        f1 = power * math.pow(x, power - 1)
+        f2 = power * (power - 1) * math.pow(x, power - 2) if not power == 1 else 0.
+        return self.Chain(f0, f1, f2)
+
+    def __rpow__(self, base):
+        return dual_exp(self * math.log(base))
+
+    def __abs__(self):
+        return -self if self.Value < 0 else self
+
+    def __lt__(self, other):
+        return self.Value < _value(other)
+
+    def __le__(self, other):
+        return self.Value <= _value(other)
+
+    def __gt__(self, other):
+        return self.Value > _value(other)
+
+    def __ge__(self, other):
+        return self.Value >= _value(other)
+
+    def __eq__(self, other):
+        if not isinstance(other, Dual):
+            return self.Value == other and len(self.Grad) == 0 and len(self.Hess) == 0
+        return self.Value == other.Value and self.Grad == other.Grad and self.Hess == other.Hess
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.Value)
+
+    def __repr__(self):
+        return 'Dual({0!r}, {1!r}, {2!r})'.format(self.Value, self.Grad, self.Hess)
+
+
+def _value(x):
+    return x.Value if isinstance(x, Dual) else x
+
+
+def MakeVariable(value, name):
+    """
+    An input variable: a Dual with a derivative of 1 with respect to itself.
+    :param value: float
+    :param name: str
+    :return: Dual
+    """
+    return Dual(value, {name: 1.})
+
+
+def dual_pow(x, y):
+    """
+    math.pow(), extended to Dual arguments.
+    :param x: float
+    :param y: float
+    :return: float
+    """
+    if isinstance(x, Dual) or isinstance(y, Dual):
+        return x ** y
+    return math.pow(x, y)
+
+
+def dual_exp(x):
+    """
+    math.exp(), extended to Dual arguments.
+    :param x: float
+    :return: float
+    """
+    if isinstance(x, Dual):
+        f = math.exp(x.Value)
+        return x.Chain(f, f, f)
+    return math.exp(x)
+
+
+def dual_log(x):
+    """
+    math.log(), extended to Dual arguments.
+    :param x: float
+    :return: float
+    """
+    if isinstance(x, Dual):
+        inv = 1. / x.Value
+        return x.Chain(math.log(x.Value), inv, -inv * inv)
+    return math.log(x)
+
+
+def dual_log1p(x):
+    """
+    math.log1p(), extended to Dual arguments.
+    :param x: float
+    :return: float
+    """
+    if isinstance(x, Dual):
+        inv = 1. / (1. + x.Value)
+        return x.Chain(math.log1p(x.Value), inv, -inv * inv)
+    return math.log1p(x)
+
+
+def dual_expm1(x):
+    """
+    math.expm1(), extended to Dual arguments.
+    :param x: float
+    :return: float
+    """
+    if isinstance(x, Dual):
+        f = math.exp(x.Value)
+        return x.Chain(math.expm1(x.Value), f, f)
+    return math.expm1(x)
+
+
+def _get_bond_state(bond):
+    # The attributes that pricing with a Dual coupon changes (see _set_bond_state()).
+    return bond.Coupon, bond.Now, bond.CashFlows, bond.CashFlowDates, bond.CashFlowDays, bond.CashFlowKey
+
+
+def _set_bond_state(bond, state):
+    bond.Coupon, bond.Now, bond.CashFlows, bond.CashFlowDates, bond.CashFlowDays, bond.CashFlowKey = state
+
+
+def PriceBondsAD(bonds, yields, now=None):
+    """
+    Dirty prices of a list of CouponBond objects at bond-convention yields, as Dual objects with
+    derivatives with respect to 'yield' and 'coupon' (each bond's own), including the cross-gamma.
+
+    The bonds are left as they were (their coupons, cash flows and now are restored), so no Dual
+    objects are left behind in them.
+
+    >>> from simplepricers.bonds_curves import CouponBond
+    >>> out = PriceBondsAD([CouponBond(10., .05, 2)], [.05])
+    >>> round(out[0].Value, 6), round(-out[0].GetDerivative('yield') / out[0].Value, 4)
+    (100.0, 7.7946)
+
+    :param bonds: list
+    :param yields: list
+    :param now: float
+    :return: list
+    """
+    if not len(bonds) == len(yields):
+        raise ValueError('bonds and yields must be the same length')
+    out = []
+    for bond, yld in zip(bonds, yields):
+        state = _get_bond_state(bond)
+        bond.Coupon = MakeVariable(bond.Coupon, 'coupon')
+        try:
+            out.append(bond.GetPrice(MakeVariable(yld, 'yield'), now, price_type='dirty'))
+        finally:
+            _set_bond_state(bond, state)
+    return out
+
+
+def PriceBondsFromZeroCurveAD(bonds, ZC, now=None):
+    """
+    Dirty prices of a list of CouponBond objects off a ZeroCurve, as Dual objects with derivatives
+    with respect to the node zero rates (named by node position: 0, 1, ...) and 'coupon' (each
+    bond's own).
+
+    The discount factors (with their node derivatives) for each distinct cash flow date are
+    calculated once, and shared by all the bonds. As with PriceBondsAD(), the bonds are left as
+    they were.
+
+    >>> from simplepricers.bonds_curves import CouponBond, ZeroCurve
+    >>> ZC = ZeroCurve([0., 1., 2.], [.04, .04, .05])
+    >>> out = PriceBondsFromZeroCurveAD([CouponBond(1.5, .04, 2)], ZC, 0.)
+    >>> [round(out[0].GetDerivative(i), 4) for i in range(0, 3)]
+    [-0.4714, -70.849, -68.5284]
+
+    :param bonds: list
+    :param ZC: ZeroCurve
+    :param now: float
+    :return: list
+    """
+    nodes = [MakeVariable(z, i) for i, z in enumerate(ZC.ZC)]
+    curve = type(ZC)(ZC.Maturities, nodes, interpolation=ZC.Interpolation)
+    schedules = []
+    dates = set()
+    for bond in bonds:
+        state = _get_bond_state(bond)
+        bond.Coupon = MakeVariable(bond.Coupon, 'coupon')
+        try:
+            bond.GenerateCashFlows(now)
+            schedules.append((bond.CashFlowDates, bond.CashFlows))
+        finally:
+            _set_bond_state(bond, state)
+        dates.update(schedules[-1][0])
+    dates = sorted(dates)
+    DFs = dict(zip(dates, curve.GetDFs(dates)))
+    out = []
+    for cf_dates, flows in schedules:
+        total = Dual(0.)
+        for d, cf in zip(cf_dates, flows):
+            total = total + cf * DFs[d]
+        out.append(total)
+    return out
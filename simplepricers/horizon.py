@@ -0,0 +1,147 @@
+"""
+horizon.py
+
+Carry and roll-down analysis over a set of horizons.
+
+For a bond priced off a ZeroCurve at now (curve maturities measured from now), and a horizon h:
+    P0 = sum(cf * DF(d - now)), over the cash flows after now (the dirty price today);
+    Cash(h) = sum(cf), over the cash flows in (now, now + h] (received, not reinvested);
+    Forward(h) = sum(cf * DF(d - now) / DF(h)), over the cash flows after now + h: the price at the
+        horizon if the forward rates are realised;
+    Rolled(h) = sum(cf * DF(d - now - h)), over the cash flows after now + h: the price at the
+        horizon if the curve is unchanged (the bond "rolls down" the curve).
+The components are
+    Carry(h) = Forward(h) + Cash(h) - P0
+    RollDown(h) = Rolled(h) - Forward(h)
+    TotalReturn(h) = Carry(h) + RollDown(h) = Rolled(h) + Cash(h) - P0.
+
+The schedule is generated once. Horizons are processed in increasing order, with a pointer into
+the schedule that only moves forward, so each horizon only drops the payments since the last
+one. All the discount factors needed (for every horizon) are looked up in one ZC.GetDFs() call.
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from simplepricers.simple_calendar import ToYearFraction
+
+
+class HorizonAnalysis(object):
+    """
+    Results, in the order of Horizons. Price is P0; the other attributes are lists (see the
+    module docstring).
+    """
+    def __init__(self, horizons, price, cash, forward, rolled):
+        self.Horizons = horizons
+        self.Price = price
+        self.Cash = cash
+        self.Forward = forward
+        self.Rolled = rolled
+        self.Carry = [f + c - price for f, c in zip(forward, cash)]
+        self.RollDown = [r - f for r, f in zip(rolled, forward)]
+        self.TotalReturn = [r + c - price for r, c in zip(rolled, cash)]
+
+
+def CalcScheduleHorizons(dates, flows, now, ZC, horizons):
+    """
+    Horizon analysis for a cash flow schedule (dates after now, in order).
+    :param dates: list
+    :param flows: list
+    :param now: float
+    :param ZC: ZeroCurve
+    :param horizons: list
+    :return: HorizonAnalysis
+    """
+    if len(horizons) > 0 and min(horizons) < 0.:
+        raise ValueError('Horizons must not be negative')
+    order = sorted(range(0, len(horizons)), key=lambda i: horizons[i])
+    # Gather every tenor needed, then discount them all at once.
+    tenors = [d - now for d in dates]
+    pointers = {}
+    p = 0
+    for i in order:
+        h = horizons[i]
+        while p < len(dates) and dates[p] <= now + h:
+            p += 1
+        pointers[i] = p
+        tenors.append(h)
+        tenors.extend(d - now - h for d in dates[p:])
+    DFs = ZC.GetDFs(tenors)
+    n = len(dates)
+    price = sum(cf * df for cf, df in zip(flows, DFs[0:n]))
+    cash = [0., ] * len(horizons)
+    forward = [0., ] * len(horizons)
+    rolled = [0., ] * len(horizons)
+    pos = n
+    received = 0.
+    last = 0
+    for i in order:
+        p = pointers[i]
+        # Only the payments since the last horizon are added.
+        received += sum(flows[last:p])
+        last = p
+        cash[i] = received
+        df_h = DFs[pos]
+        pos += 1
+        forward[i] = sum(cf * df for cf, df in zip(flows[p:], DFs[p:n])) / df_h
+        rolled[i] = sum(cf * df for cf, df in zip(flows[p:], DFs[pos:pos + n - p]))
+        pos += n - p
+    return HorizonAnalysis(list(horizons), price, cash, forward, rolled)
+
+
+def CalcHorizonReturns(bond, now, ZC, horizons):
+    """
+    Carry, roll-down and total return (per 100 face) of a CouponBond over each horizon.
+
+    >>> from simplepricers.bonds_curves import CouponBond, ZeroCurve
+    >>> res = CalcHorizonReturns(CouponBond(5., .05, 1), 0., ZeroCurve([0., 10.], [.05, .05]), [1.])
+    >>> abs(res.RollDown[0]) < 1e-10, round(res.Carry[0], 6)
+    (True, 5.0)
+
+    :param bond: CouponBond
+    :param now: float
+    :param ZC: ZeroCurve
+    :param horizons: list
+    :return: HorizonAnalysis
+    """
+    now = ToYearFraction(now)
+    bond.GenerateCashFlows(now)
+    return CalcScheduleHorizons(list(bond.CashFlowDates), list(bond.CashFlows), now, ZC, horizons)
+
+
+def CalcPortfolioHorizonReturns(bonds, notionals, now, ZC, horizons):
+    """
+    Horizon analysis for a book: each component is the sum of notional * component / 100.
+    :param bonds: list
+    :param notionals: list
+    :param now: float
+    :param ZC: ZeroCurve
+    :param horizons: list
+    :return: HorizonAnalysis
+    """
+    if not len(bonds) == len(notionals):
+        raise ValueError('bonds and notionals must be the same length')
+    price = 0.
+    cash = [0., ] * len(horizons)
+    forward = [0., ] * len(horizons)
+    rolled = [0., ] * len(horizons)
+    for bond, notional in zip(bonds, notionals):
+        res = CalcHorizonReturns(bond, now, ZC, horizons)
+        w = notional / bond.PriceBase
+        price += w * res.Price
+        for i in range(0, len(horizons)):
+            cash[i] += w * res.Cash[i]
+            forward[i] += w * res.Forward[i]
+            rolled[i] += w * res.Rolled[i]
+    return HorizonAnalysis(list(horizons), price, cash, forward, rolled)
@@ -0,0 +1,178 @@
+"""
+interpolation.py
+
+One-dimensional interpolation schemes, used by ZeroCurve.
+
+All schemes are stored as piecewise cubic polynomials: on segment i (x[i] <= x <= x[i+1]),
+with dx = x - x[i],
+    y = A[i] + B[i]*dx + C[i]*dx^2 + D[i]*dx^3
+The coefficients are solved once when the object is created, so evaluating a point is a binary
+search plus a polynomial evaluation.
+
+The interpolators do not extrapolate; the caller is expected to deal with points outside [x[0], x[-1]].
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import bisect
+
+
+class PiecewiseCubic(object):
+    """
+    Base class: evaluation of the piecewise cubic. Subclasses fill in the coefficients in
+    CalcCoefficients().
+    """
+    def __init__(self, x, y):
+        """
+        :param x: list
+        :param y: list
+        """
+        if not len(x) == len(y):
+            raise ValueError('x and y must be the same length')
+        if len(x) < 2:
+            raise ValueError('Need at least two points to interpolate')
+        for i in range(1, len(x)):
+            if not x[i] > x[i - 1]:
+                raise ValueError('x must be strictly increasing')
+        self.X = list(x)
+        self.Y = list(y)
+        n = len(x) - 1
+        self.A = list(self.Y[0:n])
+        self.B = [0., ] * n
+        self.C = [0., ] * n
+        self.D = [0., ] * n
+        self.CalcCoefficients()
+
+    def CalcCoefficients(self):  # pragma: no cover
+        raise NotImplementedError('Must be implemented by the subclass')
+
+    def GetSegmentSlopes(self):
+        """
+        The slope of the straight line between each pair of points.
+        :return: list
+        """
+        return [(self.Y[i + 1] - self.Y[i]) / (self.X[i + 1] - self.X[i]) for i in range(0, len(self.X) - 1)]
+
+    def FindSegment(self, x):
+        """
+        Segment containing x. Points on a node use the segment to the right (except the last node).
+        :param x: float
+        :return: int
+        """
+        if x < self.X[0] or x > self.X[-1]:
+            raise ValueError('Point outside interpolation range')
+        pos = bisect.bisect_right(self.X, x) - 1
+        return min(pos, len(self.X) - 2)
+
+    def GetValue(self, x):
+        """
+        :param x: float
+        :return: float
+        """
+        i = self.FindSegment(x)
+        dx = x - self.X[i]
+        return self.A[i] + dx * (self.B[i] + dx * (self.C[i] + dx * self.D[i]))
+
+    def GetSlope(self, x):
+        """
+        First derivative.
+        :param x: float
+        :return: float
+        """
+        i = self.FindSegment(x)
+        dx = x - self.X[i]
+        return self.B[i] + dx * (2. * self.C[i] + 3. * dx * self.D[i])
+
+    def GetValues(self, xs):
+        """
+        Evaluate a list of points.
+        :param xs: list
+        :return: list
+        """
+        return [self.GetValue(x) for x in xs]
+
+
+class LinearInterpolator(PiecewiseCubic):
+    """
+    Linear interpolation.
+
+    >>> obj = LinearInterpolator([0., 1., 3.], [1., 2., 0.])
+    >>> obj.GetValues([0., .5, 1., 2.])
+    [1.0, 1.5, 2.0, 1.0]
+    """
+    def CalcCoefficients(self):
+        self.B = self.GetSegmentSlopes()
+
+
+class NaturalCubicInterpolator(PiecewiseCubic):
+    """
+    Natural cubic spline (second derivative is zero at both ends). The second derivatives at the nodes
+    are found with a tridiagonal solve.
+
+    >>> obj = NaturalCubicInterpolator([0., 1., 2.], [0., 1., 0.])
+    >>> obj.GetValues([0., .5, 1., 2.])
+    [0.0, 0.6875, 1.0, 0.0]
+    """
+    def CalcCoefficients(self):
+        n = len(self.X) - 1
+        h = [self.X[i + 1] - self.X[i] for i in range(0, n)]
+        d = self.GetSegmentSlopes()
+        # Second derivatives M[0..n]; M[0] = M[n] = 0. Solve for M[1..n-1] (Thomas algorithm).
+        M = [0., ] * (n + 1)
+        if n > 1:
+            diag = [2. * (h[i - 1] + h[i]) for i in range(1, n)]
+            rhs = [6. * (d[i] - d[i - 1]) for i in range(1, n)]
+            # Forward sweep; the sub- and super-diagonals are h[i-1] and h[i].
+            for k in range(1, n - 1):
+                w = h[k] / diag[k - 1]
+                diag[k] -= w * h[k]
+                rhs[k] -= w * rhs[k - 1]
+            M[n - 1] = rhs[-1] / diag[-1]
+            for k in range(n - 3, -1, -1):
+                M[k + 1] = (rhs[k] - h[k + 1] * M[k + 2]) / diag[k]
+        for i in range(0, n):
+            self.B[i] = d[i] - h[i] * (2. * M[i] + M[i + 1]) / 6.
+            self.C[i] = M[i] / 2.
+            self.D[i] = (M[i + 1] - M[i]) / (6. * h[i])
+
+
+class MonotoneHermiteInterpolator(PiecewiseCubic):
+    """
+    Monotone cubic Hermite interpolation (Fritsch-Carlson, with the Fritsch-Butland slope formula).
+    The interpolant does not overshoot: it is monotone wherever the data are, and local extrema only
+    occur at nodes.
+
+    >>> obj = MonotoneHermiteInterpolator([0., 1., 2., 3.], [0., 1., 1., 2.])
+    >>> obj.GetValues([.5, 1.5, 2.5])
+    [0.625, 1.0, 1.375]
+    """
+    def CalcCoefficients(self):
+        n = len(self.X) - 1
+        h = [self.X[i + 1] - self.X[i] for i in range(0, n)]
+        d = self.GetSegmentSlopes()
+        m = [0., ] * (n + 1)
+        m[0] = d[0]
+        m[n] = d[n - 1]
+        for k in range(1, n):
+            if d[k - 1] * d[k] <= 0.:
+                m[k] = 0.
+            else:
+                w1 = 2. * h[k] + h[k - 1]
+                w2 = h[k] + 2. * h[k - 1]
+                m[k] = (w1 + w2) / (w1 / d[k - 1] + w2 / d[k])
+        for i in range(0, n):
+            self.B[i] = m[i]
+            self.C[i] = (3. * d[i] - 2. * m[i] - m[i + 1]) / h[i]
+            self.D[i] = (m[i] + m[i + 1] - 2. * d[i]) / (h[i] * h[i])
@@ -0,0 +1,545 @@
+"""
+portfolio.py
+
+Portfolio-level pricing.
+
+Almost all bonds pay on a shared lattice of dates: multiples of 1/frequency back from maturity.
+Rather than discounting the same dates over and over for each bond, the portfolio maps every
+cash flow date onto integer "ticks" of a common DateLattice, aggregates the cash flows into a sparse
+bond x date matrix (CashFlowMatrix), and prices the whole book as one matrix-vector product
+against the discount factors for the lattice dates. Bonds whose dates are not on the lattice
+(such as a maturity of 7.3 years on a monthly lattice) are kept out of the matrix and priced
+one at a time off their own cash flow dates.
+
+The sensitivities of the prices to the ZeroCurve nodes (GetNodeJacobian()) use the same matrix:
+each lattice date's DF depends on at most two nodes (for linear or loglinear interpolation), so
+the derivatives are found once per date and spread over the bonds that pay on it.
+
+PriceInflationLinkedBonds() values a book of linkers, sharing index lookups and discount factors
+across bonds.
+
+Sparse matrices are held as lists (one list of column positions and one of amounts per row);
+a book has a few hundred distinct dates at most, and the lists keep the module free of NumPy.
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import math
+
+from simplepricers.horizon import CalcPortfolioHorizonReturns
+from simplepricers.simple_calendar import ToYearFraction
+
+
+class DateLattice(object):
+    """
+    A common grid of dates, at multiples of 1/Frequency years. Dates are identified by an integer
+    "tick" (date * Frequency), so date comparisons are exact.
+
+    Only the ticks that are actually used are given a column; columns are allocated in the order
+    that ticks are first seen.
+
+    >>> lat = DateLattice(12)
+    >>> lat.GetTick(2.5)
+    30
+    >>> lat.GetBondTicks(2., .5, 2)
+    [12, 18, 24]
+    """
+    def __init__(self, frequency=12, toler=1e-7):
+        """
+        :param frequency: int
+        :param toler: float
+        """
+        self.Frequency = int(frequency)
+        self.Toler = toler
+        self.Ticks = []
+        self.Columns = {}
+
+    def GetTick(self, date):
+        """
+        Convert a date to an integer tick. Raises ValueError if the date is not on the lattice.
+        :param date: float
+        :return: int
+        """
+        scaled = float(date) * self.Frequency
+        tick = int(round(scaled))
+        if abs(scaled - tick) > self.Toler:
+            raise ValueError('Date {0} is not on the lattice (frequency={1})'.format(date, self.Frequency))
+        return tick
+
+    def GetDate(self, tick):
+        """
+        Convert a tick back to a date.
+        :param tick: int
+        :return: float
+        """
+        return float(tick) / self.Frequency
+
+    def GetBondTicks(self, maturity, now, coupon_freq):
+        """
+        Return the ticks of the coupon payments strictly after now, in date order.
+
+        Only integer arithmetic is used for the schedule; now is only used to cut off payments
+        that have already occurred.
+        :param maturity: float
+        :param now: float
+        :param coupon_freq: int
+        :return: list
+        """
+        if self.Frequency % coupon_freq != 0:
+            raise ValueError('Coupon frequency {0} does not divide lattice frequency {1}'.format(
+                coupon_freq, self.Frequency))
+        step = self.Frequency // coupon_freq
+        mat_tick = self.GetTick(maturity)
+        now_scaled = float(now) * self.Frequency
+        now_tick = int(round(now_scaled))
+        if abs(now_scaled - now_tick) <= self.Toler:
+            # now is on the lattice; the payment on now has been made.
+            last_paid = now_tick
+        else:
+            last_paid = int(math.floor(now_scaled))
+        if mat_tick <= last_paid:
+            return []
+        # Number of payments = number of k >= 0 with mat_tick - k*step > last_paid
+        num = (mat_tick - last_paid - 1) // step + 1
+        return [mat_tick - k * step for k in range(num - 1, -1, -1)]
+
+    def GetColumn(self, tick):
+        """
+        Returns the column for a tick, allocating a new one if needed.
+        :param tick: int
+        :return: int
+        """
+        col = self.Columns.get(tick)
+        if col is None:
+            col = len(self.Ticks)
+            self.Columns[tick] = col
+            self.Ticks.append(tick)
+        return col
+
+    def GetDates(self):
+        """
+        Dates associated with each column.
+        :return: list
+        """
+        return [self.GetDate(t) for t in self.Ticks]
+
+
+class CashFlowMatrix(object):
+    """
+    Sparse bond x date matrix of cash flows. Row i holds the cash flows of bond i; the columns are
+    those of a DateLattice.
+
+    OffLattice lists the rows of bonds whose dates are not on the lattice; those rows are empty,
+    and the bonds are priced off their own cash flows (see Portfolio.GetPricesFromZeroCurve()).
+    """
+    def __init__(self, lattice):
+        """
+        :param lattice: DateLattice
+        """
+        self.Lattice = lattice
+        self.RowColumns = []
+        self.RowAmounts = []
+        self.OffLattice = []
+
+    def AddRow(self, columns, amounts):
+        """
+        Add a row; returns the row number.
+        :param columns: list
+        :param amounts: list
+        :return: int
+        """
+        if not len(columns) == len(amounts):
+            raise ValueError('columns and amounts must be the same length')
+        self.RowColumns.append(list(columns))
+        self.RowAmounts.append(list(amounts))
+        return len(self.RowColumns) - 1
+
+    def GetNumRows(self):
+        return len(self.RowColumns)
+
+    def GetNumColumns(self):
+        return len(self.Lattice.Ticks)
+
+    def GetUsedColumns(self):
+        """
+        Sorted list of the columns that have at least one cash flow.
+        :return: list
+        """
+        used = set()
+        for cols in self.RowColumns:
+            used.update(cols)
+        return sorted(used)
+
+    def Dot(self, vector):
+        """
+        Matrix-vector product. vector has one entry per lattice column.
+        :param vector: list
+        :return: list
+        """
+        out = []
+        for cols, amounts in zip(self.RowColumns, self.RowAmounts):
+            total = 0.
+            for c, a in zip(cols, amounts):
+                total += a * vector[c]
+            out.append(total)
+        return out
+
+    def ColumnTotals(self, weights=None):
+        """
+        Aggregate cash flows per lattice date, optionally weighting each row (such as by notional).
+        :param weights: list
+        :return: list
+        """
+        out = [0., ] * self.GetNumColumns()
+        for i in range(0, len(self.RowColumns)):
+            w = 1. if weights is None else weights[i]
+            for c, a in zip(self.RowColumns[i], self.RowAmounts[i]):
+                out[c] += w * a
+        return out
+
+
+class NodeJacobian(object):
+    """
+    Sparse bonds x curve nodes matrix of price sensitivities: entry (i, j) is the derivative of the
+    dirty price of bond i (per 100 face) with respect to the zero rate of node j. Held as a list of
+    node positions and a list of values per row (bond).
+    """
+    def __init__(self, num_nodes):
+        """
+        :param num_nodes: int
+        """
+        self.NumNodes = num_nodes
+        self.RowColumns = []
+        self.RowValues = []
+
+    def AddRow(self, columns, values):
+        self.RowColumns.append(list(columns))
+        self.RowValues.append(list(values))
+
+    def GetNumRows(self):
+        return len(self.RowColumns)
+
+    def GetNumColumns(self):
+        return self.NumNodes
+
+    def GetValue(self, row, column):
+        """
+        :param row: int
+        :param column: int
+        :return: float
+        """
+        cols = self.RowColumns[row]
+        if column in cols:
+            return self.RowValues[row][cols.index(column)]
+        return 0.
+
+    def ToDense(self):
+        """
+        :return: list
+        """
+        out = []
+        for cols, values in zip(self.RowColumns, self.RowValues):
+            row = [0., ] * self.NumNodes
+            for c, v in zip(cols, values):
+                row[c] = v
+            out.append(row)
+        return out
+
+    def Dot(self, shifts):
+        """
+        First-order price changes for a change in each node zero rate.
+        :param shifts: list
+        :return: list
+        """
+        out = []
+        for cols, values in zip(self.RowColumns, self.RowValues):
+            total = 0.
+            for c, v in zip(cols, values):
+                total += v * shifts[c]
+            out.append(total)
+        return out
+
+    def ColumnTotals(self, weights=None):
+        """
+        Aggregate sensitivity to each node, optionally weighting each row (such as by notional).
+        :param weights: list
+        :return: list
+        """
+        out = [0., ] * self.NumNodes
+        for i in range(0, len(self.RowColumns)):
+            w = 1. if weights is None else weights[i]
+            for c, v in zip(self.RowColumns[i], self.RowValues[i]):
+                out[c] += w * v
+        return out
+
+
+class Portfolio(object):
+    """
+    A book of CouponBond objects (with notionals), priced together on a DateLattice.
+
+    The cash flow matrix is cached for the last value of now, and is rebuilt if a bond's terms
+    (maturity, coupon, frequency, PriceBase) change. A bond whose maturity is not on the lattice,
+    or whose frequency does not divide the lattice frequency, is priced on its own.
+
+    >>> from simplepricers.bonds_curves import CouponBond, ZeroCurve
+    >>> ZC = ZeroCurve([0., 10.], [.03, .04])
+    >>> bond = CouponBond(7.3, .05, 2)
+    >>> book = Portfolio([CouponBond(2., .05, 2), bond])
+    >>> book.GetPricesFromZeroCurve(0., ZC, 'dirty')[1] == bond.GetPriceFromZeroCurve(0., ZC, 'dirty')
+    True
+    >>> book.BuildCashFlowMatrix(0.).OffLattice
+    [1]
+    """
+    def __init__(self, bonds=(), notionals=None, lattice=None):
+        """
+        :param bonds: list
+        :param notionals: list
+        :param lattice: DateLattice
+        """
+        if lattice is None:
+            lattice = DateLattice()
+        self.Lattice = lattice
+        self.Bonds = []
+        self.Notionals = []
+        self.CashFlowMatrix = None
+        self.MatrixKey = None
+        if notionals is None:
+            notionals = [1., ] * len(bonds)
+        if not len(notionals) == len(bonds):
+            raise ValueError('bonds and notionals must be the same length')
+        for b, n in zip(bonds, notionals):
+            self.AddBond(b, n)
+
+    def AddBond(self, bond, notional=1.):
+        """
+        Add a bond to the book.
+        :param bond: CouponBond
+        :param notional: float
+        :return: None
+        """
+        self.Bonds.append(bond)
+        self.Notionals.append(notional)
+        self.CashFlowMatrix = None
+
+    def BuildCashFlowMatrix(self, now):
+        """
+        Build (or return the cached) cash flow matrix for now. Bond cash flows are not scaled by
+        notional.
+
+        The cache is keyed on now and the terms of every bond, so changing a bond held in the book
+        rebuilds the matrix. Bonds that are not on the lattice get an empty row, and are listed in
+        the OffLattice attribute of the matrix.
+        :param now: float
+        :return: CashFlowMatrix
+        """
+        key = (now, tuple((id(b), b.Maturity, b.Coupon, b.CouponFrequency, b.PriceBase) for b in self.Bonds))
+        if self.CashFlowMatrix is not None and self.MatrixKey == key:
+            return self.CashFlowMatrix
+        mat = CashFlowMatrix(self.Lattice)
+        for bond in self.Bonds:
+            try:
+                ticks = self.Lattice.GetBondTicks(bond.Maturity, now, bond.CouponFrequency)
+            except ValueError:
+                mat.OffLattice.append(mat.AddRow([], []))
+                continue
+            cols = [self.Lattice.GetColumn(t) for t in ticks]
+            coupon_payment = bond.PriceBase * bond.Coupon / bond.CouponFrequency
+            amounts = [coupon_payment, ] * len(cols)
+            if len(amounts) > 0:
+                amounts[-1] += bond.PriceBase
+            mat.AddRow(cols, amounts)
+        self.CashFlowMatrix = mat
+        self.MatrixKey = key
+        return mat
+
+    def GetLatticeDFs(self, now, ZC):
+        """
+        Discount factors for the lattice dates used by the book at now; each date is discounted once.
+        (Unused columns are None.)
+
+        As with CouponBond.GetPriceFromZeroCurve(), the curve is indexed by the cash flow date.
+        :param now: float
+        :param ZC: ZeroCurve
+        :return: list
+        """
+        mat = self.BuildCashFlowMatrix(now)
+        out = [None, ] * mat.GetNumColumns()
+        for c in mat.GetUsedColumns():
+            out[c] = ZC.GetDF(self.Lattice.GetDate(self.Lattice.Ticks[c]))
+        return out
+
+    def GetPricesFromZeroCurve(self, now, ZC, price_type='clean'):
+        """
+        Dirty prices (per 100 face) of every bond, off a ZeroCurve. Bonds that are not on the
+        lattice are priced with CouponBond.GetPriceFromZeroCurve().
+
+        Although price_type only supports 'dirty' for now. Left this way to future-proof code.
+        :param now: float
+        :param ZC: ZeroCurve
+        :param price_type: str
+        :return: list
+        """
+        if price_type != 'dirty':
+            raise NotImplementedError('Unsupported price_type convention')
+        mat = self.BuildCashFlowMatrix(now)
+        out = mat.Dot(self.GetLatticeDFs(now, ZC))
+        for i in mat.OffLattice:
+            out[i] = self.Bonds[i].GetPriceFromZeroCurve(now, ZC, price_type='dirty')
+        return out
+
+    def GetValueFromZeroCurve(self, now, ZC, price_type='clean'):
+        """
+        Total value of the book: sum of notional * price / 100.
+        :param now: float
+        :param ZC: ZeroCurve
+        :param price_type: str
+        :return: float
+        """
+        prices = self.GetPricesFromZeroCurve(now, ZC, price_type)
+        total = 0.
+        for bond, notional, p in zip(self.Bonds, self.Notionals, prices):
+            total += notional * p / bond.PriceBase
+        return total
+
+    def GetNodeJacobian(self, now, ZC):
+        """
+        Derivatives of each bond's dirty price (per 100 face) with respect to each ZeroCurve node
+        zero rate, as a sparse NodeJacobian. Only for 'linear' and 'loglinear' curves.
+
+        One pass: the DF sensitivities (ZeroCurve.GetDFNodeSensitivities()) are found once per
+        lattice date, then each bond adds cash flow * dDF/dz to the nodes its dates touch. Bonds
+        that are not on the lattice look up the sensitivities for their own cash flow dates.
+
+        >>> from simplepricers.bonds_curves import CouponBond, ZeroCurve
+        >>> ZC = ZeroCurve([0., 1., 2.], [.04, .04, .05])
+        >>> jac = Portfolio([CouponBond(1.5, .04, 2)]).GetNodeJacobian(0., ZC)
+        >>> jac.RowColumns[0], [round(x, 4) for x in jac.RowValues[0]]
+        ([0, 1, 2], [-0.4714, -70.849, -68.5284])
+
+        :param now: float
+        :param ZC: ZeroCurve
+        :return: NodeJacobian
+        """
+        mat = self.BuildCashFlowMatrix(now)
+        sens = {}
+        for c in mat.GetUsedColumns():
+            df, positions, derivs = ZC.GetDFNodeSensitivities(self.Lattice.GetDate(self.Lattice.Ticks[c]))
+            sens[c] = (positions, derivs)
+        off_lattice = set(mat.OffLattice)
+        out = NodeJacobian(len(ZC.Maturities))
+        for i in range(0, mat.GetNumRows()):
+            row = {}
+            if i in off_lattice:
+                bond = self.Bonds[i]
+                bond.GenerateCashFlows(now)
+                flows = [(ZC.GetDFNodeSensitivities(t)[1:], a)
+                         for t, a in zip(bond.CashFlowDates, bond.CashFlows)]
+            else:
+                flows = [(sens[c], a) for c, a in zip(mat.RowColumns[i], mat.RowAmounts[i])]
+            for (positions, derivs), a in flows:
+                for p, d in zip(positions, derivs):
+                    row[p] = row.get(p, 0.) + a * d
+            nodes = sorted(row)
+            out.AddRow(nodes, [row[p] for p in nodes])
+        return out
+
+    def GetHorizonReturns(self, now, ZC, horizons):
+        """
+        Carry, roll-down and total return of the book (notional-weighted) over a list of horizons.
+        See horizon.py.
+        :param now: float
+        :param ZC: ZeroCurve
+        :param horizons: list
+        :return: HorizonAnalysis
+        """
+        return CalcPortfolioHorizonReturns(self.Bonds, self.Notionals, now, ZC, horizons)
+
+
+def _get_index_key(curve, keys):
+    """
+    A key for the contents of an Indexation object (history and ExtrapolationRate), computed once
+    per object (keys is keyed by id()).
+    """
+    if id(curve) not in keys:
+        keys[id(curve)] = (curve.IndexDates.tobytes(), curve.IndexValues.tobytes(), curve.ExtrapolationRate)
+    return keys[id(curve)]
+
+
+def PriceInflationLinkedBonds(bonds, now, real_yields=None, ZC=None, price_type='clean'):
+    """
+    Price a list of InflationLinkedBond objects in one pass, returning (real_prices, nominal_prices).
+
+    Specify exactly one of:
+    real_yields: list of real yields (bond convention). The real price is the CouponBond price
+        at that yield; the nominal price is the real price times the index ratio at now.
+    ZC: a nominal ZeroCurve. The projected indexed cash flows (cash flow times the bond's
+        InflationCurve value on the payment date) are discounted off the curve to give the
+        nominal price; the real price is the nominal price divided by the index ratio at now.
+        This is the NPV used by InflationLinkedBond.CalcEconomicBreakeven().
+
+    Index values are looked up once per (distinct InflationCurve, date), using
+    Indexation.GetValues() (so a table built with BuildIndexTable() is used), and discount factors
+    once per date. Inflation curves are distinct if their histories or ExtrapolationRate differ,
+    so bonds with separate Indexation objects holding the same data share the lookups.
+
+    Although price_type only supports 'dirty' for now. Left this way to future-proof code.
+    :param bonds: list
+    :param now: float
+    :param real_yields: list
+    :param ZC: ZeroCurve
+    :param price_type: str
+    :return: tuple
+    """
+    if price_type != 'dirty':
+        raise NotImplementedError('Unsupported price_type convention')
+    if (real_yields is None) == (ZC is None):
+        raise ValueError('Must specify exactly one of real_yields or ZC')
+    if real_yields is not None and not len(real_yields) == len(bonds):
+        raise ValueError('bonds and real_yields must be the same length')
+    now = ToYearFraction(now)
+    # Gather the dates needed for each distinct inflation curve.
+    curves = {}
+    curve_keys = {}
+    all_dates = set()
+    for bond in bonds:
+        key = _get_index_key(bond.InflationCurve, curve_keys)
+        curve_dates = curves.setdefault(key, (bond.InflationCurve, set()))[1]
+        curve_dates.add(now)
+        if ZC is not None:
+            bond.GenerateCashFlows(now)
+            curve_dates.update(bond.CashFlowDates)
+            all_dates.update(bond.CashFlowDates)
+    index_values = {}
+    for key, (curve, dates) in curves.items():
+        dates = sorted(dates)
+        index_values[key] = dict(zip(dates, curve.GetValues(dates)))
+    real_prices = []
+    nominal_prices = []
+    if ZC is None:
+        for bond, yld in zip(bonds, real_yields):
+            real = bond.GetPrice(yld, now, price_type='dirty')
+            real_prices.append(real)
+            nominal_prices.append(real * index_values[curve_keys[id(bond.InflationCurve)]][now])
+        return real_prices, nominal_prices
+    all_dates = sorted(all_dates)
+    DFs = dict(zip(all_dates, ZC.GetDFs(all_dates)))
+    for bond in bonds:
+        values = index_values[curve_keys[id(bond.InflationCurve)]]
+        nominal = 0.
+        for d, cf in zip(bond.CashFlowDates, bond.CashFlows):
+            nominal += cf * values[d] * DFs[d]
+        nominal_prices.append(nominal)
+        real_prices.append(nominal / values[now])
+    return real_prices, nominal_prices
@@ -0,0 +1,382 @@
+"""
+pricing_service.py
+
+An asyncio pricing service, speaking a JSON-lines protocol over a local TCP or Unix socket.
+
+Each request is one JSON object on one line, and gets one JSON line back with the same "id":
+    {"id": 1, "op": "curve", "name": "nominal", "mats": [0, 10], "zc": [.04, .06], "interpolation": "linear"}
+    {"id": 2, "op": "price", "bond": {"mat": 10, "coupon": .05, "freq": 2}, "yield": .04, "now": 0}
+    {"id": 3, "op": "yield", "bond": {"mat": 10, "coupon": .05, "freq": 2}, "price": 105., "now": 0}
+    {"id": 4, "op": "curve_price", "bond": {"mat": 10, "coupon": .05, "freq": 1}, "curve": "nominal"}
+    {"id": 5, "op": "stats"}
+Responses are {"id": ..., "result": ...} or {"id": ..., "error": "message"}. Prices are dirty prices.
+"now" is optional (default 0).
+
+Curve updates are applied as soon as they are read. Pricing requests are queued; a batching task
+takes everything that has arrived (waiting up to BatchWindow seconds for more), and runs the batch
+in an executor, so that CPU work never blocks the event loop. Within a batch:
+    - curve pricing requests for the same (curve, now) are priced together with a Portfolio (one
+      discount factor per date);
+    - requests for the same bond terms share one CouponBond, so its cash flow schedule is built
+      once per now;
+    - yield requests for the same (bond, now) are solved in price order, each one warm-started
+      from the last answer (CouponBond.GetYield(warm_start=True)).
+Price-from-yield requests are closed form (CouponBond.GetFlatYieldNPV()), so there is nothing
+more to share between them than the schedule.
+
+Stop() stops accepting connections, then waits for every queued request to be priced before
+shutting down the batching task.
+
+The service records the latency of each request (from when it is read until the response is
+written); "stats" returns percentiles.
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import json
+import time
+
+from simplepricers.bonds_curves import CouponBond, ZeroCurve
+from simplepricers.portfolio import Portfolio
+
+
+def MakeBond(spec):
+    """
+    Create a CouponBond from a request "bond" dictionary: mat, coupon, freq (default 1).
+    :param spec: dict
+    :return: CouponBond
+    """
+    return CouponBond(float(spec['mat']), float(spec['coupon']), coupon_freq=int(spec.get('freq', 1)))
+
+
+def PriceBatch(requests, curves):
+    """
+    Price a batch of requests. Returns a list of (result, error) tuples, in order.
+
+    This is a module-level function so that it can also be sent to a process pool.
+    :param requests: list
+    :param curves: dict
+    :return: list
+    """
+    out = [None, ] * len(requests)
+    # Group curve pricing by (curve, now), and yields by (bond terms, now)
+    groups = {}
+    yield_groups = {}
+    bonds = {}
+    for i, req in enumerate(requests):
+        try:
+            op = req['op']
+            if op == 'price' or op == 'yield':
+                spec = req['bond']
+                key = (float(spec['mat']), float(spec['coupon']), int(spec.get('freq', 1)))
+                if key not in bonds:
+                    bonds[key] = MakeBond(spec)
+                now = float(req.get('now', 0.))
+                if op == 'price':
+                    out[i] = (bonds[key].GetPrice(float(req['yield']), now, price_type='dirty'), None)
+                else:
+                    yield_groups.setdefault((key, now), []).append((float(req['price']), i))
+            elif op == 'curve_price':
+                if req['curve'] not in curves:
+                    raise KeyError('Unknown curve: {0}'.format(req['curve']))
+                key = (req['curve'], float(req.get('now', 0.)))
+                groups.setdefault(key, []).append((i, MakeBond(req['bond'])))
+            else:
+                raise ValueError('Unknown op: {0}'.format(op))
+        except Exception as e:
+            out[i] = (None, '{0}: {1}'.format(type(e).__name__, e))
+    for (key, now), members in yield_groups.items():
+        bond = bonds[key]
+        for price, i in sorted(members):
+            try:
+                out[i] = (bond.GetYield(now, price, price_type='dirty', warm_start=True), None)
+            except Exception as e:
+                out[i] = (None, '{0}: {1}'.format(type(e).__name__, e))
+    for (curve_name, now), members in groups.items():
+        book = Portfolio([b for i, b in members])
+        try:
+            prices = book.GetPricesFromZeroCurve(now, curves[curve_name], price_type='dirty')
+        except Exception:
+            # Price one at a time, so that one bad bond does not fail the group.
+            for i, bond in members:
+                try:
+                    out[i] = (bond.GetPriceFromZeroCurve(now, curves[curve_name], price_type='dirty'), None)
+                except Exception as e:
+                    out[i] = (None, '{0}: {1}'.format(type(e).__name__, e))
+            continue
+        for (i, bond), p in zip(members, prices):
+            out[i] = (p, None)
+    return out
+
+
+def CalcPercentiles(values, percentiles=(50., 90., 99.)):
+    """
+    Percentiles (nearest rank) of a list of values.
+
+    >>> CalcPercentiles([float(x) for x in range(1, 101)])
+    {'p50': 50.0, 'p90': 90.0, 'p99': 99.0}
+
+    :param values: list
+    :param percentiles: tuple
+    :return: dict
+    """
+    ordered = sorted(values)
+    out = {}
+    for p in percentiles:
+        key = 'p{0:g}'.format(p)
+        if len(ordered) == 0:
+            out[key] = None
+            continue
+        rank = int(-(-p * len(ordered) // 100.))
+        out[key] = ordered[min(max(rank, 1), len(ordered)) - 1]
+    return out
+
+
+class PricingService(object):
+    """
+    The pricing server. Use Start() (TCP) or StartUnix(), then Stop(); or use as an async context
+    manager.
+    """
+    def __init__(self, executor=None, batch_window=.001, max_batch=1000, latency_history=10000):
+        """
+        :param executor: concurrent.futures.Executor
+        :param batch_window: float
+        :param max_batch: int
+        :param latency_history: int
+        """
+        # An executor created here is shut down by Stop(); one passed in belongs to the caller.
+        self.OwnsExecutor = executor is None
+        if executor is None:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.Executor = executor
+        self.BatchWindow = batch_window
+        self.MaxBatch = max_batch
+        self.Curves = {}
+        # Latencies (seconds) of the most recent requests
+        self.Latencies = collections.deque(maxlen=latency_history)
+        self.BatchSizes = collections.deque(maxlen=latency_history)
+        self.Server = None
+        self.Queue = None
+        self.BatchTask = None
+
+    async def Start(self, host='127.0.0.1', port=0):
+        """
+        Start listening on TCP. Returns the (host, port) actually used.
+        :param host: str
+        :param port: int
+        :return: tuple
+        """
+        self.StartBatcher()
+        self.Server = await asyncio.start_server(self.HandleConnection, host, port)
+        return self.Server.sockets[0].getsockname()[0:2]
+
+    async def StartUnix(self, path):
+        """
+        Start listening on a Unix socket.
+        :param path: str
+        :return: None
+        """
+        self.StartBatcher()
+        self.Server = await asyncio.start_unix_server(self.HandleConnection, path)
+
+    def StartBatcher(self):
+        if self.Executor is None:
+            # Restarting after Stop() shut down our own executor.
+            self.Executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.Queue = asyncio.Queue()
+        self.BatchTask = asyncio.ensure_future(self.RunBatches())
+
+    async def Stop(self):
+        """
+        Stop listening, price everything already queued, then shut down the batching task (and our
+        own executor).
+        """
+        if self.Server is not None:
+            self.Server.close()
+            await self.Server.wait_closed()
+            self.Server = None
+        if self.BatchTask is not None:
+            if not self.BatchTask.done():
+                # Drain: every queued request gets its answer before the batcher goes away.
+                await self.Queue.join()
+            self.BatchTask.cancel()
+            try:
+                await self.BatchTask
+            except asyncio.CancelledError:
+                pass
+            self.BatchTask = None
+        if self.OwnsExecutor and self.Executor is not None:
+            self.Executor.shutdown(wait=True)
+            self.Executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.Stop()
+
+    def GetStats(self):
+        """
+        Latency percentiles (in seconds) and batch statistics.
+        :return: dict
+        """
+        out = CalcPercentiles(list(self.Latencies))
+        out['count'] = len(self.Latencies)
+        sizes = list(self.BatchSizes)
+        out['mean_batch'] = sum(sizes) / float(len(sizes)) if len(sizes) > 0 else None
+        return out
+
+    def SetCurve(self, req):
+        mats = [float(x) for x in req['mats']]
+        zc = [float(x) for x in req['zc']]
+        # Replace rather than modify, so that a batch in the executor keeps a consistent curve.
+        self.Curves[req['name']] = ZeroCurve(mats, zc, interpolation=req.get('interpolation', 'linear'))
+        return len(mats)
+
+    async def HandleConnection(self, reader, writer):
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                start = time.perf_counter()
+                try:
+                    req = json.loads(line)
+                except ValueError as e:
+                    await self.Respond(writer, {'id': None, 'error': 'Bad JSON: {0}'.format(e)}, start)
+                    continue
+                if not isinstance(req, dict):
+                    await self.Respond(writer, {'id': None, 'error': 'Request must be a JSON object'}, start)
+                    continue
+                op = req.get('op')
+                if op == 'curve' or op == 'stats':
+                    try:
+                        result = self.SetCurve(req) if op == 'curve' else self.GetStats()
+                        resp = {'id': req.get('id'), 'result': result}
+                    except Exception as e:
+                        resp = {'id': req.get('id'), 'error': '{0}: {1}'.format(type(e).__name__, e)}
+                    await self.Respond(writer, resp, start)
+                    continue
+                future = asyncio.get_running_loop().create_future()
+                await self.Queue.put((req, future))
+                task = asyncio.ensure_future(self.WaitAndRespond(writer, req, future, start))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            if len(pending) > 0:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+
+    async def WaitAndRespond(self, writer, req, future, start):
+        result, error = await future
+        if error is None:
+            resp = {'id': req.get('id'), 'result': result}
+        else:
+            resp = {'id': req.get('id'), 'error': error}
+        await self.Respond(writer, resp, start)
+
+    async def Respond(self, writer, resp, start):
+        writer.write((json.dumps(resp) + '\n').encode('utf-8'))
+        await writer.drain()
+        self.Latencies.append(time.perf_counter() - start)
+
+    async def RunBatches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.Queue.get()]
+            # Coalesce whatever else arrives within the batch window.
+            deadline = loop.time() + self.BatchWindow
+            while len(batch) < self.MaxBatch:
+                timeout = deadline - loop.time()
+                if timeout <= 0 and self.Queue.empty():
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.Queue.get(), max(timeout, 0)))
+                except asyncio.TimeoutError:
+                    break
+            self.BatchSizes.append(len(batch))
+            requests = [req for req, future in batch]
+            try:
+                results = await loop.run_in_executor(self.Executor, PriceBatch, requests, dict(self.Curves))
+            except Exception as e:
+                results = [(None, '{0}: {1}'.format(type(e).__name__, e)), ] * len(batch)
+            for (req, future), res in zip(batch, results):
+                if not future.done():
+                    future.set_result(res)
+                self.Queue.task_done()
+
+
+class PricingClient(object):
+    """
+    Simple asyncio client for PricingService. Requests may be sent concurrently; responses are
+    matched up by id.
+    """
+    def __init__(self):
+        self.Reader = None
+        self.Writer = None
+        self.NextId = 0
+        self.Pending = {}
+        self.ReadTask = None
+
+    async def Connect(self, host='127.0.0.1', port=None, path=None):
+        """
+        Connect by TCP (host, port) or to a Unix socket (path).
+        """
+        if path is not None:
+            self.Reader, self.Writer = await asyncio.open_unix_connection(path)
+        else:
+            self.Reader, self.Writer = await asyncio.open_connection(host, port)
+        self.ReadTask = asyncio.ensure_future(self.ReadResponses())
+
+    async def ReadResponses(self):
+        while True:
+            line = await self.Reader.readline()
+            if not line:
+                break
+            resp = json.loads(line)
+            future = self.Pending.pop(resp.get('id'), None)
+            if future is not None and not future.done():
+                future.set_result(resp)
+        for future in self.Pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError('Connection closed'))
+
+    async def Request(self, req):
+        """
+        Send a request (the id is filled in), and return the response dict.
+        :param req: dict
+        :return: dict
+        """
+        self.NextId += 1
+        req = dict(req)
+        req['id'] = self.NextId
+        future = asyncio.get_running_loop().create_future()
+        self.Pending[req['id']] = future
+        self.Writer.write((json.dumps(req) + '\n').encode('utf-8'))
+        await self.Writer.drain()
+        return await future
+
+    async def Close(self):
+        self.Writer.close()
+        try:
+            await self.Writer.wait_closed()
+        except ConnectionError:  # pragma: no cover
+            pass
+        if self.ReadTask is not None:
+            await self.ReadTask
@@ -0,0 +1,352 @@
+"""
+regime_simulation.py
+
+Regime-switching growth simulation (the model from examples/recession_random_walk.py), for
+many paths.
+
+A two-state Markov chain switches between a low growth state (0) and a high growth state (1).
+Monthly (annualised) growth reverts towards a level set by the state, plus normal noise:
+    g[t] = g[t-1] + Speed * (Revert[state[t]] - g[t-1]) + Vol * N(0, 1)
+
+Paths are generated in blocks. Each block has its own random.Random stream, seeded from
+(seed, block number), so results do not depend on how many blocks are held in memory at once,
+and statistics over a large number of paths can be accumulated block by block
+(RecessionStatistics) without ever holding every path.
+
+Paths are stored as array('b') (states) and array('d') (growth), one per path: a byte per
+state and a double per growth value, with no NumPy needed, so a block of long paths stays
+compact.
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from array import array
+import math
+import random
+
+
+def MakeStream(seed, stream):
+    """
+    A random.Random for stream number stream, derived from seed. (String seeds are hashed
+    deterministically, so this is reproducible across runs.)
+
+    >>> MakeStream(0, 1).random() == MakeStream(0, 1).random()
+    True
+    >>> MakeStream(0, 1).random() == MakeStream(0, 2).random()
+    False
+
+    :param seed: object
+    :param stream: int
+    :return: random.Random
+    """
+    return random.Random('{0}:{1}'.format(seed, stream))
+
+
+def MovingAverage(ser, window=6):
+    """
+    Trailing moving average, using a running sum (O(1) per point). The first window-1 points are
+    the average of the points available (as in cheating_MA() in the recession example).
+
+    >>> MovingAverage([1., 2., 3., 4., 5., 6., 7.], 3)
+    [1.0, 1.5, 2.0, 3.0, 4.0, 5.0, 6.0]
+
+    :param ser: list
+    :param window: int
+    :return: list
+    """
+    if window < 1:
+        raise ValueError('window must be at least 1')
+    out = []
+    total = 0.
+    for i in range(0, len(ser)):
+        total += ser[i]
+        if i >= window:
+            total -= ser[i - window]
+        out.append(total / min(i + 1, window))
+    return out
+
+
+class RegimeSwitchingGrowth(object):
+    """
+    Parameters of the regime-switching growth model; defaults are those of the recession example.
+
+    >>> model = RegimeSwitchingGrowth()
+    >>> states, growth = model.Simulate(3, 24, seed=0)
+    >>> len(states), len(growth[0]), states[0][0], growth[0][0]
+    (3, 24, 1, 2.5)
+    """
+    def __init__(self, stay_low=.96, stay_high=.98, revert_low=.75, revert_high=2.5, speed=.25, vol=.8,
+                 initial_growth=2.5, initial_state=1):
+        """
+        :param stay_low: float
+        :param stay_high: float
+        :param revert_low: float
+        :param revert_high: float
+        :param speed: float
+        :param vol: float
+        :param initial_growth: float
+        :param initial_state: int
+        """
+        # Probability of staying in each state (indexed by state) for one step.
+        self.StayProbability = (stay_low, stay_high)
+        self.Revert = (revert_low, revert_high)
+        self.Speed = speed
+        self.Vol = vol
+        self.InitialGrowth = initial_growth
+        self.InitialState = initial_state
+
+    def SimulateBlock(self, num_paths, num_steps, rng):
+        """
+        Simulate num_paths paths with the stream rng. Returns (states, growth): lists with one
+        array per path.
+
+        All the paths of the block are stepped together (one list per time step, transposed into
+        paths at the end). The normal draws are generated with the Box-Muller transform, a row at
+        a time, which is about twice as fast as calling rng.gauss() for each point.
+        :param num_paths: int
+        :param num_steps: int
+        :param rng: random.Random
+        :return: tuple
+        """
+        stay = self.StayProbability
+        # g[t] = decay * g[t-1] + level[state[t]] + noise
+        decay = 1. - self.Speed
+        level = (self.Speed * self.Revert[0], self.Speed * self.Revert[1])
+        vol = self.Vol
+        uniform = rng.random
+        sqrt = math.sqrt
+        log = math.log
+        cos = math.cos
+        sin = math.sin
+        two_pi = 2. * math.pi
+        pairs = range(0, (num_paths + 1) // 2)
+        s_row = [self.InitialState, ] * num_paths
+        g_row = [self.InitialGrowth, ] * num_paths
+        s_rows = [s_row]
+        g_rows = [g_row]
+        for i in range(1, num_steps):
+            s_row = [s if uniform() < stay[s] else 1 - s for s in s_row]
+            radius = [vol * sqrt(-2. * log(1. - uniform())) for k in pairs]
+            angle = [two_pi * uniform() for k in pairs]
+            noise = [r * cos(a) for r, a in zip(radius, angle)] + [r * sin(a) for r, a in zip(radius, angle)]
+            g_row = [decay * g + level[s] + z for g, s, z in zip(g_row, s_row, noise)]
+            s_rows.append(s_row)
+            g_rows.append(g_row)
+        states = [array('b', path) for path in zip(*s_rows[0:num_steps])]
+        growth = [array('d', path) for path in zip(*g_rows[0:num_steps])]
+        return states, growth
+
+    def GetPath(self, normals, uniforms):
+        """
+        A single path, from supplied draws (one standard normal per step after the first, and up
+        to one more uniform than that), so that the draws can come from a variance reduction scheme
+        (see monte_carlo.py). Returns (states, growth) lists, one longer than normals.
+
+        The noise is Vol times the normal, as in SimulateBlock(). The state follows the same
+        Markov chain, but is generated by regime: each uniform u sets how many steps the current
+        state lasts, which is geometric, floor(log(1 - u) / log(StayProbability)). A path with few
+        switches uses few uniforms, and the switching times move smoothly with the uniforms (which
+        is what quasi-random sampling and antithetic variates need).
+
+        >>> model = RegimeSwitchingGrowth(vol=1.)
+        >>> model.GetPath([.4, 0.], [.03, .5, .5])
+        ([1, 1, 0], [2.5, 2.9, 2.3625])
+
+        :param normals: list
+        :param uniforms: list
+        :return: tuple
+        """
+        decay = 1. - self.Speed
+        level = (self.Speed * self.Revert[0], self.Speed * self.Revert[1])
+        s = self.InitialState
+        g = self.InitialGrowth
+        states = [s]
+        growth = [g]
+        draws = iter(uniforms)
+        remaining = self.GetRegimeLength(s, next(draws))
+        for z in normals:
+            if remaining == 0:
+                s = 1 - s
+                remaining = self.GetRegimeLength(s, next(draws))
+            remaining -= 1
+            g = decay * g + level[s] + self.Vol * z
+            states.append(s)
+            growth.append(g)
+        return states, growth
+
+    def GetRegimeLength(self, state, u):
+        """
+        Number of further steps spent in state (before switching), from a uniform draw u.
+        P(length >= k) = StayProbability[state]^k. Returns math.inf if the state is never left.
+        :param state: int
+        :param u: float
+        :return: float
+        """
+        stay = self.StayProbability[state]
+        if stay <= 0.:
+            return 0
+        if stay >= 1. or u >= 1.:
+            return math.inf
+        return math.floor(math.log1p(-u) / math.log(stay))
+
+    def GetExpectedGrowth(self, num_steps):
+        """
+        Expected growth at each step. Growth is linear in the state and the noise, so this follows
+        from the probability of being in the high state, which evolves with the transition
+        probabilities.
+
+        >>> model = RegimeSwitchingGrowth(stay_high=1.)
+        >>> model.GetExpectedGrowth(3)
+        [2.5, 2.5, 2.5]
+
+        :param num_steps: int
+        :return: list
+        """
+        stay_low, stay_high = self.StayProbability
+        decay = 1. - self.Speed
+        p_high = float(self.InitialState)
+        g = self.InitialGrowth
+        out = [g]
+        for i in range(1, num_steps):
+            p_high = p_high * stay_high + (1. - p_high) * (1. - stay_low)
+            g = decay * g + self.Speed * (self.Revert[0] * (1. - p_high) + self.Revert[1] * p_high)
+            out.append(g)
+        return out
+
+    def IterateBlocks(self, num_paths, num_steps, seed=0, block_size=1000):
+        """
+        Generator of (states, growth) for blocks of at most block_size paths. Block k uses the
+        stream MakeStream(seed, k).
+        :param num_paths: int
+        :param num_steps: int
+        :param seed: object
+        :param block_size: int
+        :return: generator
+        """
+        block = 0
+        done = 0
+        while done < num_paths:
+            size = min(block_size, num_paths - done)
+            yield self.SimulateBlock(size, num_steps, MakeStream(seed, block))
+            done += size
+            block += 1
+
+    def Simulate(self, num_paths, num_steps, seed=0, block_size=1000):
+        """
+        Simulate all the paths, returning (states, growth). For large runs, use IterateBlocks()
+        or RecessionStatistics instead.
+        :param num_paths: int
+        :param num_steps: int
+        :param seed: object
+        :param block_size: int
+        :return: tuple
+        """
+        states = []
+        growth = []
+        for block_states, block_growth in self.IterateBlocks(num_paths, num_steps, seed, block_size):
+            states.extend(block_states)
+            growth.extend(block_growth)
+        return states, growth
+
+
+class RecessionStatistics(object):
+    """
+    Streaming recession statistics. A recession is a run of months in which the moving average
+    of growth is below Threshold. Feed blocks of paths in with Update().
+
+    >>> model = RegimeSwitchingGrowth()
+    >>> stats = RecessionStatistics()
+    >>> stats.Run(model, 200, 240, seed=0)
+    >>> stats.NumPaths, stats.NumMonths
+    (200, 48000)
+    >>> 0. < stats.GetFractionInRecession() < 1.
+    True
+    """
+    def __init__(self, threshold=0., window=6, months_per_year=12):
+        """
+        :param threshold: float
+        :param window: int
+        :param months_per_year: int
+        """
+        self.Threshold = threshold
+        self.Window = window
+        self.MonthsPerYear = months_per_year
+        self.NumPaths = 0
+        self.NumMonths = 0
+        self.LowStateMonths = 0
+        self.RecessionMonths = 0
+        self.RecessionCount = 0
+        # Number of paths with no recession at all.
+        self.PathsWithoutRecession = 0
+
+    def Update(self, states, growth):
+        """
+        Add a block of paths.
+        :param states: list
+        :param growth: list
+        :return: None
+        """
+        for path_states, path_growth in zip(states, growth):
+            in_recession = False
+            count = 0
+            for g in MovingAverage(path_growth, self.Window):
+                if g < self.Threshold:
+                    self.RecessionMonths += 1
+                    if not in_recession:
+                        count += 1
+                        in_recession = True
+                else:
+                    in_recession = False
+            self.RecessionCount += count
+            if count == 0:
+                self.PathsWithoutRecession += 1
+            self.LowStateMonths += len(path_states) - sum(path_states)
+            self.NumMonths += len(path_growth)
+            self.NumPaths += 1
+
+    def Run(self, model, num_paths, num_steps, seed=0, block_size=1000):
+        """
+        Simulate and accumulate, one block at a time.
+        :param model: RegimeSwitchingGrowth
+        :param num_paths: int
+        :param num_steps: int
+        :param seed: object
+        :param block_size: int
+        :return: None
+        """
+        for states, growth in model.IterateBlocks(num_paths, num_steps, seed, block_size):
+            self.Update(states, growth)
+
+    def GetFractionInRecession(self):
+        return float(self.RecessionMonths) / self.NumMonths
+
+    def GetFractionLowState(self):
+        return float(self.LowStateMonths) / self.NumMonths
+
+    def GetRecessionsPerYear(self):
+        """
+        Recession starts per path-year.
+        :return: float
+        """
+        return float(self.RecessionCount) * self.MonthsPerYear / self.NumMonths
+
+    def GetMeanDuration(self):
+        """
+        Average recession length, in months (None if there were none).
+        :return: float
+        """
+        if self.RecessionCount == 0:
+            return None
+        return float(self.RecessionMonths) / self.RecessionCount
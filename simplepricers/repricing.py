@@ -0,0 +1,260 @@
+"""
+repricing.py
+
+Incremental repricing: a dependency graph from curves (ZeroCurve), inflation indices (Indexation) and
+quotes to the bonds priced off them.
+
+When a bond is added, it subscribes to the curve nodes that its cash flows depend on (see
+ZeroCurve.GetNodeDependencies()), and to the part of the index history that its indexed cash flows
+use. An update (one curve node, one index print, one quote) marks only the affected bonds as dirty,
+and Recompute() reprices just those. So the work per tick scales with the size of the change, not
+the size of the book.
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import bisect
+
+from simplepricers.simple_calendar import ToYearFraction
+
+
+class PricingNode(object):
+    """
+    A bond in the graph, with the inputs that it is priced from.
+
+    If Yield is not None, the bond is priced from its quoted yield; otherwise, it is priced off
+    the curve CurveName. If IndexName is not None, the cash flows are indexed (as for
+    InflationLinkedBond.CalcEconomicBreakeven()).
+    """
+    def __init__(self, name, bond, curve_name=None, yld=None, index_name=None):
+        self.Name = name
+        self.Bond = bond
+        self.CurveName = curve_name
+        self.Yield = yld
+        self.IndexName = index_name
+        self.Price = None
+
+
+class RepricingGraph(object):
+    """
+    Dependency graph from curves, indices and quotes to bond prices.
+
+    Prices are dirty prices, as of Now (which fixes the cash flow schedules).
+
+    >>> from simplepricers.bonds_curves import CouponBond, ZeroCurve
+    >>> graph = RepricingGraph(now=0.)
+    >>> graph.AddCurve('nominal', ZeroCurve([0., 2., 5., 10.], [.02, .02, .03, .035]))
+    >>> graph.AddBond('2y', CouponBond(2., .02, 1), curve_name='nominal')
+    >>> graph.AddBond('10y', CouponBond(10., .03, 1), curve_name='nominal')
+    >>> sorted(graph.Recompute().keys())
+    ['10y', '2y']
+    >>> graph.UpdateCurveNode('nominal', 3, .04)
+    >>> list(graph.Recompute().keys())
+    ['10y']
+    """
+    def __init__(self, now=0.):
+        """
+        :param now: float
+        """
+        self.Now = ToYearFraction(now)
+        self.Curves = {}
+        self.Indices = {}
+        self.Nodes = {}
+        # (curve name, node position) -> set of bond names
+        self.CurveSubscribers = {}
+        # index name -> {bond name: last cash flow date}
+        self.IndexSubscribers = {}
+        self.Dirty = set()
+
+    def AddCurve(self, name, ZC):
+        """
+        :param name: str
+        :param ZC: ZeroCurve
+        :return: None
+        """
+        self.Curves[name] = ZC
+        self.RebuildSubscriptions()
+
+    def AddIndex(self, name, index):
+        """
+        :param name: str
+        :param index: Indexation
+        :return: None
+        """
+        self.Indices[name] = index
+        self.RebuildSubscriptions()
+
+    def AddBond(self, name, bond, curve_name=None, yld=None, index_name=None):
+        """
+        Add a bond, priced either from a quoted yield (yld) or off a curve (curve_name), optionally
+        with indexed cash flows (index_name).
+        :param name: str
+        :param bond: CouponBond
+        :param curve_name: str
+        :param yld: float
+        :param index_name: str
+        :return: None
+        """
+        if (curve_name is None) == (yld is None):
+            raise ValueError('Must specify exactly one of curve_name or yld')
+        if curve_name is not None and curve_name not in self.Curves:
+            raise KeyError('Unknown curve: {0}'.format(curve_name))
+        if index_name is not None and index_name not in self.Indices:
+            raise KeyError('Unknown index: {0}'.format(index_name))
+        self.Nodes[name] = PricingNode(name, bond, curve_name, yld, index_name)
+        self.Subscribe(self.Nodes[name])
+        self.Dirty.add(name)
+
+    def Subscribe(self, node):
+        bond = node.Bond
+        bond.GenerateCashFlows(self.Now)
+        if node.CurveName is not None:
+            ZC = self.Curves[node.CurveName]
+            positions = set()
+            for d in bond.CashFlowDates:
+                positions.update(ZC.GetNodeDependencies(d))
+            for pos in positions:
+                self.CurveSubscribers.setdefault((node.CurveName, pos), set()).add(node.Name)
+        if node.IndexName is not None and len(bond.CashFlowDates) > 0:
+            self.IndexSubscribers.setdefault(node.IndexName, {})[node.Name] = bond.CashFlowDates[-1]
+
+    def RebuildSubscriptions(self):
+        """
+        Rebuild all subscriptions (for example, after changing Now), and mark everything dirty.
+        :return: None
+        """
+        self.CurveSubscribers = {}
+        self.IndexSubscribers = {}
+        for node in self.Nodes.values():
+            self.Subscribe(node)
+        self.Dirty = set(self.Nodes.keys())
+
+    def SetNow(self, now):
+        """
+        :param now: float
+        :return: None
+        """
+        self.Now = ToYearFraction(now)
+        self.RebuildSubscriptions()
+
+    def UpdateCurveNode(self, curve_name, pos, rate):
+        """
+        Change one zero rate node; marks the bonds that depend on it as dirty.
+        :param curve_name: str
+        :param pos: int
+        :param rate: float
+        :return: None
+        """
+        self.Curves[curve_name].ZC[pos] = rate
+        self.Dirty.update(self.CurveSubscribers.get((curve_name, pos), ()))
+
+    def UpdateCurve(self, curve_name, rates):
+        """
+        Change all the zero rates of a curve; only bonds depending on nodes that actually changed
+        are marked dirty.
+        :param curve_name: str
+        :param rates: list
+        :return: None
+        """
+        ZC = self.Curves[curve_name]
+        if not len(rates) == len(ZC.ZC):
+            raise ValueError('Wrong number of zero rates')
+        for pos, r in enumerate(rates):
+            if r != ZC.ZC[pos]:
+                self.UpdateCurveNode(curve_name, pos, r)
+
+    def UpdateQuote(self, name, yld):
+        """
+        Change the quoted yield of a bond priced from its yield.
+        :param name: str
+        :param yld: float
+        :return: None
+        """
+        node = self.Nodes[name]
+        if node.Yield is None:
+            raise ValueError('Bond {0} is not priced from a quote'.format(name))
+        node.Yield = yld
+        self.Dirty.add(name)
+
+    def MarkIndexDirty(self, index_name, cutoff):
+        """Mark bonds with indexed cash flows after cutoff (None = all) as dirty."""
+        for name, last_date in self.IndexSubscribers.get(index_name, {}).items():
+            if cutoff is None or last_date > cutoff:
+                self.Dirty.add(name)
+
+    def AppendIndexValue(self, index_name, date, value):
+        """
+        Add an index print (see Indexation.AppendIndexValue()). Index values only change after the
+        index point before the new date, so only bonds with cash flows after that are dirty.
+        :param index_name: str
+        :param date: float
+        :param value: float
+        :return: None
+        """
+        index = self.Indices[index_name]
+        date = ToYearFraction(date)
+        pos = bisect.bisect_left(index.IndexDates, date)
+        cutoff = index.IndexDates[pos - 1] if pos > 0 else None
+        index.AppendIndexValue(date, value)
+        self.MarkIndexDirty(index_name, cutoff)
+
+    def SetExtrapolationRate(self, index_name, rate):
+        """
+        Change an index extrapolation rate; only bonds with cash flows after the last print are dirty.
+        :param index_name: str
+        :param rate: float
+        :return: None
+        """
+        index = self.Indices[index_name]
+        index.ExtrapolationRate = rate
+        self.MarkIndexDirty(index_name, index.IndexDates[-1] if len(index.IndexDates) > 0 else None)
+
+    def PriceNode(self, node):
+        bond = node.Bond
+        if node.Yield is not None:
+            price = bond.GetPrice(node.Yield, self.Now, price_type='dirty')
+            if node.IndexName is not None:
+                price *= self.Indices[node.IndexName].GetValue(self.Now)
+            return price
+        ZC = self.Curves[node.CurveName]
+        if node.IndexName is None:
+            return bond.GetPriceFromZeroCurve(self.Now, ZC, price_type='dirty')
+        index = self.Indices[node.IndexName]
+        bond.GenerateCashFlows(self.Now)
+        NPV = 0.
+        for d, cf in zip(bond.CashFlowDates, bond.CashFlows):
+            NPV += cf * index.GetValue(d) * ZC.GetDF(d)
+        return NPV
+
+    def Recompute(self):
+        """
+        Reprice the dirty bonds. Returns a dict of the new prices (only for the bonds repriced).
+        :return: dict
+        """
+        out = {}
+        for name in sorted(self.Dirty):
+            node = self.Nodes[name]
+            node.Price = self.PriceNode(node)
+            out[name] = node.Price
+        self.Dirty = set()
+        return out
+
+    def GetPrices(self):
+        """
+        All prices, after bringing them up to date.
+        :return: dict
+        """
+        self.Recompute()
+        return dict([(name, node.Price) for name, node in self.Nodes.items()])
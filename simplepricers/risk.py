@@ -0,0 +1,263 @@
+"""
+risk.py
+
+Full revaluation VaR and expected shortfall over curve scenarios, in bounded memory.
+
+A bond price off a ZeroCurve is linear in the discount factors of its cash flow dates. So rather
+than pricing every bond in every scenario (a scenarios x bonds matrix), the notional-weighted cash
+flows of each book are aggregated onto the dates of a DateLattice once (see portfolio.py). Each
+scenario then needs one DF per lattice date, and one dot product per book:
+    value[book] = sum(flows[book][date] * DF(date)).
+The total is the sum over the books.
+
+Scenarios are processed in chunks (optionally in an executor, such as a process pool), and the
+losses (base value - scenario value) are reduced as they arrive. For each book, TailStatistics
+keeps only the largest tail_size losses (a min-heap), along with the scenario count. This is
+enough for VaR and expected shortfall at any confidence level where
+ceil(N * (1 - confidence)) <= tail_size, where N is the number of scenarios:
+    VaR = the k-th largest loss, ES = the mean of the k largest losses,
+with k = ceil(N * (1 - confidence)). (So the memory needed depends on the number of books, the
+tail size and the chunk size, not on the number of scenarios.)
+
+As with CouponBond.GetPriceFromZeroCurve(), the scenario curves are indexed by the cash flow date.
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import collections
+import heapq
+import math
+
+from simplepricers.bonds_curves import ZeroCurve
+from simplepricers.portfolio import Portfolio
+
+
+class TailStatistics(object):
+    """
+    Streaming tail of a loss distribution: the largest TailSize losses, and the count.
+
+    >>> obj = TailStatistics(3)
+    >>> obj.AddMany([float(x) for x in range(1, 101)])
+    >>> obj.GetVaR(.98), obj.GetExpectedShortfall(.98)
+    (99.0, 99.5)
+    """
+    def __init__(self, tail_size=100):
+        """
+        :param tail_size: int
+        """
+        if tail_size < 1:
+            raise ValueError('tail_size must be positive')
+        self.TailSize = tail_size
+        self.Count = 0
+        self.Heap = []
+
+    def Add(self, loss):
+        """
+        :param loss: float
+        :return: None
+        """
+        self.Count += 1
+        if len(self.Heap) < self.TailSize:
+            heapq.heappush(self.Heap, loss)
+        elif loss > self.Heap[0]:
+            heapq.heapreplace(self.Heap, loss)
+
+    def AddMany(self, losses):
+        """
+        :param losses: list
+        :return: None
+        """
+        for loss in losses:
+            self.Add(loss)
+
+    def GetTailCount(self, confidence):
+        """
+        Number of losses in the tail at a confidence level: ceil(Count * (1 - confidence)), at
+        least 1.
+        :param confidence: float
+        :return: int
+        """
+        if not 0. < confidence < 1.:
+            raise ValueError('confidence must be between 0 and 1')
+        if self.Count == 0:
+            raise ValueError('No scenarios')
+        # Allow for rounding in Count * (1 - confidence) (such as 100 * (1 - .99)).
+        k = max(1, int(math.ceil(self.Count * (1. - confidence) - 1e-9)))
+        if k > self.TailSize:
+            raise ValueError('Tail of {0} losses needed, only {1} kept'.format(k, self.TailSize))
+        return k
+
+    def GetTail(self, confidence):
+        """
+        The losses in the tail, largest first.
+        :param confidence: float
+        :return: list
+        """
+        return heapq.nlargest(self.GetTailCount(confidence), self.Heap)
+
+    def GetVaR(self, confidence):
+        """
+        :param confidence: float
+        :return: float
+        """
+        return self.GetTail(confidence)[-1]
+
+    def GetExpectedShortfall(self, confidence):
+        """
+        :param confidence: float
+        :return: float
+        """
+        tail = self.GetTail(confidence)
+        return sum(tail) / len(tail)
+
+
+def PriceScenarioChunk(dates, book_flows, chunk, interpolation='linear'):
+    """
+    Value each book in each scenario of a chunk. book_flows[b] holds the (weighted) cash flows of
+    book b on each of the dates. Scenarios are ZeroCurve objects or (maturities, zero rates) tuples.
+    Returns a scenarios x books list of values.
+
+    A module-level function, so it can be sent to a process pool.
+    :param dates: list
+    :param book_flows: list
+    :param chunk: list
+    :param interpolation: str
+    :return: list
+    """
+    out = []
+    for scenario in chunk:
+        if not isinstance(scenario, ZeroCurve):
+            scenario = ZeroCurve(scenario[0], scenario[1], interpolation=interpolation)
+        DFs = scenario.GetDFs(dates)
+        row = []
+        for flows in book_flows:
+            value = 0.
+            for cf, df in zip(flows, DFs):
+                value += cf * df
+            row.append(value)
+        out.append(row)
+    return out
+
+
+class ScenarioRisk(object):
+    """
+    VaR and expected shortfall of a book of CouponBond objects over curve scenarios, for the whole
+    book (Total) and for each sub-book.
+
+    >>> from simplepricers.bonds_curves import CouponBond, ZeroCurve
+    >>> risk = ScenarioRisk([CouponBond(5., .05, 1)], [100.], tail_size=5)
+    >>> scenarios = [([0., 10.], [.05 + .0001 * i, .05 + .0001 * i]) for i in range(-50, 50)]
+    >>> risk.Run(scenarios, ZeroCurve([0., 10.], [.05, .05]))
+    >>> round(risk.Total.GetVaR(.99), 4) == round(100. - risk.GetBookValues([0., 10.], [.0549, .0549])[0], 4)
+    True
+    """
+    def __init__(self, bonds, notionals=None, books=None, now=0., tail_size=100, lattice=None):
+        """
+        :param bonds: list
+        :param notionals: list
+        :param books: list
+        :param now: float
+        :param tail_size: int
+        :param lattice: DateLattice
+        """
+        if books is None:
+            books = ['Book', ] * len(bonds)
+        if not len(books) == len(bonds):
+            raise ValueError('bonds and books must be the same length')
+        portfolio = Portfolio(bonds, notionals, lattice)
+        matrix = portfolio.BuildCashFlowMatrix(now)
+        lattice = portfolio.Lattice
+        columns = matrix.GetUsedColumns()
+        position = dict((c, i) for i, c in enumerate(columns))
+        self.BookNames = sorted(set(books))
+        book_pos = dict((name, i) for i, name in enumerate(self.BookNames))
+        self.Dates = [lattice.GetDate(lattice.Ticks[c]) for c in columns]
+        # Aggregate the weighted cash flows of each book onto the dates, in one pass over the bonds.
+        self.BookFlows = [[0., ] * len(columns) for name in self.BookNames]
+        for i in range(0, matrix.GetNumRows()):
+            flows = self.BookFlows[book_pos[books[i]]]
+            w = portfolio.Notionals[i] / portfolio.Bonds[i].PriceBase
+            for c, a in zip(matrix.RowColumns[i], matrix.RowAmounts[i]):
+                flows[position[c]] += w * a
+        self.TailSize = tail_size
+        self.BaseValues = None
+        self.Tails = None
+        self.Total = None
+
+    def GetBookValues(self, mats, rates, interpolation='linear'):
+        """
+        Value of each book (in BookNames order) off a single curve.
+        :param mats: list
+        :param rates: list
+        :param interpolation: str
+        :return: list
+        """
+        return PriceScenarioChunk(self.Dates, self.BookFlows, [(mats, rates)], interpolation)[0]
+
+    def Run(self, scenarios, base_curve, chunk_size=250, executor=None, max_pending=4):
+        """
+        Reduce the losses over the scenarios (an iterable of ZeroCurve objects or (maturities,
+        zero rates) tuples) into the tail statistics. Losses are relative to the values off
+        base_curve.
+
+        If executor is given, up to max_pending chunks are priced at once in it.
+        :param scenarios: iterable
+        :param base_curve: ZeroCurve
+        :param chunk_size: int
+        :param executor: concurrent.futures.Executor
+        :param max_pending: int
+        :return: None
+        """
+        interpolation = base_curve.Interpolation
+        self.BaseValues = PriceScenarioChunk(self.Dates, self.BookFlows, [base_curve], interpolation)[0]
+        self.Tails = dict((name, TailStatistics(self.TailSize)) for name in self.BookNames)
+        self.Total = TailStatistics(self.TailSize)
+        pending = collections.deque()
+        for chunk in self.GetChunks(scenarios, chunk_size):
+            args = (self.Dates, self.BookFlows, chunk, interpolation)
+            if executor is None:
+                self.Accumulate(PriceScenarioChunk(*args))
+                continue
+            pending.append(executor.submit(PriceScenarioChunk, *args))
+            if len(pending) >= max_pending:
+                self.Accumulate(pending.popleft().result())
+        while len(pending) > 0:
+            self.Accumulate(pending.popleft().result())
+
+    @staticmethod
+    def GetChunks(scenarios, chunk_size):
+        chunk = []
+        for scenario in scenarios:
+            chunk.append(scenario)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if len(chunk) > 0:
+            yield chunk
+
+    def Accumulate(self, values):
+        """
+        Add the losses for a chunk of scenario values (scenarios x books).
+        :param values: list
+        :return: None
+        """
+        tails = [self.Tails[name] for name in self.BookNames]
+        for row in values:
+            total = 0.
+            for tail, base, value in zip(tails, self.BaseValues, row):
+                loss = base - value
+                tail.Add(loss)
+                total += loss
+            self.Total.Add(total)
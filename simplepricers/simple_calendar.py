@@ -27,6 +27,153 @@ limitations under the License.
 
 """
 
+from array import array
+import bisect
+import functools
+import math
+
+from simplepricers.dual import Dual
+from simplepricers.utils import _TrackedList
+
+
+@functools.total_ordering
+class Date360(object):
+    """
+    A date on the 360-day calendar, stored as an integer serial day number:
+        serial = 360*year + 30*(month-1) + (day-1)
+    so serial/360 is the year fraction used everywhere else in the package.
+
+    Since the serial day is an integer, dates compare exactly and can be used as dictionary keys.
+
+    >>> d = Date360.FromYMD(1976, 7, 1)
+    >>> d
+    Date360(1976, 7, 1)
+    >>> float(d)
+    1976.5
+    >>> d.AddMonths(7).GetYMD()
+    (1977, 2, 1)
+    >>> Date360.FromYearFraction(1976.5 + 1e-12) == d
+    True
+    """
+    __slots__ = ('Serial',)
+
+    def __init__(self, serial):
+        """
+        :param serial: int
+        """
+        if not isinstance(serial, int):
+            raise TypeError('Serial day must be an integer')
+        self.Serial = serial
+
+    @classmethod
+    def FromYMD(cls, year, month=1, day=1):
+        """
+        :param year: int
+        :param month: int
+        :param day: int
+        :return: Date360
+        """
+        return cls(SimpleCalendar360().GetSerialDay(year, month, day))
+
+    @classmethod
+    def FromYearFraction(cls, date):
+        """
+        Nearest day to a year fraction date.
+        :param date: float
+        :return: Date360
+        """
+        return cls(int(round(date * 360.)))
+
+    def GetYearFraction(self):
+        """
+        :return: float
+        """
+        return self.Serial / 360.
+
+    def __float__(self):
+        return self.GetYearFraction()
+
+    def GetYMD(self):
+        """
+        :return: tuple
+        """
+        return SimpleCalendar360().SerialToYMD(self.Serial)
+
+    def AddDays(self, num_days):
+        """
+        :param num_days: int
+        :return: Date360
+        """
+        return Date360(self.Serial + num_days)
+
+    def AddMonths(self, num_months):
+        """
+        :param num_months: int
+        :return: Date360
+        """
+        return Date360(self.Serial + 30 * num_months)
+
+    def __eq__(self, other):
+        if not isinstance(other, Date360):
+            return NotImplemented
+        return self.Serial == other.Serial
+
+    def __lt__(self, other):
+        if not isinstance(other, Date360):
+            return NotImplemented
+        return self.Serial < other.Serial
+
+    def __hash__(self):
+        return hash(self.Serial)
+
+    def __repr__(self):
+        return 'Date360({0}, {1}, {2})'.format(*self.GetYMD())
+
+
+def ToYearFraction(date):
+    """
+    Convert a Date360 to a year fraction; anything else is returned unchanged. Pricing functions
+    call this on their date inputs, so that they accept either representation.
+    >>> ToYearFraction(Date360.FromYMD(2000, 4))
+    2000.25
+    >>> ToYearFraction(2000.25)
+    2000.25
+
+    :param date: Date360
+    :return: float
+    """
+    if isinstance(date, Date360):
+        return date.GetYearFraction()
+    return date
+
+
+def ToSerialDay(date, toler=1e-6):
+    """
+    The serial day (see Date360) of a date: exact for a Date360; for a year fraction, the nearest
+    day if the date is within toler days of it, otherwise None. Used to key schedules and caches
+    on exact integers, whichever way the date was given.
+    >>> ToSerialDay(Date360.FromYMD(2000, 4))
+    720090
+    >>> ToSerialDay(2000. + 3. / 12.)
+    720090
+    >>> ToSerialDay(2000.5833) is None
+    True
+
+    :param date: Date360
+    :param toler: float
+    :return: int
+    """
+    if isinstance(date, Date360):
+        return date.Serial
+    if not isinstance(date, (int, float)):
+        return None
+    scaled = date * 360.
+    serial = int(round(scaled))
+    if abs(scaled - serial) > toler:
+        return None
+    return serial
+
+
 class SimpleCalendar360(object):
     """
     This class holds the functions for a calendar that consists of:
@@ -54,6 +201,72 @@ class SimpleCalendar360(object):
         """
         return float(year) + (float(month-1)/self.NumMonths) + (float(day-1) / self.NumDaysPerYear)
 
+    def GetSerialDay(self, year, month=1, day=1):
+        """
+        Integer day number for a date (see Date360).
+        :param year: int
+        :param month: int
+        :param day: int
+        :return: int
+        """
+        return 360 * int(year) + 30 * (int(month) - 1) + (int(day) - 1)
+
+    def GetSerialDays(self, years, months=None, days=None):
+        """
+        Vectorised GetSerialDay(); months and days default to 1.
+
+        >>> SimpleCalendar360().GetSerialDays([2000, 2000], [1, 7], [1, 16])
+        [720000, 720195]
+
+        :param years: list
+        :param months: list
+        :param days: list
+        :return: list
+        """
+        if months is None:
+            months = [1, ] * len(years)
+        if days is None:
+            days = [1, ] * len(years)
+        if not (len(years) == len(months) == len(days)):
+            raise ValueError('years, months and days must be the same length')
+        return [360 * int(y) + 30 * (int(m) - 1) + (int(d) - 1) for y, m, d in zip(years, months, days)]
+
+    def SerialToYMD(self, serial):
+        """
+        Convert a serial day (or list of serial days) to (year, month, day).
+        :param serial: int
+        :return: tuple
+        """
+        if type(serial) is list:
+            return [self.SerialToYMD(x) for x in serial]
+        year, day_of_year = divmod(serial, 360)
+        month, day = divmod(day_of_year, 30)
+        return year, month + 1, day + 1
+
+    def SerialToYearFraction(self, serial):
+        """
+        Convert a serial day (or list of serial days) to year fraction dates.
+        :param serial: int
+        :return: float
+        """
+        if type(serial) is list:
+            return [x / self.NumDaysPerYear for x in serial]
+        return serial / self.NumDaysPerYear
+
+    def YearFractionToSerial(self, date):
+        """
+        Convert a year fraction (or list of them) to the nearest serial day.
+
+        >>> SimpleCalendar360().YearFractionToSerial([2000.5, 2000. + 1./360.])
+        [720180, 720001]
+
+        :param date: float
+        :return: int
+        """
+        if type(date) is list:
+            return [int(round(x * self.NumDaysPerYear)) for x in date]
+        return int(round(date * self.NumDaysPerYear))
+
     def AddMonths(self, date, num_months):
         """
         Shift a date by a number of months
@@ -62,6 +275,8 @@ class SimpleCalendar360(object):
         :return: float
         """
         # NOTE: If we get rounding issues, could do modulo-12.
+        if isinstance(date, Date360):
+            return date.AddMonths(num_months)
         return date + (float(num_months)/self.NumMonths)
 
 
@@ -69,62 +284,330 @@ class Indexation(object):
     """
     Class that manages simple indexation calculations.
 
-    Probably should be done with numeric array objects, but stick with lists for now.
+    The index history is held in two sorted arrays (IndexDates, IndexValues). New prints can be
+    added with AppendIndexValue(); a print after the last date is an O(1) append.
 
-    I want this code to be very easy to understand, with no worries about performance.
+    Interpolated and extrapolated values are cached. When history is added, only cached values
+    after the previous index point are dropped; changing ExtrapolationRate only drops extrapolated
+    values. The same rule applies to the dense table built by BuildIndexTable().
     """
 
     def __init__(self):
         self.Calendar = SimpleCalendar360()
-        self.IndexDateValues = []
-        self.ExtrapolationRate = None
+        self.IndexDates = array('d')
+        self.IndexValues = array('d')
+        # Index values for dates that are exactly on a day, keyed by serial day (see Date360).
+        self.SerialDayValues = {}
+        # Incremented whenever the history changes.
+        self.Version = 0
+        # date -> value, for dates inside the history, and for dates past the last point.
+        self.InterpolationCache = {}
+        self.ExtrapolationCache = {}
+        self._ExtrapolationRate = None
+        # Dense table of index values on a serial day grid; see BuildIndexTable().
+        self.IndexTable = None
+
+    @property
+    def ExtrapolationRate(self):
+        return self._ExtrapolationRate
+
+    @ExtrapolationRate.setter
+    def ExtrapolationRate(self, rate):
+        old = self._ExtrapolationRate
+        # Compare by value, so that setting an equal rate (a different float object) keeps the caches.
+        if (rate is None) != (old is None) or (rate is not None and rate != old):
+            self.ExtrapolationCache = {}
+            if len(self.IndexDates) > 0:
+                self.InvalidateIndexTable(self.IndexDates[-1])
+        self._ExtrapolationRate = rate
+
+    @property
+    def IndexDateValues(self):
+        """
+        The history as a list of (date, value) tuples. The history is stored in IndexDates and
+        IndexValues; assigning a list of tuples to IndexDateValues, or changing the returned list
+        in place (for example, with append()), rebuilds them with SetIndexValues(). (Use
+        AppendIndexValue() to add points without rebuilding.)
+        :return: list
+        """
+        pairs = _TrackedList(zip(self.IndexDates, self.IndexValues))
+        pairs.OnChange = lambda: self._SetIndexDateValues(pairs)
+        return pairs
+
+    @IndexDateValues.setter
+    def IndexDateValues(self, pairs):
+        self._SetIndexDateValues(pairs)
+
+    def _SetIndexDateValues(self, pairs):
+        pairs = list(pairs)
+        self.SetIndexValues([d for d, v in pairs], [v for d, v in pairs])
 
     def SetIndexValues(self, dates, values):
         """
-        Add two lists of dates/values to the
+        Replace the history with two lists of dates/values. Dates may be year fractions or Date360.
         :param dates: list
         :param values: list
         :return:
         """
         if not len(dates) == len(values):
             raise ValueError('dates and values vectors not the same size')
-        # Not sure how to do this efficiently, do it brute force style
-        self.IndexDateValues = []
-        # Save the data as tuples
-        for d,v in zip(dates, values):
-            self.IndexDateValues.append((d, v))
-        self.IndexDateValues.sort()
+        pairs = sorted([(ToYearFraction(d), v) for d, v in zip(dates, values)])
+        self.IndexDates = array('d', [d for d, v in pairs])
+        self.IndexValues = array('d', [v for d, v in pairs])
+        self.SerialDayValues = {}
+        for d, v in pairs:
+            self.AddSerialDayValue(d, v)
+        self.InterpolationCache = {}
+        self.ExtrapolationCache = {}
+        self.IndexTable = None
+        self.Version += 1
+
+    def AddSerialDayValue(self, date, value):
+        serial = ToSerialDay(date)
+        if serial is not None:
+            self.SerialDayValues[serial] = value
+
+    def AppendIndexValue(self, date, value):
+        """
+        Add one index point. If the date is after the last point, this is an append; otherwise
+        it is inserted in order (replacing the value if the date is already present).
+
+        Only cached values after the previous index point (which are the only ones that can change)
+        are invalidated.
+        :param date: float
+        :param value: float
+        :return: None
+        """
+        date = ToYearFraction(date)
+        n = len(self.IndexDates)
+        if n == 0 or date > self.IndexDates[-1]:
+            # Only extrapolated values are affected
+            if n == 0:
+                self.InvalidateIndexTable()
+            else:
+                self.InvalidateIndexTable(self.IndexDates[-1])
+            self.IndexDates.append(date)
+            self.IndexValues.append(value)
+            self.ExtrapolationCache = {}
+        else:
+            pos = bisect.bisect_left(self.IndexDates, date)
+            if self.IndexDates[pos] == date:
+                self.IndexValues[pos] = value
+            else:
+                self.IndexDates.insert(pos, date)
+                self.IndexValues.insert(pos, value)
+            if pos == 0:
+                self.InterpolationCache = {}
+                self.InvalidateIndexTable()
+            else:
+                cutoff = self.IndexDates[pos - 1]
+                self.InterpolationCache = dict([(k, v) for k, v in self.InterpolationCache.items()
+                                                if self.CacheKeyToDate(k) <= cutoff])
+                self.InvalidateIndexTable(cutoff)
+            self.ExtrapolationCache = {}
+        self.AddSerialDayValue(date, value)
+        self.Version += 1
+
+    def AppendIndexValues(self, dates, values):
+        """
+        Add a list of index points with AppendIndexValue().
+        :param dates: list
+        :param values: list
+        :return: None
+        """
+        if not len(dates) == len(values):
+            raise ValueError('dates and values vectors not the same size')
+        for d, v in zip(dates, values):
+            self.AppendIndexValue(d, v)
 
     def GetValue(self, date):
         """
-        Return the index value for a date
+        Return the index value for a date. Dates that are on a day (Date360s, or year fractions
+        within rounding of a day) are found by their serial day (see ToSerialDay()): an index point
+        is looked up directly, and other values are cached by serial day, so neither relies on
+        float equality.
+        :param date: float
+        :return: float
+        """
+        if len(self.IndexDates) == 0:
+            raise ValueError('No index data in object')
+        serial = ToSerialDay(date)
+        if serial is not None and serial in self.SerialDayValues:
+            return self.SerialDayValues[serial]
+        date = ToYearFraction(date)
+        if date > self.IndexDates[-1]:
+            cache = self.ExtrapolationCache
+        else:
+            cache = self.InterpolationCache
+        key = date if serial is None else serial
+        if key in cache:
+            return cache[key]
+        out = self.CalcValue(date)
+        cache[key] = out
+        return out
+
+    @staticmethod
+    def CacheKeyToDate(key):
+        """
+        The year fraction for a GetValue() cache key (integer keys are serial days).
+        :param key: float
+        :return: float
+        """
+        if isinstance(key, int):
+            return key / 360.
+        return key
+
+    def CalcValue(self, date):
+        """
+        Calculate the index value for a (year fraction) date, without using the caches.
         :param date: float
         :return: float
         """
-        if len(self.IndexDateValues) == 0:
+        if len(self.IndexDates) == 0:
             raise ValueError('No index data in object')
-        if date < self.IndexDateValues[0][0]:
+        if date < self.IndexDates[0]:
             raise ValueError('Date before start of index data')
-        prev_d, prev_v = self.IndexDateValues[0]
-        # Go through the index points, which we assume are ordered.
-        for d,v in self.IndexDateValues:
-            # Special case, we hit the new point exactly.
-            # This also covers the special case where the date matches the first index date exactly
-            if d == date:
-                return v
-            # Is date in the interval [prev_d, d]?
-            if date < d:
-                # Interpolate
-                fac = (date - prev_d)/(d - prev_d)
-                return prev_v + fac*(v - prev_v)
-            # Otherwise, keep going
-            prev_d = d
-            prev_v = v
-        # If we get here, we are outside the interval
-        # TODO: Add an extrapolation feature.
-        if self.ExtrapolationRate is None:
-            raise ValueError('Date greater than index data')
-        return prev_v*pow(1+self.ExtrapolationRate,date-prev_d)
+        if date > self.IndexDates[-1]:
+            if self.ExtrapolationRate is None:
+                raise ValueError('Date greater than index data')
+            prev_d = self.IndexDates[-1]
+            prev_v = self.IndexValues[-1]
+            return prev_v*pow(1+self.ExtrapolationRate,date-prev_d)
+        pos = bisect.bisect_left(self.IndexDates, date)
+        d = self.IndexDates[pos]
+        v = self.IndexValues[pos]
+        # Special case, we hit the point exactly.
+        if d == date:
+            return v
+        # Interpolate in [prev_d, d]
+        prev_d = self.IndexDates[pos - 1]
+        prev_v = self.IndexValues[pos - 1]
+        fac = (date - prev_d)/(d - prev_d)
+        return prev_v + fac*(v - prev_v)
+
+    def BuildIndexTable(self, start, end, step='daily'):
+        """
+        Build (or extend) a dense table of index values on the calendar grid, from start to end
+        (inclusive). step is 'daily' or 'monthly' (every 30 days from start).
+
+        The table is filled lazily: when the history or ExtrapolationRate changes, only the entries
+        after the change are recalculated, the next time the table is used. Once built, GetValues()
+        is a table lookup for dates on the grid.
+
+        Raises a ValueError if the grid starts before the history, or ends after it while there
+        is no ExtrapolationRate (rather than failing later, when the table is filled).
+        :param start: Date360
+        :param end: Date360
+        :param step: str
+        :return: IndexTable
+        """
+        if step == 'daily':
+            step_days = 1
+        elif step == 'monthly':
+            step_days = int(self.Calendar.NumDaysPerMonth)
+        else:
+            raise ValueError('step must be daily or monthly')
+        start = self.ToSerial(start)
+        end = self.ToSerial(end)
+        if end < start:
+            raise ValueError('Table end must be after start')
+        num = (end - start) // step_days + 1
+        if len(self.IndexDates) == 0:
+            raise ValueError('No index data in object')
+        to_date = self.Calendar.SerialToYearFraction
+        if to_date(start) < self.IndexDates[0]:
+            raise ValueError('Date before start of index data')
+        if self.ExtrapolationRate is None and to_date(start + (num - 1) * step_days) > self.IndexDates[-1]:
+            raise ValueError('Table end is after the index data, and there is no ExtrapolationRate')
+        table = self.IndexTable
+        if table is None or table.Start != start or table.Step != step_days:
+            table = IndexTable(start, step_days)
+            self.IndexTable = table
+        if num > len(table.Values):
+            table.Values.extend([0., ] * (num - len(table.Values)))
+        self.RefreshIndexTable()
+        return table
+
+    def ToSerial(self, date):
+        """
+        Serial day for a Date360 or year fraction date (rounded to the nearest day).
+        :param date: Date360
+        :return: int
+        """
+        if isinstance(date, Date360):
+            return date.Serial
+        return self.Calendar.YearFractionToSerial(date)
+
+    def RefreshIndexTable(self):
+        """
+        Recalculate the table entries that have been invalidated. (Not done while ExtrapolationRate
+        is a Dual; the entries stay invalid until it is a float again.)
+        :return: None
+        """
+        table = self.IndexTable
+        if table is None or isinstance(self.ExtrapolationRate, Dual):
+            return
+        for k in range(table.ValidCount, len(table.Values)):
+            date = self.Calendar.SerialToYearFraction(table.Start + k * table.Step)
+            table.Values[k] = self.CalcValue(date)
+        table.ValidCount = len(table.Values)
+
+    def InvalidateIndexTable(self, date=None):
+        """
+        Mark table entries for dates after date as needing recalculation (all entries if date is None).
+        :param date: float
+        :return: None
+        """
+        table = self.IndexTable
+        if table is None:
+            return
+        if date is None:
+            table.ValidCount = 0
+            return
+        # Number of grid points on or before date
+        keep = int(math.floor((date * self.Calendar.NumDaysPerYear - table.Start) / table.Step + 1e-9)) + 1
+        table.ValidCount = max(0, min(table.ValidCount, keep))
 
+    def GetValues(self, dates):
+        """
+        Index values for a list of dates. Dates on the grid of the table built by BuildIndexTable()
+        are looked up in the table; others use GetValue().
+        :param dates: list
+        :return: list
+        """
+        table = self.IndexTable
+        # The table holds floats, so a Dual ExtrapolationRate (see dual.py) bypasses it.
+        if table is None or isinstance(self.ExtrapolationRate, Dual):
+            return [self.GetValue(d) for d in dates]
+        if table.ValidCount < len(table.Values):
+            self.RefreshIndexTable()
+        values = table.Values
+        num = len(values)
+        out = []
+        for d in dates:
+            serial = ToSerialDay(d)
+            if serial is None:
+                out.append(self.GetValue(d))
+                continue
+            k, r = divmod(serial - table.Start, table.Step)
+            if r == 0 and 0 <= k < num:
+                out.append(values[k])
+            else:
+                out.append(self.GetValue(d))
+        return out
 
 
+class IndexTable(object):
+    """
+    Dense table of index values on a grid of serial days: Values[k] is the value on serial day
+    Start + k*Step. Entries at positions >= ValidCount need to be recalculated.
+    """
+    def __init__(self, start, step):
+        """
+        :param start: int
+        :param step: int
+        """
+        self.Start = start
+        self.Step = step
+        self.Values = array('d')
+        self.ValidCount = 0
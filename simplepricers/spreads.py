@@ -0,0 +1,181 @@
+"""
+spreads.py
+
+Batch spread solvers against a ZeroCurve.
+
+The Z-spread of a bond is the constant s that, added to every zero rate on the curve, discounts
+the cash flows back to the market (dirty) price:
+    price = sum(cf[i] * (1 + z(t[i]) + s)^(-t[i]))
+(As in CouponBond.GetPriceFromZeroCurve(), the curve is indexed by the cash flow date.)
+
+The zero rates for each bond's cash flows are looked up once. Newton's method is then run on
+the whole universe at once: each iteration updates every bond that has not converged. The price
+is convex and decreasing in s, so Newton steps are well behaved; a step that would make a
+discount base non-positive is halved.
+
+The yield spread is the bond's yield at the market price less its yield at the curve (model)
+price. A flat yield is the Z-spread over a curve of zero rates, so the same solver is used.
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import math
+
+import simplepricers.yieldcalculations as yc
+
+
+class SpreadResult(object):
+    """
+    Spreads (None where the solve failed), with the Newton iteration count and a convergence flag
+    for each bond.
+    """
+    def __init__(self, spreads, iterations, converged):
+        self.Spreads = spreads
+        self.Iterations = iterations
+        self.Converged = converged
+
+
+def _solve_spreads(schedules, prices, toler, max_iter, guess):
+    """
+    schedules: list of (times, cash flows, base rates). Solves for s in
+        price = sum(cf * (1 + base + s)^(-t))
+    """
+    n = len(schedules)
+    spreads = [guess, ] * n
+    iterations = [0, ] * n
+    converged = [False, ] * n
+    active = [i for i in range(0, n) if len(schedules[i][0]) > 0]
+    for it in range(1, max_iter + 1):
+        if len(active) == 0:
+            break
+        still_active = []
+        for i in active:
+            times, flows, base = schedules[i]
+            s = spreads[i]
+            value = 0.
+            slope = 0.
+            for t, cf, z in zip(times, flows, base):
+                growth = 1. + z + s
+                pv = cf * math.pow(growth, -t)
+                value += pv
+                slope -= t * pv / growth
+            iterations[i] = it
+            if slope == 0.:
+                continue
+            step = (value - prices[i]) / slope
+            new_s = s - step
+            # Keep every discount base positive.
+            floor = -1. - min(base)
+            while new_s <= floor:
+                step /= 2.
+                new_s = s - step
+            spreads[i] = new_s
+            if abs(step) <= toler:
+                converged[i] = True
+            else:
+                still_active.append(i)
+        active = still_active
+    return SpreadResult([s if c else None for s, c in zip(spreads, converged)], iterations, converged)
+
+
+def SolveZSpreads(bonds, prices, ZC, now=0., toler=1e-12, max_iter=50, guess=0.):
+    """
+    Z-spreads (annual compounding, added to the curve zero rates) of a list of CouponBond objects
+    at dirty prices.
+
+    >>> from simplepricers.bonds_curves import CouponBond, ZeroCurve
+    >>> ZC = ZeroCurve([0., 10.], [.04, .04])
+    >>> bond = CouponBond(5., .05, 1)
+    >>> res = SolveZSpreads([bond], [bond.GetPrice(.05, price_type='dirty')], ZC)
+    >>> round(res.Spreads[0], 10), res.Converged[0]
+    (0.01, True)
+
+    :param bonds: list
+    :param prices: list
+    :param ZC: ZeroCurve
+    :param now: float
+    :param toler: float
+    :param max_iter: int
+    :param guess: float
+    :return: SpreadResult
+    """
+    if not len(bonds) == len(prices):
+        raise ValueError('bonds and prices must be the same length')
+    schedules = []
+    for bond in bonds:
+        bond.GenerateCashFlows(now)
+        dates = list(bond.CashFlowDates)
+        schedules.append((dates, list(bond.CashFlows), ZC.GetZeroRates(dates)))
+    return _solve_spreads(schedules, prices, toler, max_iter, guess)
+
+
+def SolveYields(bonds, prices, now=0., toler=1e-12, max_iter=50, guess=.05):
+    """
+    Yields (bond convention, as CouponBond.GetYield()) for a list of bonds at dirty prices, solved
+    together. (The yields are returned in the Spreads list of the result: the spread over zero.)
+
+    >>> from simplepricers.bonds_curves import CouponBond
+    >>> res = SolveYields([CouponBond(10., .05, 2)], [100.])
+    >>> round(res.Spreads[0], 10)
+    0.05
+
+    :param bonds: list
+    :param prices: list
+    :param now: float
+    :param toler: float
+    :param max_iter: int
+    :param guess: float
+    :return: SpreadResult
+    """
+    if not len(bonds) == len(prices):
+        raise ValueError('bonds and prices must be the same length')
+    schedules = []
+    for bond in bonds:
+        bond.GenerateCashFlows(now)
+        schedules.append((list(bond.CashFlowDates), list(bond.CashFlows), [0., ] * len(bond.CashFlows)))
+    res = _solve_spreads(schedules, prices, toler, max_iter, guess)
+    for i, bond in enumerate(bonds):
+        if res.Spreads[i] is not None and bond.CouponFrequency == 2:
+            res.Spreads[i] = yc.ConvertRate(res.Spreads[i], '1', '2')
+    return res
+
+
+def SolveYieldSpreads(bonds, prices, ZC, now=0., toler=1e-12, max_iter=50):
+    """
+    Yield spreads: yield at the market price less the yield at the price off ZC (both bond
+    convention). Iterations are the total for both solves; a bond converges if both solves do.
+
+    >>> from simplepricers.bonds_curves import CouponBond, ZeroCurve
+    >>> ZC = ZeroCurve([0., 10.], [.04, .04])
+    >>> bond = CouponBond(5., .05, 1)
+    >>> round(SolveYieldSpreads([bond], [bond.GetPrice(.05, price_type='dirty')], ZC).Spreads[0], 10)
+    0.01
+
+    :param bonds: list
+    :param prices: list
+    :param ZC: ZeroCurve
+    :param now: float
+    :param toler: float
+    :param max_iter: int
+    :return: SpreadResult
+    """
+    model_prices = [b.GetPriceFromZeroCurve(now, ZC, price_type='dirty') for b in bonds]
+    market = SolveYields(bonds, prices, now, toler, max_iter)
+    model = SolveYields(bonds, model_prices, now, toler, max_iter)
+    spreads = []
+    for y_mkt, y_mod in zip(market.Spreads, model.Spreads):
+        spreads.append(None if (y_mkt is None or y_mod is None) else y_mkt - y_mod)
+    return SpreadResult(spreads, [a + b for a, b in zip(market.Iterations, model.Iterations)],
+                        [a and b for a, b in zip(market.Converged, model.Converged)])
@@ -0,0 +1,347 @@
+"""
+surfaces.py
+
+Price, duration and convexity surfaces for bullet coupon bonds over grids of maturities,
+coupons, yields and pricing dates, in one call.
+
+Prices are dirty, per 100 face, at a flat bond-convention yield (as CouponBond.GetPrice()).
+Duration is the modified duration -(dP/dy)/P and convexity is (d2P/dy2)/P, with y the quoted
+yield; these are calculated analytically rather than with yield shocks.
+
+With n payments remaining, the first on date t1 (all dates measured as in CouponBond: cash flows
+are discounted by their date), L = log(1+Y) for the annual-compounding yield Y, and
+u = exp(-L/f), the coupon leg is a geometric series:
+    sum_k exp(-t_k L) = exp(-t1 L) * S0,
+    sum_k t_k exp(-t_k L) = exp(-t1 L) * (t1 S0 + S1/f),
+    sum_k t_k^2 exp(-t_k L) = exp(-t1 L) * (t1^2 S0 + 2 t1 S1/f + S2/f^2),
+where Sj = sum_{k=0}^{n-1} k^j u^k has a closed form. (For u close to 1, the closed forms lose
+precision, and the sums are built up by doubling the number of terms.) The price is linear in
+the coupon, so the annuity terms are calculated once for each (maturity, yield, now) and reused
+for every coupon.
+The discount factor exp(-t1 L) cancels out of duration and convexity.
+
+The work is done a (maturity, now) pair at a time, over the whole yield axis. For a list of
+yields, this uses list comprehensions, and a grid of 10^6 (maturity, yield) points with a single
+coupon takes around a second. If the yields are a NumPy array, the same steps are done with
+array arithmetic, and the results are arrays; the 10^6 point grid then takes under a tenth of a
+second (as long as the yield axis is long enough to amortise the per-pair overhead).
+
+Copyright 2016 Brian Romanchuk
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import math
+
+from simplepricers.simple_calendar import ToYearFraction
+from simplepricers.utils import _as_list, _is_array, coupon_period_count
+
+NaN = float('nan')
+# Below this value of L/f, the geometric sums are built up by doubling, not the closed forms.
+SeriesCutoff = .01
+
+
+def _is_scalar(x):
+    return not (hasattr(x, '__len__') or hasattr(x, 'tolist'))
+
+
+def _squeeze(values, keep):
+    """
+    Drop the axes of a nested list where keep is False (those axes have length 1).
+    """
+    if all(keep):
+        return values
+    if keep[0]:
+        return [_squeeze(v, keep[1:]) for v in values]
+    return _squeeze(values[0], keep[1:])
+
+
+def geometric_sums(u, n, log_u=None):
+    """
+    (S0, S1, S2): the sums of k^j * u^k for k = 0, ..., n-1, for j = 0, 1, 2.
+
+    >>> [round(x, 10) for x in geometric_sums(.5, 3)]
+    [1.75, 1.0, 1.5]
+
+    :param u: float
+    :param n: int
+    :param log_u: float
+    :return: tuple
+    """
+    if log_u is None:
+        log_u = math.log(u)
+    if abs(log_u) < SeriesCutoff:
+        return _doubling_sums(n, lambda m: math.exp(m * log_u))
+    u_n1 = math.exp((n - 1) * log_u)
+    u_n = u_n1 * u
+    one_minus = -math.expm1(log_u)
+    s0 = -math.expm1(n * log_u) / one_minus
+    s1 = u * (1. - n * u_n1 + (n - 1) * u_n) / (one_minus * one_minus)
+    s2 = u * (1. + u - n * n * u_n1 + (2 * n * n - 2 * n - 1) * u_n
+              - (n - 1) * (n - 1) * u_n * u) / (one_minus * one_minus * one_minus)
+    return s0, s1, s2
+
+
+def _doubling_sums(n, power):
+    """
+    (S0, S1, S2) as in geometric_sums(), built up by doubling the number of terms (and adding one
+    more when that bit of n is set), with power(m) = u^m:
+        sum_{k=m}^{2m-1} k^j u^k = u^m * sum_{k=0}^{m-1} (k + m)^j u^k.
+    All the terms are positive, so there is no cancellation (unlike the closed forms for u near 1);
+    O(log(n)) steps. Only uses arithmetic, so power() may return an array.
+    """
+    s0 = s1 = s2 = 0.
+    m = 0
+    u_m = 1.
+    for bit in bin(n)[2:]:
+        s0, s1, s2 = (s0 + u_m * s0, s1 + u_m * (s1 + m * s0),
+                      s2 + u_m * (s2 + 2. * m * s1 + m * m * s0))
+        m *= 2
+        u_m = power(m)
+        if bit == '1':
+            s0 = s0 + u_m
+            s1 = s1 + m * u_m
+            s2 = s2 + m * m * u_m
+            m += 1
+            u_m = power(m)
+    return s0, s1, s2
+
+
+def _annuity_coefficients(logs, dLs, d2Ls, n, f):
+    """
+    For n payments at frequency f, lists over the yields of the terms that do not depend on the
+    first payment date t. With d = exp(-t * L), for each yield:
+        A = d * S0, dA = d * (t * P1 + P0), d2A = d * ((t * Q2 + Q1) * t + Q0),
+        R = d * U, dR = -mat * d * UdL, d2R = d * (mat^2 * UdL2 - mat * Ud2L).
+    """
+    out = tuple([] for k in range(0, 10))
+    S0, P1, P0, Q2, Q1, Q0, U, UdL, UdL2, Ud2L = out
+    for L, dL, d2L in zip(logs, dLs, d2Ls):
+        s0, s1, s2 = geometric_sums(math.exp(-L / f), n, -L / f)
+        s1 /= f
+        s2 /= f * f
+        # u^(n-1) = exp(-(mat - t) * L): the principal discount factor, relative to the first payment.
+        u = 100. * math.exp(-(n - 1) * L / f)
+        S0.append(s0)
+        # Derivatives with respect to L are -sum(t * pv) and sum(t^2 * pv).
+        P1.append(-s0 * dL)
+        P0.append(-s1 * dL)
+        Q2.append(s0 * dL * dL)
+        Q1.append(2. * s1 * dL * dL - s0 * d2L)
+        Q0.append(s2 * dL * dL - s1 * d2L)
+        U.append(u)
+        UdL.append(u * dL)
+        UdL2.append(u * dL * dL)
+        Ud2L.append(u * d2L)
+    return out
+
+
+def _maturity_surfaces(mat, nows, payments, logs, dLs, d2Ls, invalid, freq, sums):
+    """
+    Price, duration and convexity for one maturity, for each coupon payment, as flat lists over
+    the (yield, now) grid (now varying fastest).
+
+    logs, dLs and d2Ls are L, dL/dy and d2L/dy2 for each yield (with L = 0 for the out of range
+    yields, whose positions are in invalid), and sums caches _annuity_coefficients() by the number
+    of payments. Each row is built a pricing date at a time,
+    as list comprehensions over the yields. The discount factor to the first payment (d) cancels
+    out of duration and convexity, so they are calculated relative to it.
+    """
+    f = float(freq)
+    num_nows = len(nows)
+    size = len(logs) * num_nows
+    price = [[0., ] * size for C in payments]
+    duration = [[NaN, ] * size for C in payments]
+    convexity = [[NaN, ] * size for C in payments]
+    for j, now in enumerate(nows):
+        # The payment count and first payment date only depend on now.
+        n = coupon_period_count(mat, now, freq)
+        if n == 0:
+            continue
+        t = mat - float(n - 1) / f
+        if n not in sums:
+            sums[n] = _annuity_coefficients(logs, dLs, d2Ls, n, f)
+        S0, P1, P0, Q2, Q1, Q0, U, UdL, UdL2, Ud2L = sums[n]
+        disc = [math.exp(-t * L) for L in logs]
+        # The derivatives (divided by d) are C * coupon term + principal term.
+        d_coupon = [t * p1 + p0 for p1, p0 in zip(P1, P0)]
+        d_principal = [mat * u1 for u1 in UdL]
+        c_coupon = [(t * q2 + q1) * t + q0 for q2, q1, q0 in zip(Q2, Q1, Q0)]
+        c_principal = [mat * (mat * u2 - u1) for u2, u1 in zip(UdL2, Ud2L)]
+        for C, p_row, d_row, c_row in zip(payments, price, duration, convexity):
+            # Price divided by d.
+            K = [C * s0 + u for s0, u in zip(S0, U)]
+            p_row[j::num_nows] = [d * k for d, k in zip(disc, K)]
+            d_row[j::num_nows] = [(b - C * a) / k if k else NaN for k, a, b in zip(K, d_coupon, d_principal)]
+            c_row[j::num_nows] = [(C * a + b) / k if k else NaN for k, a, b in zip(K, c_coupon, c_principal)]
+    # Reset the out of range yields.
+    for i in invalid:
+        for p_row, d_row, c_row in zip(price, duration, convexity):
+            p_row[i * num_nows:(i + 1) * num_nows] = [0., ] * num_nows
+            d_row[i * num_nows:(i + 1) * num_nows] = [NaN, ] * num_nows
+            c_row[i * num_nows:(i + 1) * num_nows] = [NaN, ] * num_nows
+    return price, duration, convexity
+
+
+def _array_annuity_coefficients(growth, dL, d2L, n, f, q):
+    """
+    As _annuity_coefficients(), as arrays over the yields, with growth = 1 + y/q (so that
+    exp(-x * L) = growth^(-q * x)).
+    """
+    power = -q / f
+    s0, s1, s2 = _doubling_sums(n, lambda m: growth ** (power * m))
+    s1 = s1 / f
+    s2 = s2 / (f * f)
+    u = 100. * growth ** (power * (n - 1))
+    dL2 = dL * dL
+    return (s0, -s0 * dL, -s1 * dL, s0 * dL2, 2. * s1 * dL2 - s0 * d2L, s2 * dL2 - s1 * d2L,
+            u, u * dL, u * dL2, u * d2L)
+
+
+def _array_surfaces(maturities, payments, yields, nows, freq, quote_freq, invalid, keep):
+    """
+    CalcPriceSurfaces() for a NumPy-style array of yields: the same calculation as
+    _maturity_surfaces(), with array arithmetic over the yield axis in place of the list
+    comprehensions. Only arithmetic, reshape(), repeat() and indexing are used, so NumPy is not
+    imported.
+    """
+    q = float(quote_freq)
+    f = float(freq)
+    y = yields * 1.
+    if len(invalid) > 0:
+        y[invalid] = 0.
+    growth = 1. + y / q
+    dL = 1. / growth
+    d2L = -dL * dL / q
+    sizes = (len(maturities), len(payments), len(y), len(nows))
+    price = (growth * 0.).reshape(1, 1, sizes[2], 1)
+    price = price.repeat(sizes[0], 0).repeat(sizes[1], 1).repeat(sizes[3], 3)
+    duration = price + NaN
+    convexity = price + NaN
+    sums = {}
+    for i, mat in enumerate(maturities):
+        for j, now in enumerate(nows):
+            n = coupon_period_count(mat, now, freq)
+            if n == 0:
+                continue
+            t = mat - float(n - 1) / f
+            if n not in sums:
+                sums[n] = _array_annuity_coefficients(growth, dL, d2L, n, f, q)
+            S0, P1, P0, Q2, Q1, Q0, U, UdL, UdL2, Ud2L = sums[n]
+            disc = growth ** (-q * t)
+            d_coupon = t * P1 + P0
+            d_principal = mat * UdL
+            c_coupon = (t * Q2 + Q1) * t + Q0
+            c_principal = mat * (mat * UdL2 - Ud2L)
+            for k, C in enumerate(payments):
+                K = C * S0 + U
+                price[i, k, :, j] = disc * K
+                duration[i, k, :, j] = (d_principal - C * d_coupon) / K
+                convexity[i, k, :, j] = (C * c_coupon + c_principal) / K
+    if len(invalid) > 0:
+        price[:, :, invalid, :] = 0.
+        duration[:, :, invalid, :] = NaN
+        convexity[:, :, invalid, :] = NaN
+    shape = tuple(s for s, k in zip(sizes, keep) if k)
+    return PriceSurfaces(price.reshape(shape), duration.reshape(shape), convexity.reshape(shape), shape)
+
+
+class PriceSurfaces(object):
+    """
+    Price, Duration and Convexity as nested lists (or arrays, if the yields were an array),
+    indexed [maturity][coupon][yield][now]. Axes for arguments given as scalars are dropped.
+    Points where the bond has matured (or the yield is out of range) have a price of 0. and NaN
+    duration and convexity.
+    """
+    def __init__(self, price, duration, convexity, shape):
+        self.Price = price
+        self.Duration = duration
+        self.Convexity = convexity
+        self.Shape = shape
+
+
+def CalcPriceSurfaces(maturities, coupons, yields, nows=0., coupon_freq=1, yield_convention='bond'):
+    """
+    Price, duration and convexity of CouponBond(mat, coupon, coupon_freq) at bond-convention yield
+    on date now, for every combination of the arguments.
+
+    Each argument is either a scalar or a list (or array); each list argument becomes an axis of
+    the results, in the order (maturity, coupon, yield, now). If yields is a NumPy-style array,
+    the calculations are vectorised over the yield axis, and the results are arrays of shape
+    Shape; otherwise, they are nested lists.
+
+    >>> surf = CalcPriceSurfaces([5., 10.], .05, [.04, .05, .06], coupon_freq=2)
+    >>> surf.Shape
+    (2, 3)
+    >>> [round(p, 4) for p in surf.Price[1]]
+    [108.1757, 100.0, 92.5613]
+    >>> round(surf.Duration[1][1], 4)
+    7.7946
+
+    :param maturities: float or list
+    :param coupons: float or list
+    :param yields: float or list
+    :param nows: float or list
+    :param coupon_freq: int
+    :param yield_convention: str
+    :return: PriceSurfaces
+    """
+    if yield_convention != 'bond':
+        raise NotImplementedError('Unsupported yield_convention')
+    args = (maturities, coupons, yields, nows)
+    keep = tuple(not _is_scalar(x) for x in args)
+    maturities, coupons, yield_list, nows = [_as_list(x) if k else [x, ] for x, k in zip(args, keep)]
+    maturities = [ToYearFraction(m) for m in maturities]
+    nows = [ToYearFraction(x) for x in nows]
+    # The bond convention quotes semi-annual bonds with semi-annual compounding; everything else
+    # is annual.
+    quote_freq = 2 if coupon_freq == 2 else 1
+    payments = [100. * c / coupon_freq for c in coupons]
+    # L = log(1+Y) for the annual yield Y, with the chain rule terms from L to the quoted yield.
+    # Out of range yields are calculated with L = 0, and reset at the end.
+    logs = []
+    dLs = []
+    d2Ls = []
+    invalid = []
+    for i, y in enumerate(yield_list):
+        if y <= -quote_freq:
+            invalid.append(i)
+            y = 0.
+        growth = 1. + y / quote_freq
+        logs.append(quote_freq * math.log(growth))
+        dLs.append(1. / growth)
+        d2Ls.append(-1. / (quote_freq * growth * growth))
+    if _is_array(yields):
+        return _array_surfaces(maturities, payments, yields, nows, coupon_freq, quote_freq, invalid, keep)
+    num_nows = len(nows)
+    if keep[3]:
+        def split(x):
+            return [x[k:k + num_nows] for k in range(0, len(x), num_nows)]
+    else:
+        # A scalar now: the flat lists are already the yield axis.
+        def split(x):
+            return x
+        keep = keep[0:3]
+    sums = {}
+    price = []
+    duration = []
+    convexity = []
+    for mat in maturities:
+        p_mat, d_mat, c_mat = _maturity_surfaces(mat, nows, payments, logs, dLs, d2Ls, invalid,
+                                                 coupon_freq, sums)
+        price.append([split(x) for x in p_mat])
+        duration.append([split(x) for x in d_mat])
+        convexity.append([split(x) for x in c_mat])
+    sizes = (len(maturities), len(coupons), len(yield_list), num_nows)
+    shape = tuple(n for n, k in zip(sizes, keep) if k)
+    return PriceSurfaces(_squeeze(price, keep), _squeeze(duration, keep), _squeeze(convexity, keep), shape)
@@ -18,6 +18,8 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import math
+
 
 def create_grid(start, stop, frequency):
     """
@@ -67,3 +69,397 @@ def create_grid(start, stop, frequency):
     out = range(0, interval + 1)
     # return to original time interval as floats
     return [start + float(x) / frequency for x in out]
+
+
+def _as_list(x):
+    """Convert array-like objects (such as NumPy arrays) to a list, leave lists alone."""
+    if hasattr(x, 'tolist'):
+        return x.tolist()
+    return list(x)
+
+
+def _is_array(x):
+    """True for NumPy-style arrays (which support reshape() and argmin())."""
+    return hasattr(x, 'reshape') and hasattr(x, 'argmin')
+
+
+def _take(x, positions):
+    """x[i] for i in positions, as a list."""
+    if _is_array(x):
+        return x[positions].tolist()
+    return [x[i] for i in positions]
+
+
+class _TrackedList(list):
+    """
+    List that calls on_change() after it is modified in place, so that its owner can invalidate
+    cached calculations (or write the change back to its own storage).
+
+    >>> changes = []
+    >>> obj = _TrackedList([1, 2], lambda: changes.append(1))
+    >>> obj.append(3)
+    >>> obj[0] = 0
+    >>> obj, len(changes)
+    ([0, 2, 3], 2)
+    """
+    def __init__(self, values=(), on_change=None):
+        list.__init__(self, values)
+        self.OnChange = on_change
+
+    def __reduce__(self):
+        # Pass the values to the constructor, so that copying does not call on_change().
+        return _TrackedList, (list(self), self.OnChange)
+
+    def _changed(self):
+        if self.OnChange is not None:
+            self.OnChange()
+
+    def __setitem__(self, key, value):
+        list.__setitem__(self, key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        list.__delitem__(self, key)
+        self._changed()
+
+    def __iadd__(self, other):
+        out = list.__iadd__(self, other)
+        self._changed()
+        return out
+
+    def __imul__(self, n):
+        out = list.__imul__(self, n)
+        self._changed()
+        return out
+
+    def append(self, value):
+        list.append(self, value)
+        self._changed()
+
+    def extend(self, values):
+        list.extend(self, values)
+        self._changed()
+
+    def insert(self, pos, value):
+        list.insert(self, pos, value)
+        self._changed()
+
+    def pop(self, *args):
+        out = list.pop(self, *args)
+        self._changed()
+        return out
+
+    def remove(self, value):
+        list.remove(self, value)
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        list.reverse(self)
+        self._changed()
+
+
+def minmax_decimate(x, y, max_points):
+    """
+    minmax_decimate - Reduce a series to at most max_points points by splitting it into buckets
+    of consecutive points (one per "pixel column") and keeping the minimum and maximum y value
+    within each bucket (in x order). The first and last points are always kept.
+
+    This preserves the visual envelope of the series, which is what matters for plotting.
+
+    Series that are already small enough are returned unchanged (as lists).
+    >>> minmax_decimate([0, 1, 2], [5., 6., 7.], 10)
+    ([0, 1, 2], [5.0, 6.0, 7.0])
+
+    >>> minmax_decimate(list(range(0, 10)), [0., 5., 1., 1., -3., 2., 2., 2., 9., 0.], 6)
+    ([0, 1, 4, 5, 8, 9], [0.0, 5.0, -3.0, 2.0, 9.0, 0.0])
+
+    The buckets all have the same size (except the last). If y is a NumPy array, the buckets are
+    scanned with reshape() and argmin()/argmax() on the array, without converting it to a list;
+    otherwise min()/max()/index() are used on list slices. The results are the same.
+
+    :param x: list
+    :param y: list
+    :param max_points: int
+    :return: tuple
+    """
+    if not _is_array(x):
+        x = _as_list(x)
+    if not _is_array(y):
+        y = _as_list(y)
+    if not len(x) == len(y):
+        raise ValueError('x and y must be the same length')
+    n = len(y)
+    if n <= max_points:
+        return _as_list(x), _as_list(y)
+    if max_points < 4:
+        raise ValueError('max_points must be at least 4')
+    # Interior points only; the end points are added back at the end.
+    num_buckets = (max_points - 2) // 2
+    size = -(-(n - 2) // num_buckets)
+    starts = list(range(1, n - 1, size))
+    if _is_array(y):
+        num_full = (n - 2) // size
+        block = y[1:1 + num_full * size].reshape(num_full, size)
+        pos_min = block.argmin(axis=1).tolist()
+        pos_max = block.argmax(axis=1).tolist()
+        if num_full < len(starts):
+            cut = y[starts[-1]:n - 1]
+            pos_min.append(int(cut.argmin()))
+            pos_max.append(int(cut.argmax()))
+    else:
+        pos_min = []
+        pos_max = []
+        for start in starts:
+            # min()/max()/index() run at C speed on the slice.
+            cut = y[start:min(start + size, n - 1)]
+            pos_min.append(cut.index(min(cut)))
+            pos_max.append(cut.index(max(cut)))
+    keep = [0]
+    for start, lo, hi in zip(starts, pos_min, pos_max):
+        if lo == hi:
+            keep.append(start + lo)
+        elif lo < hi:
+            keep.append(start + lo)
+            keep.append(start + hi)
+        else:
+            keep.append(start + hi)
+            keep.append(start + lo)
+    keep.append(n - 1)
+    return _take(x, keep), _take(y, keep)
+
+
+def lttb(x, y, max_points):
+    """
+    lttb - Largest-Triangle-Three-Buckets downsampling to max_points points.
+
+    Each bucket keeps the point forming the largest triangle with the previously selected point
+    and the average of the next bucket. Slower than minmax_decimate() (it is a Python loop over
+    every point), but gives a smoother-looking line.
+
+    >>> lttb(list(range(0, 10)), [0., 5., 1., 1., -3., 2., 2., 2., 9., 0.], 5)
+    ([0, 1, 4, 8, 9], [0.0, 5.0, -3.0, 9.0, 0.0])
+
+    :param x: list
+    :param y: list
+    :param max_points: int
+    :return: tuple
+    """
+    x = _as_list(x)
+    y = _as_list(y)
+    if not len(x) == len(y):
+        raise ValueError('x and y must be the same length')
+    n = len(y)
+    if n <= max_points:
+        return x, y
+    if max_points < 3:
+        raise ValueError('max_points must be at least 3')
+    step = (n - 2) / float(max_points - 2)
+    keep = [0]
+    a = 0
+    for b in range(0, max_points - 2):
+        start = 1 + int(b * step)
+        end = 1 + int((b + 1) * step)
+        # Average of the next bucket (the last point for the final bucket)
+        next_start = end
+        next_end = min(1 + int((b + 2) * step), n)
+        if next_start >= n - 1 or next_end <= next_start:
+            avg_x = x[n - 1]
+            avg_y = y[n - 1]
+        else:
+            avg_x = sum(x[next_start:next_end]) / float(next_end - next_start)
+            avg_y = sum(y[next_start:next_end]) / float(next_end - next_start)
+        ax = x[a]
+        ay = y[a]
+        best = start
+        best_area = -1.
+        for i in range(start, end):
+            area = abs((ax - avg_x) * (y[i] - ay) - (ax - x[i]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = i
+        keep.append(best)
+        a = best
+    keep.append(n - 1)
+    return [x[i] for i in keep], [y[i] for i in keep]
+
+
+def coupon_period_count(maturity, now, frequency, toler=1e-9):
+    """
+    coupon_period_count - The number of coupon payments strictly after now, for a bond paying
+    frequency times per year with the schedule aligned to maturity.
+
+    The payment dates are maturity - k/frequency, for k = 0, ..., count-1. This is done with
+    integer period counts, so there is no need to build a float grid; a payment that falls on now
+    (within toler periods) is treated as already paid.
+
+    >>> coupon_period_count(2., 0., 1)
+    2
+    >>> coupon_period_count(2., .5, 2)
+    3
+    >>> coupon_period_count(2., .25, 2)
+    4
+    >>> coupon_period_count(2., 2., 2)
+    0
+
+    :param maturity: float
+    :param now: float
+    :param frequency: int
+    :param toler: float
+    :return: int
+    """
+    periods = frequency * (maturity - now)
+    if periods < toler:
+        return 0
+    whole = int(math.floor(periods + toler))
+    if abs(periods - whole) <= toler:
+        # On top of a payment date; it is not included.
+        return whole
+    return whole + 1
+
+
+def bracket_root(f, target, center, width, lower=None, factor=1.6, max_expand=50):
+    """
+    bracket_root - Find (lo, hi, f_lo, f_hi), with f(x) - target changing sign between lo and hi,
+    starting from [center - width, center + width]. f is assumed to be monotone.
+
+    If the starting interval does not bracket the answer, the end that is closer to the target
+    is pushed outwards (by factor times the interval width), so a good center costs two
+    function evaluations. The lower end is never pushed below lower (if not None).
+
+    >>> lo, hi, f_lo, f_hi = bracket_root(lambda x: x * x, 2., 1., .1)
+    >>> (lo < 2. ** .5 < hi)
+    True
+
+    :param f: function
+    :param target: float
+    :param center: float
+    :param width: float
+    :param lower: float
+    :param factor: float
+    :param max_expand: int
+    :return: tuple
+    """
+    lo = center - width
+    hi = center + width
+    if lower is not None:
+        lo = max(lo, lower)
+        hi = max(hi, lo + width)
+    f_lo = f(lo) - target
+    f_hi = f(hi) - target
+    for k in range(0, max_expand):
+        if f_lo * f_hi <= 0.:
+            return lo, hi, f_lo, f_hi
+        step = factor * (hi - lo)
+        if abs(f_lo) < abs(f_hi) and (lower is None or lo > lower):
+            lo = lo - step if lower is None else max(lo - step, lower)
+            f_lo = f(lo) - target
+        else:
+            hi += step
+            f_hi = f(hi) - target
+    if f_lo * f_hi <= 0.:
+        return lo, hi, f_lo, f_hi
+    raise ValueError('Could not bracket the answer')
+
+
+def illinois_root(f, target, lo, hi, toler, f_lo=None, f_hi=None, max_iter=100):
+    """
+    illinois_root - Solve f(x) = target on a bracket [lo, hi], using the Illinois variant of
+    false position. Returns (x, number of function evaluations).
+
+    This is safeguarded: the bracket is kept at all times (so this cannot do worse than
+    bisection for long), and once the steps are smaller than toler, a point toler/2 inside the
+    bracket is tried to close it. The answer is within toler/2 of the root.
+
+    f_lo and f_hi are f(lo) - target and f(hi) - target, if already known.
+
+    >>> x, n = illinois_root(lambda x: x * x, 2., 1., 2., 1e-10)
+    >>> round(x, 9)
+    1.414213562
+
+    :param f: function
+    :param target: float
+    :param lo: float
+    :param hi: float
+    :param toler: float
+    :param f_lo: float
+    :param f_hi: float
+    :param max_iter: int
+    :return: tuple
+    """
+    evaluations = 0
+    if f_lo is None:
+        f_lo = f(lo) - target
+        evaluations += 1
+    if f_hi is None:
+        f_hi = f(hi) - target
+        evaluations += 1
+    if f_lo == 0.:
+        return lo, evaluations
+    if f_hi == 0.:
+        return hi, evaluations
+    if f_lo * f_hi > 0.:
+        raise ValueError('Answer not bracketed')
+    side = 0
+    x_prev = None
+    for k in range(0, max_iter):
+        if hi - lo <= toler:
+            break
+        x = (lo * f_hi - hi * f_lo) / (f_hi - f_lo)
+        if not (lo < x < hi):
+            x = (lo + hi) / 2.
+        if x_prev is not None and abs(x - x_prev) < toler / 2.:
+            # Stalled next to one end; step just past the tolerance to close the bracket.
+            if x - lo < hi - x:
+                x = lo + toler / 2.
+            else:
+                x = hi - toler / 2.
+        x_prev = x
+        fx = f(x) - target
+        evaluations += 1
+        if fx == 0.:
+            return x, evaluations
+        if fx * f_lo < 0.:
+            hi, f_hi = x, fx
+            if side == 1:
+                # The same end moved twice; halve the other end's value (Illinois step).
+                f_lo /= 2.
+            side = 1
+        else:
+            lo, f_lo = x, fx
+            if side == -1:
+                f_hi /= 2.
+            side = -1
+    return (lo + hi) / 2., evaluations
+
+
+def warm_solve(f, target, seed, width, toler, lower=None):
+    """
+    warm_solve - Solve f(x) = target for monotone f, starting from a bracket of +/- width around
+    seed (such as the previous solution), widened as needed. Returns (x, number of function
+    evaluations).
+
+    >>> x, n = warm_solve(lambda x: x ** 3, 8., 1.99, .02, 1e-8)
+    >>> round(x, 7), n <= 8
+    (2.0, True)
+
+    :param f: function
+    :param target: float
+    :param seed: float
+    :param width: float
+    :param toler: float
+    :param lower: float
+    :return: tuple
+    """
+    evaluations = [0, ]
+
+    def counted(x):
+        evaluations[0] += 1
+        return f(x)
+
+    lo, hi, f_lo, f_hi = bracket_root(counted, target, seed, width, lower=lower)
+    x, n = illinois_root(counted, target, lo, hi, toler, f_lo=f_lo, f_hi=f_hi)
+    return x, evaluations[0]
@@ -20,6 +20,8 @@ limitations under the License.
 
 import math
 
+from simplepricers.dual import dual_pow
+
 
 def DF(mat, r):
     """
@@ -47,12 +49,12 @@ def DF(mat, r):
     [1.0, 0.9524, 0.907, 0.8638, 0.8227, 0.7835]
     """
     if type(mat) is list:
-        out = []
-        for m, ZR in zip(mat, r):
-            out.append(math.pow(1. + ZR, -m))
-    else:
-        out = math.pow(1. + r, -mat)
-    return out
+        return [DF(m, ZR) for m, ZR in zip(mat, r)]
+    try:
+        return math.pow(1. + r, -mat)
+    except TypeError:
+        # Dual (automatic differentiation) rates; see dual.py.
+        return dual_pow(1. + r, -mat)
 
 
 def DF_exponential(mat, r):
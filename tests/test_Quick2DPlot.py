@@ -0,0 +1,75 @@
+"""
+test_Quick2DPlot.py
+
+Only the headless parts are tested; DoPlot() is interactive.
+"""
+
+from unittest import TestCase, skipIf
+import io
+import os
+import tempfile
+
+import simplepricers.Quick2DPlot as Q2D
+
+
+class TestRenderBatch(TestCase):
+    def test_GetParams_cached(self):
+        self.assertIs(Q2D.GetParams(), Q2D.GetParams())
+
+    def test_no_filename(self):
+        p = Q2D.Quick2DPlot([0., 1.], [1., 2.], run_now=False)
+        with self.assertRaises(ValueError):
+            Q2D.RenderBatch([p, ], params=Q2D.Quick2DPlotParams())
+
+    @skipIf(Q2D.GetPyplot() is None, 'matplotlib not installed')
+    def test_render(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            plots = []
+            for i in range(0, 3):
+                p = Q2D.Quick2DPlot([0., 1., 2.], [1., 2., float(i)], 'Chart {0}'.format(i), run_now=False,
+                                    output_directory=dirname, filename='chart{0}.png'.format(i))
+                plots.append(p)
+            plots[2].Legend = ['Series']
+            out = Q2D.RenderBatch(plots, processes=2, params=Q2D.Quick2DPlotParams())
+            self.assertEqual(3, len(out))
+            for fname in out:
+                self.assertTrue(os.path.getsize(fname) > 0)
+
+
+class TestDownsample(TestCase):
+    def test_GetPlotData_small(self):
+        p = Q2D.Quick2DPlot([0., 1.], [1., 2.], run_now=False)
+        self.assertEqual(([0., 1.], [1., 2.]), p.GetPlotData(Q2D.Quick2DPlotParams()))
+
+    def test_GetPlotData_large(self):
+        n = 100000
+        x = [float(i) for i in range(0, n)]
+        y = [float(i % 1000) for i in range(0, n)]
+        p = Q2D.Quick2DPlot([x, x], [y, y], run_now=False)
+        p.MaxPoints = 1000
+        X, Y = p.GetPlotData(Q2D.Quick2DPlotParams())
+        self.assertEqual(2, len(X))
+        self.assertTrue(len(X[0]) <= 1000)
+        # The envelope is preserved
+        self.assertEqual(999., max(Y[1]))
+        self.assertEqual(0., min(Y[1]))
+
+    def test_bad_method(self):
+        p = Q2D.Quick2DPlot([0., 1.], [1., 2.], run_now=False)
+        p.Downsample = 'bogus'
+        with self.assertRaises(ValueError):
+            p.GetPlotData(Q2D.Quick2DPlotParams())
+
+
+class TestWriteCSV(TestCase):
+    def test_single(self):
+        p = Q2D.Quick2DPlot([0., 1.], [1., 2.], run_now=False)
+        f = io.StringIO()
+        p.WriteCSV(f)
+        self.assertEqual(['X1,Y1', '0.0,1.0', '1.0,2.0'], f.getvalue().splitlines())
+
+    def test_two_series(self):
+        p = Q2D.Quick2DPlot([[0., 1.], [0.]], [[1., 2.], [3.]], run_now=False)
+        f = io.StringIO()
+        p.WriteCSV(f)
+        self.assertEqual(['X1,Y1,X2,Y2', '0.0,1.0,0.0,3.0', '1.0,2.0,,'], f.getvalue().splitlines())
@@ -0,0 +1,66 @@
+"""
+test_approximation.py
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase
+import math
+
+from simplepricers.approximation import ChebyshevFit, FitChebyshev, GetPriceYieldApproximation
+from simplepricers.approximation import PriceYieldApproximation
+from simplepricers.bonds_curves import CouponBond
+
+
+class TestChebyshevFit(TestCase):
+    def test_polynomial_exact(self):
+        obj = ChebyshevFit(lambda x: 1. + 2. * x - x ** 3, -1., 2., 3)
+        self.assertAlmostEqual(1. + 2. * 1.5 - 1.5 ** 3, obj.GetValue(1.5))
+        self.assertAlmostEqual(2. - 3. * 1.5 ** 2, obj.GetSlope(1.5))
+
+    def test_bad_range(self):
+        with self.assertRaises(ValueError):
+            ChebyshevFit(math.exp, 1., 1., 4)
+
+    def test_fit_fails(self):
+        with self.assertRaises(ValueError):
+            FitChebyshev(abs, -1., 1., 1e-12, max_degree=16)
+
+
+class TestPriceYieldApproximation(TestCase):
+    def test_within_bound(self):
+        bond = CouponBond(30., .04, coupon_freq=2)
+        obj = PriceYieldApproximation(bond, .3, toler=1e-8)
+        self.assertTrue(obj.PriceErrorBound < 1e-8)
+        for i in range(0, 21):
+            yld = -.01 + .21 * i / 20.
+            price = bond.GetPrice(yld, .3, price_type='dirty')
+            self.assertTrue(abs(obj.GetPrice(yld) - price) <= obj.PriceErrorBound)
+            self.assertAlmostEqual(yld, obj.GetYield(price), places=10)
+
+    def test_bound_short_bond(self):
+        # The coefficient tail understated the error for this bond.
+        bond = CouponBond(1., .05, coupon_freq=1)
+        obj = PriceYieldApproximation(bond, .5)
+        for i in range(0, 1001):
+            yld = -.01 + .21 * i / 1000.
+            price = bond.GetPrice(yld, .5, price_type='dirty')
+            self.assertTrue(abs(obj.GetPrice(yld) - price) <= obj.PriceErrorBound)
+            self.assertTrue(abs(obj.GetYield(price) - yld) <= obj.YieldToler)
+
+    def test_bad_range(self):
+        with self.assertRaises(ValueError):
+            PriceYieldApproximation(CouponBond(5., .05, coupon_freq=1), 0., yield_range=(-1., .1))
+
+    def test_fallback(self):
+        bond = CouponBond(5., .05, coupon_freq=1)
+        obj = PriceYieldApproximation(bond, 0., yield_range=(0., .1))
+        self.assertEqual(bond.GetPrice(.15, 0., price_type='dirty'), obj.GetPrice(.15))
+        self.assertAlmostEqual(.15, obj.GetYield(bond.GetPrice(.15, 0., price_type='dirty')), places=8)
+
+    def test_cache(self):
+        bond = CouponBond(5., .05, coupon_freq=1)
+        obj = GetPriceYieldApproximation(bond, 0.)
+        self.assertIs(obj, GetPriceYieldApproximation(bond, 0.))
+        bond.Coupon = .06
+        self.assertIsNot(obj, GetPriceYieldApproximation(bond, 0.))
@@ -0,0 +1,84 @@
+"""
+test_backtest.py
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase
+import concurrent.futures
+import io
+import os
+import tempfile
+
+from simplepricers.backtest import Backtest, ReadCurveHistory
+from simplepricers.bonds_curves import CouponBond, ZeroCurve
+
+
+def make_history(num_dates=60):
+    mats = [0., 1., 5., 10.]
+    lines = ['date,' + ','.join(str(m) for m in mats)]
+    for i in range(0, num_dates):
+        shift = .0001 * ((i * 7) % 13 - 6)
+        lines.append(','.join([str(i / 24.)] + [str(.02 + .002 * m + shift) for m in mats]))
+    return '\n'.join(lines) + '\n'
+
+
+class TestBacktest(TestCase):
+    def setUp(self):
+        self.Bonds = [CouponBond(1.5, .03, 2), CouponBond(3., .04, 1), CouponBond(7., .05, 2)]
+        self.Notionals = [1e6, 2e6, -5e5]
+
+    def run_backtest(self, chunk_size, executor=None):
+        book = Backtest(self.Bonds, self.Notionals)
+        results = list(book.Run(ReadCurveHistory(io.StringIO(make_history()), chunk_size), executor=executor,
+                                max_pending=2))
+        return results
+
+    def test_matches_direct_pricing(self):
+        results = self.run_backtest(25)
+        self.assertEqual([25, 25, 10], [len(r.Dates) for r in results])
+        for chunk in ReadCurveHistory(io.StringIO(make_history()), 1000):
+            for (now, mats, rates), row in zip(chunk, [row for r in results for row in r.Prices]):
+                ZC = ZeroCurve(mats, rates)
+                for bond, price in zip(self.Bonds, row):
+                    bond.GenerateCashFlows(now)
+                    expected = sum(cf * ZC.GetDF(d - now)
+                                   for d, cf in zip(bond.CashFlowDates, bond.CashFlows))
+                    self.assertAlmostEqual(expected, price)
+                    if now == 0.:
+                        direct = bond.GetPriceFromZeroCurve(now, ZC, price_type='dirty')
+                        self.assertAlmostEqual(direct, price)
+
+    def test_chunking_and_executor(self):
+        base = self.run_backtest(1000)[0]
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            chunked = self.run_backtest(7, executor)
+        self.assertEqual(base.Values, [v for r in chunked for v in r.Values])
+        self.assertEqual(base.PnL, [v for r in chunked for v in r.PnL])
+
+    def test_pnl(self):
+        out = self.run_backtest(1000)[0]
+        self.assertIsNone(out.PnL[0])
+        # Coupons: 1.5y semi-annual pays at .5 and 1.0, the 7y at .5 and 1.0; 3y annual at 1.
+        self.assertAlmostEqual(1e6 * .015 - 5e5 * .025, out.Cash[12])
+        self.assertAlmostEqual(out.Values[13] - out.Values[12] + out.Cash[13], out.PnL[13])
+
+    def test_run_twice(self):
+        # A second run over a later window starts afresh.
+        book = Backtest(self.Bonds, self.Notionals)
+        history = list(ReadCurveHistory(io.StringIO(make_history()), 1000))[0]
+        list(book.Run([history]))
+        out = list(book.Run([history[24:]]))[0]
+        self.assertIsNone(out.PnL[0])
+        self.assertEqual(self.run_backtest(1000)[0].Values[24:], out.Values)
+
+    def test_read_file(self):
+        with tempfile.TemporaryDirectory() as dirname:
+            fname = os.path.join(dirname, 'curves.csv')
+            with open(fname, 'w') as f:
+                f.write(make_history(10))
+            self.assertEqual([4, 4, 2], [len(c) for c in ReadCurveHistory(fname, 4)])
+
+    def test_dates_increasing(self):
+        with self.assertRaises(ValueError):
+            list(ReadCurveHistory(io.StringIO('date,1\n1.,.01\n.5,.02\n')))
@@ -10,6 +10,7 @@ import doctest
 from simplepricers.bonds_curves import Consol, ZeroCurve
 from simplepricers.bonds_curves import CouponBond
 import simplepricers.bonds_curves as bonds
+from simplepricers.simple_calendar import Date360
 from simplepricers.bonds_curves import ZeroCurve
 
 
@@ -81,3 +82,98 @@ class TestCouponBond(TestCase):
         obj = CouponBond(2., .05, coupon_freq=1)
         ZC = ZeroCurve([0., 3.], [.05, .05])
         self.assertAlmostEqual(100., obj.GetPriceFromZeroCurve(0., ZC, price_type='dirty'))
+
+    def test_closed_form_matches_loop(self):
+        for freq in (1, 2, 4, 12):
+            for now in (0., .1, .5, 1. / 3., 9.9):
+                obj = CouponBond(10., .05, coupon_freq=freq)
+                self.assertAlmostEqual(obj.GetFlatYieldNPVLoop(.03, now), obj.GetFlatYieldNPV(.03, now))
+
+    def test_closed_form_zero_yield(self):
+        obj = CouponBond(10., .05, coupon_freq=2)
+        self.assertAlmostEqual(150., obj.GetFlatYieldNPV(0., 0.))
+
+    def test_closed_form_updates_cash_flows(self):
+        obj = CouponBond(10., .05, coupon_freq=2)
+        obj.GenerateCashFlows(0.)
+        obj.GetPrice(.04, now=7.25, price_type='dirty')
+        self.assertEqual(7.25, obj.Now)
+        self.assertEqual([7.5, 8., 8.5, 9., 9.5, 10.], obj.CashFlowDates)
+        self.assertEqual(6, len(obj.CashFlows))
+
+    def test_schedule_reused(self):
+        # Same now and terms: the schedule is not rebuilt (as in the GetYield() solver loop).
+        obj = CouponBond(10., .05, coupon_freq=2)
+        obj.GenerateCashFlows(1.)
+        flows = obj.CashFlows
+        price = obj.GetPrice(.04, now=1., price_type='dirty')
+        obj.GetYield(1., price, price_type='dirty')
+        self.assertIs(flows, obj.CashFlows)
+        # Changing the terms does rebuild it.
+        obj.Coupon = .06
+        obj.GenerateCashFlows(1.)
+        self.assertEqual(103., obj.CashFlows[-1])
+
+    def test_schedule_in_days(self):
+        # A float now and a Date360 now on the same day give the same (integer day) schedule.
+        obj = CouponBond(10., .05, coupon_freq=2)
+        obj.GenerateCashFlows(1. + 1e-9)
+        key = obj.CashFlowKey
+        self.assertEqual([2700, 2880, 3060, 3240, 3420, 3600], obj.CashFlowDays[-6:])
+        obj.GenerateCashFlows(Date360(360))
+        self.assertEqual(key, obj.CashFlowKey)
+        self.assertEqual(9.5, obj.CashFlowDates[-2])
+        # Off the day grid, the schedule is in year fractions.
+        obj.GenerateCashFlows(1.0001)
+        self.assertIsNone(obj.CashFlowDays)
+        self.assertEqual(18, len(obj.CashFlowDates))
+
+    def test_irregular_uses_loop(self):
+        class Amortising(CouponBond):
+            def GenerateCashFlows(self, now=None):
+                CouponBond.GenerateCashFlows(self, now)
+                self.CashFlows = [50., 50.]
+
+        obj = Amortising(2., .05, coupon_freq=1)
+        self.assertFalse(obj.HasRegularSchedule())
+        self.assertAlmostEqual(50. / 1.1 + 50. / 1.21, obj.GetPrice(.1, price_type='dirty'))
+
+    def test_warm_start_yield(self):
+        obj = CouponBond(10., .05, coupon_freq=2)
+        y0 = obj.GetYield(0., 101., price_type='dirty', warm_start=True)
+        cold = obj.SolverEvaluations
+        y1 = obj.GetYield(0., 101.05, price_type='dirty', warm_start=True)
+        self.assertTrue(obj.SolverEvaluations < cold / 2)
+        self.assertAlmostEqual(y1, obj.GetYield(0., 101.05, price_type='dirty'), delta=1e-6)
+        self.assertTrue(y1 < y0)
+
+    def test_warm_start_widens(self):
+        obj = CouponBond(5., .05, coupon_freq=1)
+        obj.GetYield(0., 100., price_type='dirty')
+        # A big move: the tight bracket has to be widened.
+        price = obj.GetPrice(.03, price_type='dirty')
+        self.assertAlmostEqual(.03, obj.GetYield(0., price, price_type='dirty', warm_start=True), places=6)
+
+
+class TestInflationLinkedBond(TestCase):
+    def test_warm_start_breakeven(self):
+        ZC = ZeroCurve([0., 10.], [.04, .05])
+        obj = bonds.InflationLinkedBond(10., .01, coupon_freq=1)
+        cold = obj.CalcEconomicBreakeven(0., 100., ZC, price_type='dirty')
+        cold_evaluations = obj.SolverEvaluations
+        warm = obj.CalcEconomicBreakeven(0., 100., ZC, price_type='dirty', warm_start=True)
+        self.assertAlmostEqual(cold, warm, places=5)
+        self.assertTrue(obj.SolverEvaluations < cold_evaluations / 2)
+        self.assertEqual(warm, obj.InflationCurve.ExtrapolationRate)
+
+
+class TestParCoupon(TestCase):
+    def test_warm_start(self):
+        ZC = ZeroCurve([0., 10.], [.04, .05])
+        cold = ZC.CalcParCoupon(10)
+        cold_evaluations = ZC.SolverEvaluations
+        ZC.ZC[1] = .0505
+        warm = ZC.CalcParCoupon(10, warm_start=True)
+        self.assertTrue(ZC.SolverEvaluations < cold_evaluations / 2)
+        self.assertTrue(warm > cold)
+        self.assertAlmostEqual(warm, ZeroCurve([0., 10.], [.04, .0505]).CalcParCoupon(10), places=5)
@@ -0,0 +1,91 @@
+"""
+test_curve_fitting.py
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase
+
+from simplepricers.curve_fitting import CurveFitter, NelsonSiegelSvenssonCurve
+from simplepricers.bonds_curves import CouponBond
+
+
+class TestNelsonSiegelSvenssonCurve(TestCase):
+    def test_gradient(self):
+        params = [.04, -.02, .01, .005, 1.5, 8.]
+        df, grad = NelsonSiegelSvenssonCurve(params).GetDFGradient(3.3)
+        h = 1e-6
+        for k in range(0, 6):
+            up = list(params)
+            up[k] += h
+            down = list(params)
+            down[k] -= h
+            df_up = NelsonSiegelSvenssonCurve(up).GetDF(3.3)
+            df_down = NelsonSiegelSvenssonCurve(down).GetDF(3.3)
+            numeric = (df_up - df_down) / (2. * h)
+            self.assertAlmostEqual(numeric, grad[k], places=7)
+
+    def test_short_end(self):
+        obj = NelsonSiegelSvenssonCurve([.04, -.02, .01, .005, 1.5, 8.])
+        # The short rate is b0 + b1 (continuously compounded)
+        self.assertAlmostEqual(.02, obj.GetContinuousRate(0.))
+        self.assertAlmostEqual(obj.GetContinuousRate(1e-5), obj.GetContinuousRate(1.1e-4), places=5)
+        self.assertEqual(1., obj.GetDF(0.))
+
+    def test_bad_tau(self):
+        with self.assertRaises(ValueError):
+            NelsonSiegelSvenssonCurve([.04, 0., 0., 0., 0., 1.])
+
+
+class TestCurveFitter(TestCase):
+    def setUp(self):
+        self.Curve = NelsonSiegelSvenssonCurve([.035, -.015, .02, -.01, 2., 10.])
+        self.Bonds = [CouponBond(m / 2., c, 2) for m, c in zip(range(1, 61, 3), [.01, .03, .05, .07] * 5)]
+
+    def test_recover(self):
+        fitter = CurveFitter(self.Bonds)
+        prices = fitter.GetPrices(self.Curve)
+        for bond, price in zip(self.Bonds, prices):
+            self.assertAlmostEqual(bond.GetPriceFromZeroCurve(0., self.Curve, price_type='dirty'), price)
+        curve = fitter.Fit(prices)
+        self.assertTrue(fitter.Converged)
+        for m in (.5, 2., 10., 30.):
+            self.assertAlmostEqual(self.Curve.GetZeroRate(m), curve.GetZeroRate(m), places=7)
+        ZC = curve.ToZeroCurve([0., .5, 1., 2., 5., 10., 20., 30.])
+        self.assertAlmostEqual(curve.GetDF(10.), ZC.GetDF(10.))
+
+    def test_initial_guess(self):
+        # Flat at 5% continuously compounded: the guess is flat at the same rate, although the
+        # bonds pay semiannually.
+        flat = NelsonSiegelSvenssonCurve([.05, 0., 0., 0., 2., 10.])
+        fitter = CurveFitter(self.Bonds)
+        guess = fitter.GetInitialGuess(fitter.GetPrices(flat))
+        self.assertAlmostEqual(.05, guess[0], places=6)
+        self.assertAlmostEqual(0., guess[1], places=6)
+
+    def test_forward_start(self):
+        fitter = CurveFitter(self.Bonds, now=.25)
+        curve = fitter.Fit(fitter.GetPrices(self.Curve))
+        self.assertTrue(fitter.RMSE < 1e-6)
+
+    def test_nelson_siegel(self):
+        fitter = CurveFitter(self.Bonds, model='ns')
+        curve = fitter.Fit(fitter.GetPrices(self.Curve))
+        self.assertEqual(0., curve.Params[3])
+        self.assertTrue(fitter.RMSE < 1.)
+        # Not an exact fit, but stops at a minimum.
+        self.assertEqual((True, False), (fitter.Converged, fitter.Stalled))
+
+    def test_iteration_limit(self):
+        fitter = CurveFitter(self.Bonds)
+        fitter.Fit(fitter.GetPrices(self.Curve), max_iter=2)
+        self.assertEqual((2, False, False), (fitter.Iterations, fitter.Converged, fitter.Stalled))
+
+    def test_errors(self):
+        fitter = CurveFitter(self.Bonds[0:3])
+        with self.assertRaises(ValueError):
+            fitter.Fit([100., 100., 100.])
+        with self.assertRaises(ValueError):
+            fitter.Fit([100.])
+        with self.assertRaises(ValueError):
+            CurveFitter(self.Bonds, model='spline')
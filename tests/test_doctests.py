@@ -0,0 +1,35 @@
+"""
+test_doctests.py
+
+Loads the doctests of the modules that do not have their own hook (test_bonds.py, test_utils.py
+and test_yieldcalculations.py load theirs), so unittest discovery can find them.
+"""
+
+import doctest
+
+import simplepricers.approximation as approximation
+import simplepricers.backtest as backtest
+import simplepricers.curve_fitting as curve_fitting
+import simplepricers.dual as dual
+import simplepricers.horizon as horizon
+import simplepricers.interpolation as interpolation
+import simplepricers.monte_carlo as monte_carlo
+import simplepricers.portfolio as portfolio
+import simplepricers.pricing_service as pricing_service
+import simplepricers.regime_simulation as regime_simulation
+import simplepricers.repricing as repricing
+import simplepricers.risk as risk
+import simplepricers.simple_calendar as simple_calendar
+import simplepricers.spreads as spreads
+import simplepricers.surfaces as surfaces
+
+
+def load_tests(loader, tests, ignore):
+    """
+    Load doctests, so unittest discovery can find them.
+    """
+    for module in (approximation, backtest, curve_fitting, dual, horizon, interpolation, monte_carlo,
+                   portfolio, pricing_service, regime_simulation, repricing, risk, simple_calendar,
+                   spreads, surfaces):
+        tests.addTests(doctest.DocTestSuite(module))
+    return tests
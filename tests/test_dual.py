@@ -0,0 +1,143 @@
+"""
+test_dual.py
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase
+
+import simplepricers.dual as dual
+from simplepricers.dual import Dual, MakeVariable, PriceBondsAD, PriceBondsFromZeroCurveAD
+import simplepricers.yieldcalculations as yc
+from simplepricers.bonds_curves import CouponBond, ZeroCurve
+from simplepricers.portfolio import Portfolio
+from simplepricers.simple_calendar import Indexation, Date360
+
+
+def f_test(x, y):
+    return x * y / (1. + x) ** y + dual.dual_exp(x / y) - dual.dual_log1p(x * x) + 3. ** x
+
+
+class TestDual(TestCase):
+    def test_arithmetic(self):
+        x0, y0 = .3, 2.5
+        out = f_test(MakeVariable(x0, 'x'), MakeVariable(y0, 'y'))
+        self.assertAlmostEqual(out.Value, f_test(x0, y0))
+        h = 1e-4
+        fx = (f_test(x0 + h, y0) - f_test(x0 - h, y0)) / (2. * h)
+        fy = (f_test(x0, y0 + h) - f_test(x0, y0 - h)) / (2. * h)
+        fxx = (f_test(x0 + h, y0) - 2. * f_test(x0, y0) + f_test(x0 - h, y0)) / (h * h)
+        fyy = (f_test(x0, y0 + h) - 2. * f_test(x0, y0) + f_test(x0, y0 - h)) / (h * h)
+        fxy = (f_test(x0 + h, y0 + h) - f_test(x0 + h, y0 - h) - f_test(x0 - h, y0 + h) +
+               f_test(x0 - h, y0 - h)) / (4. * h * h)
+        self.assertAlmostEqual(out.GetDerivative('x'), fx, places=6)
+        self.assertAlmostEqual(out.GetDerivative('y'), fy, places=6)
+        self.assertAlmostEqual(out.GetHessian('x', 'x'), fxx, places=4)
+        self.assertAlmostEqual(out.GetHessian('y', 'y'), fyy, places=4)
+        self.assertAlmostEqual(out.GetHessian('x', 'y'), fxy, places=4)
+        self.assertAlmostEqual(out.GetHessian('y', 'x'), fxy, places=4)
+
+    def test_comparisons(self):
+        x = MakeVariable(.5, 'x')
+        self.assertTrue(x < 1.)
+        self.assertTrue(x >= .5)
+        self.assertFalse(x == .5)
+        self.assertEqual(Dual(.5), .5)
+        self.assertEqual(x, MakeVariable(.5, 'x'))
+        self.assertEqual(abs(-x).GetDerivative('x'), 1.)
+
+    def test_float_dispatch(self):
+        self.assertEqual(dual.dual_pow(2., 3.), 8.)
+        self.assertEqual(dual.dual_exp(0.), 1.)
+        self.assertEqual(dual.dual_expm1(0.), 0.)
+        self.assertEqual(dual.dual_log(1.), 0.)
+
+    def test_convert_rate(self):
+        r = yc.ConvertRate(MakeVariable(.04, 'r'), '2', '1')
+        self.assertAlmostEqual(r.GetDerivative('r'), 1.02)
+        self.assertAlmostEqual(r.GetHessian('r', 'r'), .5)
+
+
+class TestPricing(TestCase):
+    def test_yield_and_coupon(self):
+        bond = CouponBond(7., .04, 2)
+        out = PriceBondsAD([bond], [.035], now=.3)[0]
+        self.assertEqual(.04, bond.Coupon)
+
+        def price(y, c):
+            return CouponBond(7., c, 2).GetPrice(y, .3, price_type='dirty')
+        h = 1e-4
+        self.assertAlmostEqual(out.Value, price(.035, .04), places=10)
+        delta = (price(.035 + h, .04) - price(.035 - h, .04)) / (2. * h)
+        self.assertAlmostEqual(out.GetDerivative('yield'), delta, delta=1e-6 * abs(delta))
+        delta = (price(.035, .04 + h) - price(.035, .04 - h)) / (2. * h)
+        self.assertAlmostEqual(out.GetDerivative('coupon'), delta, places=6)
+        gamma = (price(.035 + h, .04) - 2. * price(.035, .04) + price(.035 - h, .04)) / (h * h)
+        self.assertAlmostEqual(out.GetHessian('yield', 'yield'), gamma, delta=1e-3 * gamma)
+        cross = (price(.035 + h, .04 + h) - price(.035 + h, .04 - h) - price(.035 - h, .04 + h) +
+                 price(.035 - h, .04 - h)) / (4. * h * h)
+        self.assertAlmostEqual(out.GetHessian('yield', 'coupon'), cross, delta=1e-4 * abs(cross))
+        self.assertEqual(0., out.GetHessian('coupon', 'coupon'))
+
+    def test_bond_state_restored(self):
+        bonds = [CouponBond(2., .05, 1), CouponBond(7.5, .03, 2)]
+        for bond in bonds:
+            bond.GenerateCashFlows(0.)
+        before = [(b.Coupon, b.Now, list(b.CashFlows), list(b.CashFlowDates)) for b in bonds]
+        PriceBondsAD(bonds, [.04, .04], now=.3)
+        PriceBondsFromZeroCurveAD(bonds, ZeroCurve([0., 10.], [.03, .04]), .3)
+        after = [(b.Coupon, b.Now, b.CashFlows, b.CashFlowDates) for b in bonds]
+        self.assertEqual(before, after)
+        self.assertFalse(any(isinstance(cf, Dual) for b in bonds for cf in b.CashFlows))
+
+    def test_zero_yield(self):
+        out = PriceBondsAD([CouponBond(5., .03, 1)], [0.])[0]
+        self.assertAlmostEqual(out.Value, 115.)
+        # dP/dy = -sum(t * cf) at a zero yield.
+        self.assertAlmostEqual(out.GetDerivative('yield'), -(3. * (1. + 2. + 3. + 4.) + 5. * 103.))
+
+    def test_curve_nodes(self):
+        mats = [.5, 1., 2., 5., 10.]
+        zeros = [.01, .015, .02, .03, .035]
+        bonds = [CouponBond(2., .05, 1), CouponBond(7.5, .03, 2)]
+        for interpolation in ('linear', 'loglinear'):
+            ZC = ZeroCurve(mats, zeros, interpolation)
+            out = PriceBondsFromZeroCurveAD(bonds, ZC, .1)
+            jac = Portfolio(bonds).GetNodeJacobian(.1, ZC).ToDense()
+            for i, bond in enumerate(bonds):
+                self.assertAlmostEqual(out[i].Value, bond.GetPriceFromZeroCurve(.1, ZC, price_type='dirty'))
+                for j in range(0, len(mats)):
+                    self.assertAlmostEqual(out[i].GetDerivative(j), jac[i][j], places=8)
+            # Second derivative with respect to one node, by bumping.
+            h = 1e-4
+            prices = []
+            for shift in (-h, 0., h):
+                bumped = list(zeros)
+                bumped[3] += shift
+                prices.append(bonds[1].GetPriceFromZeroCurve(.1, ZeroCurve(mats, bumped, interpolation),
+                                                             price_type='dirty'))
+            gamma = (prices[0] - 2. * prices[1] + prices[2]) / (h * h)
+            self.assertAlmostEqual(out[1].GetHessian(3, 3), gamma, delta=1e-3 * abs(gamma))
+
+    def test_curve_get_df(self):
+        nodes = [MakeVariable(.04, 'a'), MakeVariable(.04, 'b'), MakeVariable(.05, 'c')]
+        ZC = ZeroCurve([0., 1., 2.], nodes)
+        df = ZC.GetDF(1.5)
+        self.assertAlmostEqual(df.Value, ZeroCurve([0., 1., 2.], [.04, .04, .05]).GetDF(1.5))
+        self.assertEqual(0., df.GetDerivative('a'))
+        self.assertAlmostEqual(df.GetDerivative('b'), df.GetDerivative('c'))
+
+    def test_indexation(self):
+        obj = Indexation()
+        obj.SetIndexValues([0.], [100.])
+        obj.ExtrapolationRate = .01
+        obj.BuildIndexTable(Date360.FromYMD(0), Date360.FromYMD(2), step='monthly')
+        obj.ExtrapolationRate = MakeVariable(.02, 'inf')
+        value = obj.GetValue(2.)
+        self.assertAlmostEqual(value.Value, 104.04)
+        self.assertAlmostEqual(value.GetDerivative('inf'), 200. * 1.02)
+        self.assertAlmostEqual(value.GetHessian('inf', 'inf'), 200.)
+        self.assertAlmostEqual(obj.GetValues([2.])[0].GetDerivative('inf'), 200. * 1.02)
+        # Back to a float: the table is used again.
+        obj.ExtrapolationRate = .02
+        self.assertAlmostEqual(obj.GetValues([2.])[0], 104.04)
@@ -0,0 +1,53 @@
+"""
+test_horizon.py
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase
+
+import simplepricers.horizon as horizon
+from simplepricers.bonds_curves import CouponBond, ZeroCurve
+from simplepricers.portfolio import Portfolio
+
+
+class TestHorizon(TestCase):
+    def setUp(self):
+        self.ZC = ZeroCurve([0., 1., 3., 10., 30.], [.01, .015, .025, .035, .04])
+        self.Bond = CouponBond(7., .04, 2)
+
+    def test_components(self):
+        horizons = [2., .25, 1., 0.]
+        res = self.Bond.GetHorizonReturns(0., self.ZC, horizons)
+        self.assertEqual(horizons, res.Horizons)
+        self.assertAlmostEqual(self.Bond.GetPriceFromZeroCurve(0., self.ZC, price_type='dirty'), res.Price)
+        # Cash: coupons of 2 per half year
+        self.assertEqual([8., 0., 4., 0.], res.Cash)
+        for i, h in enumerate(horizons):
+            self.Bond.GenerateCashFlows(h)
+            rolled = sum(cf * self.ZC.GetDF(d - h)
+                         for d, cf in zip(self.Bond.CashFlowDates, self.Bond.CashFlows))
+            self.assertAlmostEqual(rolled, res.Rolled[i])
+            self.assertAlmostEqual(res.TotalReturn[i], res.Carry[i] + res.RollDown[i])
+        # Zero horizon: nothing happens.
+        self.assertAlmostEqual(0., res.TotalReturn[3])
+        # Positive slope: rolling down the curve adds return.
+        self.assertTrue(res.RollDown[2] > 0.)
+
+    def test_past_maturity(self):
+        res = horizon.CalcHorizonReturns(CouponBond(1., .05, 1), 0., self.ZC, [2.])
+        self.assertEqual([105.], res.Cash)
+        self.assertEqual([0.], res.Rolled)
+
+    def test_negative_horizon(self):
+        with self.assertRaises(ValueError):
+            self.Bond.GetHorizonReturns(0., self.ZC, [-1.])
+
+    def test_portfolio(self):
+        bonds = [self.Bond, CouponBond(3., .02, 1)]
+        book = Portfolio(bonds, [2e6, -1e6])
+        res = book.GetHorizonReturns(0., self.ZC, [.5, 1.])
+        singles = [b.GetHorizonReturns(0., self.ZC, [.5, 1.]) for b in bonds]
+        for i in range(0, 2):
+            expected = 2e4 * singles[0].TotalReturn[i] - 1e4 * singles[1].TotalReturn[i]
+            self.assertAlmostEqual(expected, res.TotalReturn[i], places=6)
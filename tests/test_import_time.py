@@ -0,0 +1,74 @@
+"""
+test_import_time.py
+
+Cold-start checks for "import simplepricers". Each test runs a fresh interpreter, so that modules
+that were already imported by other tests do not hide the import cost.
+"""
+
+from unittest import TestCase
+import os
+import subprocess
+import sys
+
+# Upper limit for the cumulative import time of the package, as a fraction of the time to import
+# bonds_curves (the core pricing module) in the same interpreter. A ratio rather than a time in
+# seconds, so it does not depend on the speed of the test machine; the point is to catch someone
+# adding a heavy import at package level. (The lazy package is typically a few percent.)
+IMPORT_TIME_RATIO = .25
+
+BASE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(code, *args):
+    """Run code in a fresh interpreter from the base directory; returns the CompletedProcess."""
+    return subprocess.run([sys.executable, ] + list(args) + ['-c', code], cwd=BASE_DIRECTORY,
+                          capture_output=True, text=True, check=True)
+
+
+def measure_import_times(modules):
+    """
+    Cumulative import times of modules (imported in order, in one fresh interpreter) in seconds,
+    as reported by "python -X importtime".
+    :param modules: list
+    :return: dict
+    """
+    out = run_python('; '.join('import ' + m for m in modules), '-X', 'importtime')
+    times = {}
+    for row in out.stderr.splitlines():
+        fields = row.split('|')
+        if len(fields) == 3 and fields[2].strip() in modules:
+            times[fields[2].strip()] = int(fields[1]) / 1e6
+    if not len(times) == len(modules):
+        raise ValueError('Module not found in importtime output')
+    return times
+
+
+class TestImportTime(TestCase):
+    def test_import_time(self):
+        times = measure_import_times(['simplepricers', 'simplepricers.bonds_curves'])
+        self.assertLess(times['simplepricers'], IMPORT_TIME_RATIO * times['simplepricers.bonds_curves'])
+
+    def test_no_heavy_imports(self):
+        code = 'import sys, simplepricers, simplepricers.Quick2DPlot; print(sorted(sys.modules))'
+        loaded = run_python(code).stdout
+        self.assertNotIn('matplotlib', loaded)
+        self.assertNotIn('simplepricers.bonds_curves', loaded)
+
+    def test_lazy_attribute(self):
+        code = 'import simplepricers; print(simplepricers.CouponBond.__name__, simplepricers.DF(1., 0.))'
+        self.assertEqual('CouponBond 1.0', run_python(code).stdout.strip())
+
+    def test_lazy_attributes_exist(self):
+        # Every name in the lazy map is defined by the submodule it points to.
+        code = ('import importlib, simplepricers\n'
+                'for name, module in simplepricers._lazy_attributes.items():\n'
+                '    assert hasattr(importlib.import_module("simplepricers." + module), name), name\n'
+                'for module in simplepricers._submodules:\n'
+                '    importlib.import_module("simplepricers." + module)\n'
+                'print("ok")')
+        self.assertEqual('ok', run_python(code).stdout.strip())
+
+    def test_missing_attribute(self):
+        import simplepricers
+        with self.assertRaises(AttributeError):
+            simplepricers.NotAThing
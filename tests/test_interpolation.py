@@ -0,0 +1,86 @@
+"""
+test_interpolation.py
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase
+
+from simplepricers.interpolation import NaturalCubicInterpolator, MonotoneHermiteInterpolator
+from simplepricers.bonds_curves import ZeroCurve
+
+
+class TestInterpolators(TestCase):
+    def test_not_increasing(self):
+        with self.assertRaises(ValueError):
+            NaturalCubicInterpolator([0., 2., 1.], [0., 1., 2.])
+
+    def test_outside(self):
+        obj = NaturalCubicInterpolator([0., 1., 2.], [0., 1., 2.])
+        with self.assertRaises(ValueError):
+            obj.GetValue(2.5)
+
+    def test_cubic_straight_line(self):
+        # A spline through points on a line is the line.
+        obj = NaturalCubicInterpolator([0., 1., 3., 4., 7.], [1., 3., 7., 9., 15.])
+        for x in (.5, 2., 3.5, 6.):
+            self.assertAlmostEqual(1. + 2. * x, obj.GetValue(x))
+
+    def test_cubic_continuity(self):
+        x = [0., 1., 2.5, 3., 5.]
+        obj = NaturalCubicInterpolator(x, [.02, .03, .025, .028, .03])
+        for i in range(1, len(x) - 1):
+            dx = x[i] - x[i - 1]
+            left = obj.B[i - 1] + 2. * obj.C[i - 1] * dx + 3. * obj.D[i - 1] * dx ** 2
+            self.assertAlmostEqual(left, obj.B[i])
+        # Natural end condition
+        self.assertEqual(0., obj.C[0])
+
+    def test_hermite_monotone(self):
+        x = [0., 1., 2., 2.25, 3., 4., 6., 10.]
+        y = [.019, .019, .023, .0195, .025, .026, .0255, .024]
+        obj = MonotoneHermiteInterpolator(x, y)
+        for i in range(0, len(x) - 1):
+            lo = min(y[i], y[i + 1])
+            hi = max(y[i], y[i + 1])
+            for k in range(1, 10):
+                v = obj.GetValue(x[i] + k * (x[i + 1] - x[i]) / 10.)
+                self.assertTrue(lo - 1e-12 <= v <= hi + 1e-12)
+
+
+class TestZeroCurveInterpolation(TestCase):
+    mats = [0., 1., 2., 2.25, 3., 4., 6., 10.]
+    zeros = [.019, .019, .023, .0195, .025, .026, .0255, .024]
+
+    def test_bad_scheme(self):
+        with self.assertRaises(ValueError):
+            ZeroCurve([0., 1.], [.01, .02], interpolation='quintic')
+
+    def test_nodes(self):
+        for scheme in ZeroCurve.InterpolationSchemes:
+            obj = ZeroCurve(self.mats, self.zeros, interpolation=scheme)
+            for m, z in zip(self.mats[1:], self.zeros[1:]):
+                self.assertAlmostEqual(z, obj.GetZeroRate(m))
+
+    def test_forwards(self):
+        h = 1e-6
+        for scheme in ZeroCurve.InterpolationSchemes:
+            obj = ZeroCurve(self.mats, self.zeros, interpolation=scheme)
+            for t in (.5, 1.7, 2.1, 5., 9.):
+                fd = pow(obj.GetDF(t - h) / obj.GetDF(t + h), 1. / (2 * h)) - 1.
+                self.assertAlmostEqual(fd, obj.GetInstantaneousForwardRates([t, ])[0], places=5)
+
+    def test_rebuild(self):
+        obj = ZeroCurve([0., 1., 2.], [.02, .03, .04], interpolation='cubic')
+        obj.ZC[1] = .02
+        self.assertAlmostEqual(.02, obj.GetZeroRate(1.))
+
+    def test_rebuild_append(self):
+        obj = ZeroCurve([0., 1.], [.02, .03])
+        version = obj.NodeVersion
+        obj.Maturities.append(2.)
+        obj.ZC.append(.05)
+        self.assertEqual(version + 2, obj.NodeVersion)
+        self.assertAlmostEqual(.04, obj.GetZeroRate(1.5))
+        obj.ZC = [.01, .01, .01]
+        self.assertAlmostEqual(.01, obj.GetZeroRate(1.5))
@@ -0,0 +1,85 @@
+"""
+test_monte_carlo.py
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase
+import math
+
+import simplepricers.monte_carlo as monte_carlo
+from simplepricers.monte_carlo import VasicekModel, PriceBond, SobolSequence, HaltonSequence, BrownianBridge
+from simplepricers.monte_carlo import RegimeSwitchingRate
+from simplepricers.regime_simulation import RegimeSwitchingGrowth
+from simplepricers.bonds_curves import CouponBond
+
+
+class TestSequences(TestCase):
+    def test_sobol_stratified(self):
+        # Each block of 2^k points has one point in each interval of width 2^-k, in every dimension.
+        points = SobolSequence(monte_carlo.MaxSobolDimension).GetPoints(16)
+        for d in range(0, monte_carlo.MaxSobolDimension):
+            self.assertEqual(list(range(0, 16)), sorted(int(p[d] * 16) for p in points))
+
+    def test_sobol_too_many_dimensions(self):
+        with self.assertRaises(ValueError):
+            SobolSequence(monte_carlo.MaxSobolDimension + 1)
+
+    def test_halton_continues(self):
+        obj = HaltonSequence(3)
+        first = obj.GetPoints(5)
+        self.assertEqual(HaltonSequence(3).GetPoints(10)[5:], obj.GetPoints(5))
+        self.assertEqual(5, len(first))
+
+    def test_bridge_variance(self):
+        # The increments are a linear map of the normals; each must have unit variance.
+        n = 7
+        bridge = BrownianBridge(n)
+        columns = [bridge.GetIncrements([1. if i == j else 0. for i in range(0, n)]) for j in range(0, n)]
+        for k in range(0, n):
+            self.assertAlmostEqual(1., sum(col[k] ** 2 for col in columns))
+
+
+class TestPriceBond(TestCase):
+    def setUp(self):
+        self.Model = VasicekModel(.04, .05, .2, .015)
+        self.Bond = CouponBond(5., .05, 2)
+
+    def test_zero_vol(self):
+        model = VasicekModel(.04, .04, .2, 0.)
+        res = PriceBond(self.Bond, model, 10)
+        self.assertAlmostEqual(self.Bond.GetFlatYieldNPV(math.expm1(.04)), res.Mean)
+        self.assertAlmostEqual(0., res.StandardError)
+
+    def test_variance_reduction(self):
+        plain = PriceBond(self.Bond, self.Model, 400, seed=1)
+        for kw in (dict(antithetic=True), dict(control_variate=True), dict(sampling='sobol'),
+                   dict(sampling='halton'), dict(sampling='sobol', control_variate=True)):
+            res = PriceBond(self.Bond, self.Model, 400, seed=1, **kw)
+            self.assertTrue(res.StandardError < plain.StandardError / 2., kw)
+            self.assertAlmostEqual(plain.Mean, res.Mean, delta=4. * plain.StandardError)
+
+    def test_off_grid(self):
+        with self.assertRaises(ValueError):
+            PriceBond(self.Bond, VasicekModel(.04, .04, .2, .01, steps_per_year=1), 10)
+
+    def test_regime_variance_reduction(self):
+        bond = CouponBond(5., .05, 2)
+        model = RegimeSwitchingRate()
+        plain = PriceBond(bond, model, 1024, seed=1)
+        for kw, factor in ((dict(antithetic=True), 1.5), (dict(control_variate=True), 10.),
+                           (dict(sampling='sobol'), 2.), (dict(sampling='halton'), 1.5),
+                           (dict(sampling='sobol', antithetic=True, control_variate=True), 30.)):
+            res = PriceBond(bond, model, 1024, seed=1, **kw)
+            self.assertTrue(res.StandardError < plain.StandardError / factor, kw)
+            self.assertAlmostEqual(plain.Mean, res.Mean, delta=4. * plain.StandardError)
+
+    def test_regime_no_switching(self):
+        # No switching and no noise: a flat rate of BaseRate + Sensitivity * 2.5%.
+        model = RegimeSwitchingRate(RegimeSwitchingGrowth(stay_high=1., vol=0.))
+        res = PriceBond(self.Bond, model, 10, sampling='sobol')
+        self.assertAlmostEqual(self.Bond.GetFlatYieldNPV(math.expm1(.035)), res.Mean)
+
+    def test_bad_sampling(self):
+        with self.assertRaises(ValueError):
+            PriceBond(self.Bond, self.Model, 10, sampling='latin')
@@ -0,0 +1,183 @@
+"""
+test_portfolio.py
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase
+
+from simplepricers.portfolio import DateLattice, Portfolio, PriceInflationLinkedBonds
+from simplepricers.bonds_curves import CouponBond, ZeroCurve, InflationLinkedBond
+
+
+class TestDateLattice(TestCase):
+    def test_off_lattice(self):
+        lat = DateLattice(2)
+        with self.assertRaises(ValueError):
+            lat.GetTick(.3)
+
+    def test_frequency(self):
+        lat = DateLattice(2)
+        with self.assertRaises(ValueError):
+            lat.GetBondTicks(2., 0., 4)
+
+    def test_ticks_match_bond(self):
+        lat = DateLattice(12)
+        for now in (0., .25, .5, 1. / 3., 1.99, 2.):
+            bond = CouponBond(2., .05, coupon_freq=2)
+            bond.GenerateCashFlows(now)
+            ticks = lat.GetBondTicks(2., now, 2)
+            self.assertEqual([lat.GetDate(t) for t in ticks], bond.CashFlowDates)
+
+    def test_columns_shared(self):
+        lat = DateLattice(12)
+        self.assertEqual(0, lat.GetColumn(24))
+        self.assertEqual(1, lat.GetColumn(12))
+        self.assertEqual(0, lat.GetColumn(24))
+        self.assertEqual([2., 1.], lat.GetDates())
+
+
+class TestPortfolio(TestCase):
+    def test_prices(self):
+        ZC = ZeroCurve([0., 5., 10.], [.02, .03, .035])
+        bonds = [CouponBond(2., .05, 1), CouponBond(7.5, .03, 2), CouponBond(10., .04, 2)]
+        book = Portfolio(bonds, [1e6, 2e6, -5e5])
+        prices = book.GetPricesFromZeroCurve(0., ZC, price_type='dirty')
+        for b, p in zip(bonds, prices):
+            self.assertAlmostEqual(b.GetPriceFromZeroCurve(0., ZC, price_type='dirty'), p)
+        # Shared dates: 1, 2, ..., 10 and the half years out to 10.
+        self.assertEqual(20, book.BuildCashFlowMatrix(0.).GetNumColumns())
+        value = book.GetValueFromZeroCurve(0., ZC, price_type='dirty')
+        self.assertAlmostEqual(1e4 * prices[0] + 2e4 * prices[1] - 5e3 * prices[2], value)
+
+    def test_column_totals(self):
+        book = Portfolio([CouponBond(2., .05, 1), CouponBond(1., .03, 1)])
+        mat = book.BuildCashFlowMatrix(0.)
+        totals = mat.ColumnTotals()
+        self.assertEqual([108., 105.], [totals[mat.Lattice.Columns[12]], totals[mat.Lattice.Columns[24]]])
+
+    def test_off_lattice(self):
+        ZC = ZeroCurve([0., 5., 10.], [.02, .03, .035])
+        bonds = [CouponBond(2., .05, 1), CouponBond(7.3, .05, 2), CouponBond(3., .04, 5)]
+        book = Portfolio(bonds)
+        prices = book.GetPricesFromZeroCurve(.1, ZC, price_type='dirty')
+        for b, p in zip(bonds, prices):
+            self.assertAlmostEqual(b.GetPriceFromZeroCurve(.1, ZC, price_type='dirty'), p)
+        self.assertEqual([1, 2], book.BuildCashFlowMatrix(.1).OffLattice)
+
+    def test_bond_changed(self):
+        ZC = ZeroCurve([0., 5., 10.], [.02, .03, .035])
+        bond = CouponBond(2., .05, 1)
+        book = Portfolio([bond, ])
+        book.GetPricesFromZeroCurve(0., ZC, price_type='dirty')
+        bond.Coupon = .06
+        bond.Maturity = 3.
+        self.assertAlmostEqual(bond.GetPriceFromZeroCurve(0., ZC, price_type='dirty'),
+                               book.GetPricesFromZeroCurve(0., ZC, price_type='dirty')[0])
+
+    def test_clean_fails(self):
+        book = Portfolio([CouponBond(2., .05, 1), ])
+        with self.assertRaises(NotImplementedError):
+            book.GetPricesFromZeroCurve(0., ZeroCurve([0., 3.], [.05, .05]))
+
+
+class TestNodeJacobian(TestCase):
+    def setUp(self):
+        self.Mats = [.5, 1., 2., 5., 10.]
+        self.Zeros = [.01, .015, .02, .03, .035]
+        self.Bonds = [CouponBond(.25, .02, 2), CouponBond(2., .05, 1), CouponBond(7.5, .03, 2),
+                      CouponBond(10., .04, 2), CouponBond(7.3, .05, 2)]
+
+    def test_matches_bumps(self):
+        h = 1e-6
+        for interpolation in ('linear', 'loglinear'):
+            ZC = ZeroCurve(self.Mats, self.Zeros, interpolation)
+            book = Portfolio(self.Bonds)
+            jac = book.GetNodeJacobian(.1, ZC).ToDense()
+            self.assertEqual([4], book.BuildCashFlowMatrix(.1).OffLattice)
+            for j in range(0, len(self.Mats)):
+                up = list(self.Zeros)
+                up[j] += h
+                dn = list(self.Zeros)
+                dn[j] -= h
+                ZC_up = ZeroCurve(self.Mats, up, interpolation)
+                ZC_dn = ZeroCurve(self.Mats, dn, interpolation)
+                p_up = book.GetPricesFromZeroCurve(.1, ZC_up, price_type='dirty')
+                p_dn = book.GetPricesFromZeroCurve(.1, ZC_dn, price_type='dirty')
+                for i in range(0, len(self.Bonds)):
+                    self.assertAlmostEqual(jac[i][j], (p_up[i] - p_dn[i]) / (2. * h), delta=1e-5)
+
+    def test_sparsity(self):
+        ZC = ZeroCurve(self.Mats, self.Zeros)
+        jac = Portfolio(self.Bonds).GetNodeJacobian(0., ZC)
+        self.assertEqual((5, 5), (jac.GetNumRows(), jac.GetNumColumns()))
+        self.assertEqual([0], jac.RowColumns[0])
+        self.assertEqual([1, 2], jac.RowColumns[1])
+        self.assertEqual(0., jac.GetValue(1, 4))
+        shifts = [.0001, ] * 5
+        dense = jac.ToDense()
+        self.assertAlmostEqual(jac.Dot(shifts)[3], sum(dense[3]) * .0001)
+        self.assertAlmostEqual(jac.ColumnTotals([1., 2., 0., 0., 0.])[2], 2. * jac.GetValue(1, 2))
+
+    def test_unsupported(self):
+        book = Portfolio(self.Bonds)
+        with self.assertRaises(NotImplementedError):
+            book.GetNodeJacobian(0., ZeroCurve(self.Mats, self.Zeros, 'cubic'))
+
+
+class TestPriceInflationLinkedBonds(TestCase):
+    def setUp(self):
+        self.bonds = [InflationLinkedBond(5., .01), InflationLinkedBond(10., .02, coupon_freq=2)]
+        for b in self.bonds:
+            b.InflationCurve.AppendIndexValue(.5, 1.01)
+            b.InflationCurve.ExtrapolationRate = .02
+
+    def test_zero_curve(self):
+        ZC = ZeroCurve([0., 5., 10.], [.03, .04, .045])
+        real, nominal = PriceInflationLinkedBonds(self.bonds, .5, ZC=ZC, price_type='dirty')
+        for b, r, n in zip(self.bonds, real, nominal):
+            b.GenerateCashFlows(.5)
+            expected = sum([cf * b.InflationCurve.GetValue(d) * ZC.GetDF(d)
+                            for d, cf in zip(b.CashFlowDates, b.CashFlows)])
+            self.assertAlmostEqual(expected, n)
+            self.assertAlmostEqual(n / 1.01, r)
+
+    def test_real_yields(self):
+        real, nominal = PriceInflationLinkedBonds(self.bonds, .5, real_yields=[.01, .015],
+                                                  price_type='dirty')
+        self.assertAlmostEqual(self.bonds[0].GetPrice(.01, .5, price_type='dirty'), real[0])
+        self.assertAlmostEqual(real[1] * 1.01, nominal[1])
+
+    def test_breakeven_consistent(self):
+        ZC = ZeroCurve([0., 10.], [.04, .06])
+        linker = InflationLinkedBond(10., .04)
+        be = linker.CalcEconomicBreakeven(0., 100., ZC, price_type='dirty')
+        linker.InflationCurve.ExtrapolationRate = be
+        real, nominal = PriceInflationLinkedBonds([linker, ], 0., ZC=ZC, price_type='dirty')
+        self.assertAlmostEqual(100., nominal[0], places=2)
+
+    def test_shared_index(self):
+        # Equal histories are looked up once; a different extrapolation rate is not shared.
+        calls = []
+
+        def counted(func):
+            def wrapped(dates):
+                calls.append(dates)
+                return func(dates)
+            return wrapped
+        for b in self.bonds:
+            b.InflationCurve.GetValues = counted(b.InflationCurve.GetValues)
+        ZC = ZeroCurve([0., 10.], [.03, .04])
+        real, nominal = PriceInflationLinkedBonds(self.bonds, .5, ZC=ZC, price_type='dirty')
+        self.assertEqual(1, len(calls))
+        self.bonds[1].InflationCurve.ExtrapolationRate = .03
+        real2, nominal2 = PriceInflationLinkedBonds(self.bonds, .5, ZC=ZC, price_type='dirty')
+        self.assertEqual(3, len(calls))
+        self.assertAlmostEqual(nominal[0], nominal2[0])
+        self.assertTrue(nominal2[1] > nominal[1])
+
+    def test_arguments(self):
+        with self.assertRaises(ValueError):
+            PriceInflationLinkedBonds(self.bonds, 0., price_type='dirty')
+        with self.assertRaises(NotImplementedError):
+            PriceInflationLinkedBonds(self.bonds, 0., real_yields=[.01, .01])
@@ -0,0 +1,137 @@
+"""
+test_pricing_service.py
+
+Drives the service with a local client.
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase, skipUnless
+import asyncio
+import json
+import os
+import socket
+import tempfile
+
+from simplepricers.pricing_service import PricingService, PricingClient, PriceBatch
+from simplepricers.bonds_curves import CouponBond, ZeroCurve
+
+
+class TestPriceBatch(TestCase):
+    def test_batch(self):
+        curves = {'nominal': ZeroCurve([0., 10.], [.04, .06])}
+        bond = {'mat': 5, 'coupon': .05, 'freq': 1}
+        out = PriceBatch([{'op': 'curve_price', 'bond': bond, 'curve': 'nominal'},
+                          {'op': 'price', 'bond': bond, 'yield': .05},
+                          {'op': 'curve_price', 'bond': bond, 'curve': 'real'},
+                          {'op': 'bogus'}], curves)
+        self.assertAlmostEqual(CouponBond(5., .05, 1).GetPriceFromZeroCurve(0., curves['nominal'],
+                                                                          price_type='dirty'), out[0][0])
+        self.assertAlmostEqual(100., out[1][0])
+        self.assertIsNone(out[2][0])
+        self.assertIn('Unknown curve', out[2][1])
+        self.assertIn('Unknown op', out[3][1])
+
+    def test_yields_batched(self):
+        bond = {'mat': 10, 'coupon': .05, 'freq': 2}
+        prices = [101., 99.5, 100.2, 100.25, 130.]
+        out = PriceBatch([{'op': 'yield', 'bond': bond, 'price': p} for p in prices]
+                         + [{'op': 'price', 'bond': bond, 'yield': .05, 'now': .5}], {})
+        for p, (yld, error) in zip(prices, out):
+            self.assertIsNone(error)
+            cold = CouponBond(10., .05, 2).GetYield(0., p, price_type='dirty')
+            self.assertAlmostEqual(cold, yld, delta=1e-6)
+        # The shared bond rebuilds its schedule for the new now.
+        self.assertAlmostEqual(CouponBond(10., .05, 2).GetPrice(.05, .5, price_type='dirty'), out[-1][0])
+
+
+class TestPricingService(TestCase):
+    def run_session(self, session, unix_path=None):
+        async def main():
+            service = PricingService(batch_window=.01)
+            async with service:
+                client = PricingClient()
+                if unix_path is None:
+                    host, port = await service.Start()
+                    await client.Connect(host, port)
+                else:
+                    await service.StartUnix(unix_path)
+                    await client.Connect(path=unix_path)
+                try:
+                    return await session(client)
+                finally:
+                    await client.Close()
+        return asyncio.run(main())
+
+    def test_requests(self):
+        bond = {'mat': 10, 'coupon': .05, 'freq': 2}
+
+        async def session(client):
+            curve = await client.Request({'op': 'curve', 'name': 'nominal', 'mats': [0, 10],
+                                          'zc': [.04, .06]})
+            price = await client.Request({'op': 'price', 'bond': bond, 'yield': .05})
+            yld = await client.Request({'op': 'yield', 'bond': bond, 'price': 100.})
+            # Concurrent requests are coalesced into a batch
+            many = await asyncio.gather(*[client.Request({'op': 'curve_price', 'curve': 'nominal',
+                                                          'bond': {'mat': m, 'coupon': .05}})
+                                          for m in range(1, 11)])
+            bad = await client.Request({'op': 'curve_price', 'curve': 'real', 'bond': bond})
+            stats = await client.Request({'op': 'stats'})
+            return curve, price, yld, many, bad, stats
+
+        curve, price, yld, many, bad, stats = self.run_session(session)
+        self.assertEqual(2, curve['result'])
+        self.assertAlmostEqual(100., price['result'])
+        self.assertAlmostEqual(.05, yld['result'], places=5)
+        ZC = ZeroCurve([0., 10.], [.04, .06])
+        for m, resp in zip(range(1, 11), many):
+            self.assertAlmostEqual(CouponBond(m, .05, 1).GetPriceFromZeroCurve(0., ZC, price_type='dirty'),
+                                   resp['result'])
+        self.assertIn('error', bad)
+        self.assertEqual(14, stats['result']['count'])
+        self.assertTrue(stats['result']['p50'] > 0.)
+        self.assertTrue(stats['result']['mean_batch'] > 1.)
+
+    def test_stop_drains_queue(self):
+        async def main():
+            service = PricingService(batch_window=.2)
+            await service.Start()
+            loop = asyncio.get_running_loop()
+            futures = []
+            for k in range(0, 3):
+                future = loop.create_future()
+                await service.Queue.put(({'op': 'price', 'bond': {'mat': 5, 'coupon': .05}, 'yield': .05},
+                                         future))
+                futures.append(future)
+            await service.Stop()
+            return [f.result() if f.done() else None for f in futures]
+
+        self.assertEqual([(100., None), ] * 3, [(round(r, 8), e) for r, e in asyncio.run(main())])
+
+    def test_non_object_request(self):
+        async def main():
+            async with PricingService() as service:
+                host, port = await service.Start()
+                reader, writer = await asyncio.open_connection(host, port)
+                writer.write(b'[1, 2]\n5\n')
+                await writer.drain()
+                out = [json.loads(await reader.readline()) for i in range(0, 2)]
+                writer.close()
+                await writer.wait_closed()
+            return out, service.Executor
+
+        out, executor = asyncio.run(main())
+        for resp in out:
+            self.assertIsNone(resp['id'])
+            self.assertIn('error', resp)
+        # The service's own executor is shut down by Stop().
+        self.assertIsNone(executor)
+
+    @skipUnless(hasattr(socket, 'AF_UNIX'), 'Unix sockets not supported')
+    def test_unix_socket(self):
+        async def session(client):
+            return await client.Request({'op': 'price', 'bond': {'mat': 2, 'coupon': .05}, 'yield': .05})
+
+        with tempfile.TemporaryDirectory() as dirname:
+            resp = self.run_session(session, unix_path=os.path.join(dirname, 'pricer.sock'))
+        self.assertAlmostEqual(100., resp['result'])
@@ -0,0 +1,71 @@
+"""
+test_regime_simulation.py
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase
+import random
+from statistics import mean
+
+from simplepricers.regime_simulation import RegimeSwitchingGrowth, RecessionStatistics, MovingAverage
+
+
+class TestMovingAverage(TestCase):
+    def test_matches_slices(self):
+        ser = [float((i * 37) % 11) - 5. for i in range(0, 50)]
+        expected = [mean(ser[max(0, i - 5):i + 1]) for i in range(0, 50)]
+        for a, b in zip(expected, MovingAverage(ser, 6)):
+            self.assertAlmostEqual(a, b)
+
+    def test_bad_window(self):
+        with self.assertRaises(ValueError):
+            MovingAverage([1.], 0)
+
+
+class TestRegimeSwitchingGrowth(TestCase):
+    def test_blocks_reproducible(self):
+        # Same seed and block size -> same paths, however they are consumed.
+        model = RegimeSwitchingGrowth()
+        states, growth = model.Simulate(25, 60, seed=3, block_size=10)
+        again = []
+        for block_states, block_growth in model.IterateBlocks(25, 60, seed=3, block_size=10):
+            again.extend(block_growth)
+        self.assertEqual(growth, again)
+        self.assertEqual(25, len(states))
+        self.assertNotEqual(growth, model.Simulate(25, 60, seed=4, block_size=10)[1])
+
+    def test_deterministic_limits(self):
+        # No switching and no noise: growth converges to the high state level.
+        model = RegimeSwitchingGrowth(stay_high=1., vol=0., initial_growth=0.)
+        states, growth = model.Simulate(2, 100)
+        self.assertEqual(100, sum(states[0]))
+        self.assertAlmostEqual(2.5, growth[1][-1])
+
+    def test_path_matches_simulation(self):
+        # GetPath() draws regime lengths rather than one uniform per step; the distribution of the
+        # states (and so the expected growth) is the same.
+        model = RegimeSwitchingGrowth()
+        rng = random.Random(2)
+        n = 2000
+        paths = [model.GetPath([rng.gauss(0., 1.) for k in range(0, 59)],
+                               [rng.random() for k in range(0, 60)])[1] for i in range(0, n)]
+        simulated = model.Simulate(n, 60, seed=2)[1]
+        expected = model.GetExpectedGrowth(60)
+        for t in (1, 12, 59):
+            self.assertAlmostEqual(expected[t], mean(p[t] for p in paths), delta=.1)
+            self.assertAlmostEqual(expected[t], mean(p[t] for p in simulated), delta=.1)
+
+    def test_low_state_fraction(self):
+        # Stationary probability of the low state is .02 / (.02 + .04) = 1/3
+        stats = RecessionStatistics()
+        stats.Run(RegimeSwitchingGrowth(initial_state=1), 400, 600, seed=1, block_size=100)
+        self.assertAlmostEqual(1. / 3., stats.GetFractionLowState(), delta=.05)
+        self.assertTrue(stats.GetMeanDuration() > 1.)
+        self.assertTrue(stats.PathsWithoutRecession < stats.NumPaths)
+
+    def test_no_recessions(self):
+        stats = RecessionStatistics(threshold=-100.)
+        stats.Run(RegimeSwitchingGrowth(), 5, 24)
+        self.assertEqual(0., stats.GetRecessionsPerYear())
+        self.assertIsNone(stats.GetMeanDuration())
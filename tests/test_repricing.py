@@ -0,0 +1,98 @@
+"""
+test_repricing.py
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase
+
+from simplepricers.repricing import RepricingGraph
+from simplepricers.bonds_curves import CouponBond, ZeroCurve
+from simplepricers.simple_calendar import Indexation
+
+
+class TestRepricingGraph(TestCase):
+    def setUp(self):
+        self.graph = RepricingGraph(now=0.)
+        self.ZC = ZeroCurve([0., 1., 2., 5., 10.], [.02, .02, .025, .03, .035])
+        self.graph.AddCurve('nominal', self.ZC)
+        self.cpi = Indexation()
+        self.cpi.SetIndexValues([0.], [1.])
+        self.cpi.ExtrapolationRate = .02
+        self.graph.AddIndex('cpi', self.cpi)
+        self.graph.AddBond('1y', CouponBond(1., .02, 1), curve_name='nominal')
+        self.graph.AddBond('5y', CouponBond(5., .03, 1), curve_name='nominal')
+        self.graph.AddBond('10y', CouponBond(10., .035, 1), curve_name='nominal')
+        self.graph.AddBond('quoted', CouponBond(3., .03, 2), yld=.03)
+        self.graph.AddBond('linker', CouponBond(3., .01, 1), curve_name='nominal', index_name='cpi')
+        self.graph.Recompute()
+
+    def test_initial_prices(self):
+        prices = self.graph.GetPrices()
+        self.assertAlmostEqual(CouponBond(5., .03, 1).GetPriceFromZeroCurve(0., self.ZC, price_type='dirty'),
+                               prices['5y'])
+        self.assertAlmostEqual(100., prices['quoted'])
+
+    def test_node_update(self):
+        # The 10-year node only affects the 10-year bond (which pays at 6..10)
+        self.graph.UpdateCurveNode('nominal', 4, .04)
+        self.assertEqual(['10y'], list(self.graph.Recompute().keys()))
+        # The 2-year node affects everything paying in (1, 5)
+        self.graph.UpdateCurveNode('nominal', 2, .03)
+        self.assertEqual(['10y', '5y', 'linker'], sorted(self.graph.Recompute().keys()))
+        self.assertEqual({}, self.graph.Recompute())
+
+    def test_update_curve(self):
+        self.graph.UpdateCurve('nominal', [.02, .021, .025, .03, .035])
+        self.assertEqual(['10y', '1y', '5y', 'linker'], sorted(self.graph.Recompute().keys()))
+
+    def test_quote(self):
+        self.graph.UpdateQuote('quoted', .04)
+        out = self.graph.Recompute()
+        self.assertEqual(['quoted'], list(out.keys()))
+        self.assertTrue(out['quoted'] < 100.)
+        with self.assertRaises(ValueError):
+            self.graph.UpdateQuote('5y', .04)
+
+    def test_index(self):
+        self.graph.SetExtrapolationRate('cpi', .03)
+        out = self.graph.Recompute()
+        self.assertEqual(['linker'], list(out.keys()))
+        expected = sum([cf * pow(1.03, d) * self.ZC.GetDF(d) for d, cf in zip([1., 2., 3.], [1., 1., 101.])])
+        self.assertAlmostEqual(expected, out['linker'])
+        # A print after the last cash flow does not matter
+        self.graph.AppendIndexValue('cpi', 3., 1.1)
+        self.graph.AppendIndexValue('cpi', 5., 1.2)
+        self.assertEqual(['linker'], list(self.graph.Recompute().keys()))
+        self.graph.AppendIndexValue('cpi', 6., 1.3)
+        self.assertEqual({}, self.graph.Recompute())
+
+    def test_bad_bond(self):
+        with self.assertRaises(ValueError):
+            self.graph.AddBond('x', CouponBond(3., .03, 1))
+        with self.assertRaises(KeyError):
+            self.graph.AddBond('x', CouponBond(3., .03, 1), curve_name='real')
+
+
+class TestNodeDependencies(TestCase):
+    def test_schemes(self):
+        mats = [0., 1., 2., 5., 10.]
+        zeros = [.02, .02, .025, .03, .035]
+        self.assertEqual([1, 2], ZeroCurve(mats, zeros).GetNodeDependencies(1.5))
+        self.assertEqual([2], ZeroCurve(mats, zeros).GetNodeDependencies(2.))
+        self.assertEqual([1, 2], ZeroCurve(mats, zeros, 'loglinear').GetNodeDependencies(1.5))
+        self.assertEqual([0, 1, 2, 3], ZeroCurve(mats, zeros, 'hermite').GetNodeDependencies(1.5))
+        self.assertEqual([0, 1, 2, 3, 4], ZeroCurve(mats, zeros, 'cubic').GetNodeDependencies(1.5))
+
+    def test_hermite_locality(self):
+        mats = [0., 1., 2., 5., 10., 20.]
+        zeros = [.02, .02, .025, .03, .035, .04]
+        base = ZeroCurve(mats, zeros, 'hermite')
+        deps = base.GetNodeDependencies(1.5)
+        for pos in range(0, len(mats)):
+            bumped = list(zeros)
+            bumped[pos] += .001
+            changed = ZeroCurve(mats, bumped, 'hermite').GetZeroRate(1.5) != base.GetZeroRate(1.5)
+            # Dependencies may be conservative, but must not miss a node.
+            if changed:
+                self.assertIn(pos, deps)
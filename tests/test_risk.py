@@ -0,0 +1,101 @@
+"""
+test_risk.py
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase
+import concurrent.futures
+import random
+
+from simplepricers.risk import ScenarioRisk, TailStatistics
+from simplepricers.bonds_curves import CouponBond, ZeroCurve
+
+
+class TestTailStatistics(TestCase):
+    def test_matches_sort(self):
+        rng = random.Random(3)
+        losses = [rng.gauss(0., 1.) for i in range(0, 1000)]
+        obj = TailStatistics(60)
+        obj.AddMany(losses)
+        ordered = sorted(losses, reverse=True)
+        for confidence in (.95, .99, .999):
+            k = int(round(1000 * (1. - confidence)))
+            self.assertEqual(ordered[k - 1], obj.GetVaR(confidence))
+            self.assertAlmostEqual(sum(ordered[0:k]) / k, obj.GetExpectedShortfall(confidence))
+        self.assertEqual(60, len(obj.Heap))
+
+    def test_tail_too_small(self):
+        obj = TailStatistics(5)
+        obj.AddMany([float(x) for x in range(0, 1000)])
+        with self.assertRaises(ValueError):
+            obj.GetVaR(.99)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            TailStatistics(0)
+        with self.assertRaises(ValueError):
+            TailStatistics(5).GetVaR(.99)
+        obj = TailStatistics(5)
+        obj.Add(1.)
+        with self.assertRaises(ValueError):
+            obj.GetVaR(1.)
+
+
+class TestScenarioRisk(TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.Mats = [0., 1., 2., 5., 10., 30.]
+        self.Base = [.02, .022, .025, .03, .034, .038]
+        self.Bonds = []
+        self.Notionals = []
+        self.Books = []
+        for i in range(0, 30):
+            freq = rng.choice((1, 2))
+            self.Bonds.append(CouponBond(float(rng.randint(1, 60)) / 2., rng.choice((.01, .03, .05)), freq))
+            self.Notionals.append(rng.choice((-1., 1.)) * 1000. * rng.randint(1, 10))
+            self.Books.append(rng.choice(('rates', 'credit', 'treasury')))
+        self.Scenarios = []
+        for i in range(0, 400):
+            level = rng.gauss(0., .005)
+            slope = rng.gauss(0., .003)
+            zeros = [z + level + slope * t / 30. for z, t in zip(self.Base, self.Mats)]
+            self.Scenarios.append((self.Mats, zeros))
+
+    def naive_losses(self, book):
+        base_curve = ZeroCurve(self.Mats, self.Base)
+
+        def value(ZC):
+            total = 0.
+            for b, n, name in zip(self.Bonds, self.Notionals, self.Books):
+                if book is None or name == book:
+                    total += n * b.GetPriceFromZeroCurve(.25, ZC, price_type='dirty') / 100.
+            return total
+        base = value(base_curve)
+        return [base - value(ZeroCurve(m, r)) for m, r in self.Scenarios]
+
+    def check(self, obj):
+        for book, tail in [(None, obj.Total)] + [(name, obj.Tails[name]) for name in obj.BookNames]:
+            losses = sorted(self.naive_losses(book), reverse=True)
+            self.assertEqual(400, tail.Count)
+            for confidence in (.95, .99):
+                k = int(round(400 * (1. - confidence)))
+                self.assertAlmostEqual(losses[k - 1], tail.GetVaR(confidence), places=6)
+                self.assertAlmostEqual(sum(losses[0:k]) / k, tail.GetExpectedShortfall(confidence), places=6)
+
+    def test_matches_full_revaluation(self):
+        obj = ScenarioRisk(self.Bonds, self.Notionals, self.Books, now=.25, tail_size=20)
+        self.assertEqual(['credit', 'rates', 'treasury'], obj.BookNames)
+        obj.Run(iter(self.Scenarios), ZeroCurve(self.Mats, self.Base), chunk_size=64)
+        self.check(obj)
+
+    def test_executor(self):
+        obj = ScenarioRisk(self.Bonds, self.Notionals, self.Books, now=.25, tail_size=20)
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            obj.Run(self.Scenarios, ZeroCurve(self.Mats, self.Base), chunk_size=50, executor=executor,
+                    max_pending=2)
+        self.check(obj)
+
+    def test_books_length(self):
+        with self.assertRaises(ValueError):
+            ScenarioRisk(self.Bonds, self.Notionals, ['a', ])
@@ -1,6 +1,8 @@
 from unittest import TestCase
+from array import array
+
+from simplepricers.simple_calendar import SimpleCalendar360, Indexation, Date360
 
-from simplepricers.simple_calendar import SimpleCalendar360, Indexation
 
 class TestSimpleCalendar360(TestCase):
     def test_GetDate(self):
@@ -32,6 +34,15 @@ class TestIndexation(TestCase):
         obj.SetIndexValues([2., 1.], [100., 101.])
         self.assertEqual([(1., 101.), (2., 100.)], obj.IndexDateValues)
 
+    def test_set_date_values(self):
+        obj = Indexation()
+        obj.IndexDateValues = [(1., 101.), (0., 100.)]
+        self.assertEqual(array('d', [0., 1.]), obj.IndexDates)
+        self.assertEqual(100.5, obj.GetValue(.5))
+        obj.IndexDateValues.append((2., 103.))
+        self.assertEqual(array('d', [100., 101., 103.]), obj.IndexValues)
+        self.assertEqual(102., obj.GetValue(1.5))
+
     def test_extrapolation(self):
         obj = Indexation()
         obj.SetIndexValues([0.],[100.])
@@ -39,3 +50,146 @@ class TestIndexation(TestCase):
         self.assertEqual(102., obj.GetValue(1.))
         self.assertAlmostEqual(104.04, obj.GetValue(2.))
 
+
+    def test_serial_day_lookup(self):
+        obj = Indexation()
+        cal = SimpleCalendar360()
+        start = Date360.FromYMD(2017, 12, 1)
+        obj.SetIndexValues([start, start.AddMonths(1)], [100., 103.])
+        self.assertEqual(103., obj.GetValue(start.AddMonths(1)))
+        # 15 days in: half way
+        self.assertAlmostEqual(101.5, obj.GetValue(start.AddDays(15)))
+        self.assertEqual(103., obj.GetValue(cal.AddMonths(float(start), 1)))
+
+
+class TestDate360(TestCase):
+    def test_round_trip(self):
+        cal = SimpleCalendar360()
+        serials = cal.GetSerialDays([1976, 1976, 2020], [1, 12, 2], [1, 30, 29])
+        self.assertEqual([(1976, 1, 1), (1976, 12, 30), (2020, 2, 29)], cal.SerialToYMD(serials))
+        self.assertEqual(serials, cal.YearFractionToSerial(cal.SerialToYearFraction(serials)))
+
+    def test_matches_GetDate(self):
+        cal = SimpleCalendar360()
+        for ymd in ((1976, 1, 1), (1976, 3, 17), (2018, 11, 30)):
+            self.assertAlmostEqual(cal.GetDate(*ymd), float(Date360.FromYMD(*ymd)), places=12)
+
+    def test_hash_order(self):
+        a = Date360.FromYMD(2000, 1, 1)
+        b = Date360.FromYMD(1999, 12, 30).AddDays(1)
+        self.assertEqual(a, b)
+        self.assertEqual(1, len({a: 1, b: 2}))
+        self.assertTrue(a < a.AddDays(1))
+
+    def test_not_int(self):
+        with self.assertRaises(TypeError):
+            Date360(1.5)
+
+    def test_bond_accepts(self):
+        from simplepricers.bonds_curves import CouponBond
+        obj = CouponBond(Date360.FromYMD(2), .05, coupon_freq=2)
+        price = obj.GetPrice(.04, now=Date360.FromYMD(0, 7, 1), price_type='dirty')
+        expected = CouponBond(2., .05, coupon_freq=2).GetPrice(.04, now=.5, price_type='dirty')
+        self.assertAlmostEqual(expected, price)
+
+
+class TestAppendIndexValue(TestCase):
+    def test_append(self):
+        obj = Indexation()
+        obj.SetIndexValues([0., 1.], [100., 101.])
+        obj.AppendIndexValue(2., 103.)
+        self.assertEqual([(0., 100.), (1., 101.), (2., 103.)], obj.IndexDateValues)
+        self.assertEqual(102., obj.GetValue(1.5))
+
+    def test_insert(self):
+        obj = Indexation()
+        obj.AppendIndexValues([0., 2.], [100., 102.])
+        obj.AppendIndexValue(1., 105.)
+        self.assertEqual([(0., 100.), (1., 105.), (2., 102.)], obj.IndexDateValues)
+        # Replace an existing point
+        obj.AppendIndexValue(1., 101.)
+        self.assertEqual([(0., 100.), (1., 101.), (2., 102.)], obj.IndexDateValues)
+
+    def test_cache_invalidation(self):
+        obj = Indexation()
+        obj.SetIndexValues([0., 1., 2.], [100., 101., 102.])
+        obj.ExtrapolationRate = .02
+        self.assertEqual(100.5, obj.GetValue(.5))
+        self.assertEqual(101.5, obj.GetValue(1.5))
+        self.assertAlmostEqual(102. * 1.02, obj.GetValue(3.))
+        # Appending past the end keeps interpolated values, drops extrapolated ones. (Dates on a
+        # day are cached by serial day.)
+        obj.AppendIndexValue(3., 110.)
+        self.assertEqual({180: 100.5, 540: 101.5}, obj.InterpolationCache)
+        self.assertEqual(110., obj.GetValue(3.))
+        # Inserting in [1, 2] only drops values after 1.
+        obj.AppendIndexValue(1.75, 103.)
+        self.assertEqual({180: 100.5}, obj.InterpolationCache)
+        self.assertAlmostEqual(101. + 2. * 2. / 3., obj.GetValue(1.5))
+
+    def test_extrapolation_rate_change(self):
+        obj = Indexation()
+        obj.SetIndexValues([0.], [100.])
+        obj.ExtrapolationRate = .02
+        self.assertEqual(102., obj.GetValue(1.))
+        obj.ExtrapolationRate = .03
+        self.assertEqual(103., obj.GetValue(1.))
+        # An equal rate (computed, so not the same object) keeps the cache.
+        obj.ExtrapolationRate = float('0.0' + '3')
+        self.assertEqual({360: 103.}, obj.ExtrapolationCache)
+        obj.ExtrapolationRate = None
+        self.assertEqual({}, obj.ExtrapolationCache)
+
+
+class TestIndexTable(TestCase):
+    def setUp(self):
+        self.obj = Indexation()
+        start = Date360.FromYMD(2017, 9)
+        self.dates = [start.AddMonths(i) for i in range(0, 4)]
+        self.obj.SetIndexValues(self.dates, [100., 100., 101., 103.])
+        self.obj.ExtrapolationRate = .02
+
+    def test_matches_GetValue(self):
+        start = self.dates[0]
+        self.obj.BuildIndexTable(start, start.AddMonths(24))
+        days = [start.AddDays(i) for i in range(0, 720, 7)]
+        expected = [self.obj.CalcValue(float(d)) for d in days]
+        out = self.obj.GetValues(days)
+        for e, v in zip(expected, out):
+            self.assertAlmostEqual(e, v)
+        # Float dates on the grid also use the table
+        self.assertAlmostEqual(expected[5], self.obj.GetValues([float(days[5]), ])[0])
+
+    def test_off_grid(self):
+        start = self.dates[0]
+        self.obj.BuildIndexTable(start, start.AddMonths(24), step='monthly')
+        d = start.AddDays(15)
+        self.assertEqual([self.obj.GetValue(d), ], self.obj.GetValues([d, ]))
+
+    def test_lazy_rebuild(self):
+        start = self.dates[0]
+        table = self.obj.BuildIndexTable(start, start.AddMonths(12), step='monthly')
+        self.assertEqual(13, table.ValidCount)
+        self.obj.ExtrapolationRate = .05
+        # Only entries after the last index point (month 3) are invalid
+        self.assertEqual(4, table.ValidCount)
+        later = start.AddMonths(12)
+        self.assertAlmostEqual(103. * pow(1.05, 9. / 12.), self.obj.GetValues([later, ])[0])
+        self.obj.AppendIndexValue(start.AddMonths(4), 104.)
+        self.assertEqual(4, table.ValidCount)
+        self.assertAlmostEqual(104. * pow(1.05, 8. / 12.), self.obj.GetValues([later, ])[0])
+        self.obj.AppendIndexValue(start.AddMonths(2), 102.)
+        self.assertEqual(2, table.ValidCount)
+
+    def test_bad_step(self):
+        with self.assertRaises(ValueError):
+            self.obj.BuildIndexTable(self.dates[0], self.dates[1], step='weekly')
+
+    def test_range_checked(self):
+        # Checked when the table is built, not when it is first used.
+        self.obj.ExtrapolationRate = None
+        self.obj.BuildIndexTable(self.dates[0], self.dates[3])
+        with self.assertRaises(ValueError):
+            self.obj.BuildIndexTable(self.dates[0], self.dates[3].AddDays(1))
+        with self.assertRaises(ValueError):
+            self.obj.BuildIndexTable(self.dates[0].AddDays(-1), self.dates[1])
@@ -0,0 +1,55 @@
+"""
+test_spreads.py
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase
+
+from simplepricers.spreads import SolveZSpreads, SolveYields, SolveYieldSpreads
+from simplepricers.bonds_curves import CouponBond, ZeroCurve
+
+
+class TestSpreads(TestCase):
+    def setUp(self):
+        self.ZC = ZeroCurve([0., 2., 5., 10., 30.], [.02, .025, .03, .035, .04])
+        self.Bonds = [CouponBond(float(m), c, f) for m, c, f in
+                      ((1, .01, 1), (3, .03, 2), (7, .05, 2), (10, .02, 1), (25, .06, 2))]
+
+    def test_zspread_reprices(self):
+        prices = [95., 100., 110., 80., 130.]
+        res = SolveZSpreads(self.Bonds, prices, self.ZC)
+        self.assertEqual([True, ] * 5, res.Converged)
+        self.assertTrue(max(res.Iterations) < 10)
+        for bond, price, s in zip(self.Bonds, prices, res.Spreads):
+            shifted = ZeroCurve(self.ZC.Maturities, [z + s for z in self.ZC.ZC])
+            repriced = bond.GetPriceFromZeroCurve(0., shifted, price_type='dirty')
+            self.assertAlmostEqual(price, repriced, places=8)
+
+    def test_zero_spread_at_model_price(self):
+        prices = [b.GetPriceFromZeroCurve(0., self.ZC, price_type='dirty') for b in self.Bonds]
+        res = SolveZSpreads(self.Bonds, prices, self.ZC)
+        for s in res.Spreads:
+            self.assertAlmostEqual(0., s, places=10)
+
+    def test_yields_match_GetYield(self):
+        prices = [95., 100., 110., 80., 130.]
+        res = SolveYields(self.Bonds, prices)
+        for bond, price, y in zip(self.Bonds, prices, res.Spreads):
+            expected = bond.GetYield(0., price, price_type='dirty', guess=(-.5, 1.), toler=1e-10)
+            self.assertAlmostEqual(expected, y, places=6)
+
+    def test_yield_spread(self):
+        model = [b.GetPriceFromZeroCurve(0., self.ZC, price_type='dirty') for b in self.Bonds]
+        res = SolveYieldSpreads(self.Bonds, model, self.ZC)
+        for s in res.Spreads:
+            self.assertAlmostEqual(0., s, places=10)
+
+    def test_not_converged(self):
+        res = SolveZSpreads(self.Bonds[0:1], [50.], self.ZC, max_iter=1)
+        self.assertEqual([False], res.Converged)
+        self.assertEqual([None], res.Spreads)
+
+    def test_length_mismatch(self):
+        with self.assertRaises(ValueError):
+            SolveZSpreads(self.Bonds, [100.], self.ZC)
@@ -0,0 +1,107 @@
+"""
+test_surfaces.py
+
+Note that some tests are done as doctests (loaded by test_doctests.py).
+"""
+
+from unittest import TestCase, skipIf
+import math
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+import simplepricers.surfaces as surfaces
+from simplepricers.bonds_curves import CouponBond
+
+
+def shocked_convexity(bond, yld, now, bp=.0001):
+    p = bond.GetPrice(yld, now, price_type='dirty')
+    p_up = bond.GetPrice(yld + bp, now, price_type='dirty')
+    p_dn = bond.GetPrice(yld - bp, now, price_type='dirty')
+    return (p_up + p_dn - 2. * p) / (p * bp * bp)
+
+
+class TestSurfaces(TestCase):
+    def test_geometric_sums(self):
+        for u in (.5, .95, .995, 1., 1.003, 1.2):
+            for n in (1, 2, 7, 40):
+                expected = (sum(u ** k for k in range(n)), sum(k * u ** k for k in range(n)),
+                            sum(k * k * u ** k for k in range(n)))
+                for got, exp in zip(surfaces.geometric_sums(u, n), expected):
+                    self.assertAlmostEqual(got, exp, delta=1e-9 * max(1., exp))
+
+    def test_matches_bond(self):
+        mats = [1., 2.5, 10., 30.]
+        cpns = [0., .03, .08]
+        ylds = [-.002, 0., .001, .04, .12]
+        nows = [0., .3, .5, 2.]
+        for freq in (1, 2, 4):
+            surf = surfaces.CalcPriceSurfaces(mats, cpns, ylds, nows, coupon_freq=freq)
+            self.assertEqual(surf.Shape, (4, 3, 5, 4))
+            for i, mat in enumerate(mats):
+                for j, cpn in enumerate(cpns):
+                    bond = CouponBond(mat, cpn, freq)
+                    for k, yld in enumerate(ylds):
+                        for m, now in enumerate(nows):
+                            price = surf.Price[i][j][k][m]
+                            if now >= mat:
+                                self.assertEqual(price, 0.)
+                                self.assertTrue(math.isnan(surf.Duration[i][j][k][m]))
+                                continue
+                            self.assertAlmostEqual(price, bond.GetPrice(yld, now, price_type='dirty'),
+                                                   delta=1e-9 * price)
+                            dur = bond.CalcDuration(yld, now)
+                            self.assertAlmostEqual(surf.Duration[i][j][k][m], dur, delta=1e-5 * dur)
+                            conv = shocked_convexity(bond, yld, now)
+                            self.assertAlmostEqual(surf.Convexity[i][j][k][m], conv,
+                                                   delta=1e-3 * max(1., conv))
+
+    def test_scalar_axes(self):
+        surf = surfaces.CalcPriceSurfaces(10., [.02, .04], .04, [0., .5, 1.])
+        self.assertEqual(surf.Shape, (2, 3))
+        self.assertAlmostEqual(surf.Price[1][0], 100., places=10)
+        surf = surfaces.CalcPriceSurfaces(10., .04, .04)
+        self.assertEqual(surf.Shape, ())
+        self.assertAlmostEqual(surf.Price, 100., places=10)
+
+    def test_yield_out_of_range(self):
+        surf = surfaces.CalcPriceSurfaces([5., 10.], .04, [-1.5, .04], [0., .5])
+        self.assertEqual([0., 0.], surf.Price[1][0])
+        self.assertTrue(math.isnan(surf.Convexity[0][0][1]))
+        self.assertAlmostEqual(100., surf.Price[1][1][0], places=10)
+
+    def test_long_series(self):
+        # Small yields with many payments use the doubling sums, rather than the closed forms.
+        surf = surfaces.CalcPriceSurfaces(100., .02, [0., .001], coupon_freq=12)
+        bond = CouponBond(100., .02, 12)
+        for k, yld in enumerate([0., .001]):
+            price = bond.GetPrice(yld, 0., price_type='dirty')
+            self.assertAlmostEqual(surf.Price[k], price, delta=1e-9 * price)
+
+    @skipIf(numpy is None, 'numpy not installed')
+    def test_array_yields(self):
+        mats = [1., 2.5, 30.]
+        cpns = [0., .03]
+        ylds = [-2.5, -.002, 0., .001, .04, .12]
+        nows = [0., .5, 2.]
+        for freq in (1, 2, 12):
+            expected = surfaces.CalcPriceSurfaces(mats, cpns, ylds, nows, coupon_freq=freq)
+            surf = surfaces.CalcPriceSurfaces(mats, cpns, numpy.array(ylds), nows, coupon_freq=freq)
+            self.assertEqual(expected.Shape, surf.Shape)
+            self.assertEqual(surf.Shape, surf.Price.shape)
+            for name in ('Price', 'Duration', 'Convexity'):
+                exp = numpy.array(getattr(expected, name))
+                got = getattr(surf, name)
+                self.assertTrue((numpy.isnan(exp) == numpy.isnan(got)).all())
+                ok = ~numpy.isnan(exp)
+                self.assertTrue((abs(exp[ok] - got[ok]) <= 1e-9 * (1. + abs(exp[ok]))).all(), name)
+        surf = surfaces.CalcPriceSurfaces(10., .04, numpy.array([.03, .04]))
+        self.assertEqual((2,), surf.Shape)
+        self.assertAlmostEqual(100., surf.Price[1], places=10)
+
+    def test_bad_convention(self):
+        with self.assertRaises(NotImplementedError):
+            surfaces.CalcPriceSurfaces(10., .04, .04, yield_convention='money market')
@@ -1,6 +1,11 @@
-from unittest import TestCase
+from unittest import TestCase, skipIf
 import doctest
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
 import simplepricers.utils as utils
 from simplepricers.utils import create_grid
 
@@ -27,6 +32,59 @@ class TestCreateGrid(TestCase):
         self.assertEqual(create_grid(100., 105., 1), [100., 101., 102., 103., 104., 105.])
 
 
+class TestDownsample(TestCase):
+    def test_minmax_length(self):
+        y = [float((i * 7919) % 101) for i in range(0, 10000)]
+        x, out = utils.minmax_decimate(list(range(0, 10000)), y, 500)
+        self.assertTrue(len(out) <= 500)
+        self.assertEqual(x[0], 0)
+        self.assertEqual(x[-1], 9999)
+        self.assertEqual(max(y), max(out))
+        self.assertEqual(min(y), min(out))
+        # x order is preserved
+        self.assertEqual(x, sorted(x))
+
+    def test_lttb_length(self):
+        y = [float((i * 7919) % 101) for i in range(0, 10000)]
+        x, out = utils.lttb(list(range(0, 10000)), y, 500)
+        self.assertEqual(500, len(out))
+        self.assertEqual(x, sorted(x))
+
+    def test_mismatch(self):
+        with self.assertRaises(ValueError):
+            utils.minmax_decimate([1, 2], [1.], 10)
+
+    @skipIf(numpy is None, 'numpy not installed')
+    def test_minmax_array(self):
+        # The array path gives the same points as the list path, including a partial last bucket.
+        y = [float((i * 7919) % 101) for i in range(0, 10003)]
+        expected = utils.minmax_decimate(list(range(0, 10003)), y, 500)
+        self.assertEqual(expected, utils.minmax_decimate(numpy.arange(0, 10003), numpy.array(y), 500))
+        self.assertEqual(expected, utils.minmax_decimate(list(range(0, 10003)), numpy.array(y), 500))
+
+
+class TestSolvers(TestCase):
+    def test_illinois_decreasing(self):
+        # Decreasing function, like price in yield
+        x, n = utils.illinois_root(lambda x: 1. / (1. + x), 1. / 1.05, 0., .25, 1e-10)
+        self.assertAlmostEqual(.05, x, places=9)
+        self.assertTrue(n < 20)
+
+    def test_not_bracketed(self):
+        with self.assertRaises(ValueError):
+            utils.illinois_root(lambda x: x, 5., 0., 1., 1e-6)
+
+    def test_bracket_lower_limit(self):
+        lo, hi, f_lo, f_hi = utils.bracket_root(lambda x: x, -.95, 0., .1, lower=-1.)
+        self.assertTrue(-1. <= lo <= -.95)
+        with self.assertRaises(ValueError):
+            utils.bracket_root(lambda x: x, -2., 0., .1, lower=-1., max_expand=5)
+
+    def test_warm_solve_far_seed(self):
+        x, n = utils.warm_solve(lambda x: x ** 3, 27., 0., .001, 1e-9)
+        self.assertAlmostEqual(3., x, places=8)
+
+
 # Add in doctests
 def load_tests(loader, tests, ignore):
     tests.addTests(doctest.DocTestSuite(utils))
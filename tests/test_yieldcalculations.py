@@ -56,4 +56,30 @@ class TestZeroCurve(TestCase):
         # At T=1, zero rate = .05, so DF = 1/1.05
         self.assertEqual(1/1.05, obj.GetDF(1,))
         # At T=0.5, zero rate = 4.5%; so = 1/(1.045)^.5
-        self.assertEqual(1/pow(1.045, .5), obj.GetDF(.5))
\ No newline at end of file
+        self.assertEqual(1/pow(1.045, .5), obj.GetDF(.5))
+
+    def test_short_end_flat(self):
+        obj = ZeroCurve([1., 2.], [.04, .05])
+        self.assertEqual(.04, obj.GetZeroRate(.5))
+
+    def test_forward_cache(self):
+        obj = ZeroCurve([0., 1., 2.], [.04, .04, .05])
+        fwd = obj.GetForwardRates([0., 1., 2.])
+        self.assertEqual(1, len(obj.ForwardCache))
+        self.assertEqual(fwd, obj.GetForwardRates([0., 1., 2.]))
+        # Changing the curve invalidates the cache
+        obj.ZC[2] = .04
+        fwd = obj.GetForwardRates([0., 1., 2.])
+        self.assertAlmostEqual(.04, fwd[1])
+
+    def test_forward_bad_period(self):
+        obj = ZeroCurve([0., 1., 2.], [.04, .04, .05])
+        with self.assertRaises(ValueError):
+            obj.GetForwardRates([1., 1.])
+
+    def test_instantaneous_forward(self):
+        obj = ZeroCurve([0., 1., 2., 5.], [.03, .04, .05, .045])
+        h = 1e-5
+        for t in (.3, 1.5, 3., 4.5):
+            fd = pow(obj.GetDF(t - h) / obj.GetDF(t + h), 1. / (2 * h)) - 1.
+            self.assertAlmostEqual(fd, obj.GetInstantaneousForwardRates([t, ])[0], places=6)